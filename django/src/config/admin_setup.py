@@ -10,6 +10,7 @@ def create_admins_from_env():
     Crea administradores basado en las variables de entorno DJANGO_ADMINS
     Formato: username:email:password,username2:email2:password2
     """
+    from utils.hashing import make_passwords
     User = get_user_model()
     admins_config = os.getenv("DJANGO_ADMINS", "")
     
@@ -21,20 +22,23 @@ def create_admins_from_env():
     
     print(f"Configurando administradores desde DJANGO_ADMINS...")
     
+    admins = []
     for admin_config in admins_config.split(","):
         admin_config = admin_config.strip()
         if not admin_config:
             continue
-            
+        # Formato: username:email:password
+        parts = admin_config.split(":")
+        if len(parts) != 3:
+            print(f"Error: Formato inválido para admin '{admin_config}'. Usar: username:email:password")
+            continue
+        admins.append((admin_config, parts))
+    
+    # Todos los hashes en paralelo en el pool de hashing
+    hashed = make_passwords(password for _, (_, _, password) in admins)
+    
+    for (admin_config, (username, email, _)), password_hash in zip(admins, hashed):
         try:
-            # Formato: username:email:password
-            parts = admin_config.split(":")
-            if len(parts) != 3:
-                print(f"Error: Formato inválido para admin '{admin_config}'. Usar: username:email:password")
-                continue
-                
-            username, email, password = parts
-            
             # Crear o actualizar usuario
             user, created = User.objects.get_or_create(
                 username=username,
@@ -47,7 +51,7 @@ def create_admins_from_env():
             )
             
             if created:
-                user.set_password(password)
+                user.password = password_hash
                 user.save()
                 print(f"✓ Administrador creado: {username} ({email})")
                 created_count += 1
@@ -57,7 +61,7 @@ def create_admins_from_env():
                 user.is_staff = True
                 user.is_superuser = True
                 user.is_active = True
-                user.set_password(password)
+                user.password = password_hash
                 user.save()
                 print(f"✓ Administrador actualizado: {username} ({email})")
                 updated_count += 1
@@ -73,6 +77,7 @@ def create_legacy_admin():
     """
     Crea administrador usando las variables de entorno legacy
     """
+    from utils.hashing import make_password
     User = get_user_model()
     
     username = os.getenv("DJANGO_SUPERUSER_USERNAME")
@@ -84,6 +89,7 @@ def create_legacy_admin():
         return 0
     
     try:
+        password_hash = make_password(password)
         user, created = User.objects.get_or_create(
             username=username,
             defaults={
@@ -95,7 +101,7 @@ def create_legacy_admin():
         )
         
         if created:
-            user.set_password(password)
+            user.password = password_hash
             user.save()
             print(f"✓ Administrador legacy creado: {username} ({email})")
         else:
@@ -104,7 +110,7 @@ def create_legacy_admin():
             user.is_staff = True
             user.is_superuser = True
             user.is_active = True
-            user.set_password(password)
+            user.password = password_hash
             user.save()
             print(f"✓ Administrador legacy actualizado: {username} ({email})")
             
@@ -7,3 +7,6 @@ class ConfigConfig(AppConfig):
     
     def ready(self):
         import config.signals
+        # Construir la configuración de Jitsi una sola vez al arrancar
+        from utils.jitsi import get_config
+        get_config()
@@ -0,0 +1,67 @@
+"""
+Comando de Django para medir el coste del hash de contraseñas en este host
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+
+from utils.hashing import HashingService
+
+
+class Command(BaseCommand):
+    help = 'Mide el coste de PBKDF2 y los logins por segundo sostenibles por worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=5,
+            help='Hashes a medir en cada prueba',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.PASSWORD_HASHING_WORKERS,
+            help='Procesos del pool a probar (por defecto PASSWORD_HASHING_WORKERS)',
+        )
+
+    def handle(self, *args, **options):
+        samples = max(1, options['samples'])
+        workers = max(1, options['workers'])
+        hasher = hashers.get_hasher()
+        iterations = getattr(hasher, 'iterations', None)
+        self.stdout.write(f'Hasher: {hasher.algorithm}' + (f' ({iterations} iteraciones)' if iterations else ''))
+
+        # Coste de un hash en el propio proceso
+        durations = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            hashers.make_password('calibracion')
+            durations.append(time.perf_counter() - start)
+        cost = statistics.median(durations)
+        self.stdout.write(f'Coste por hash (en línea): {cost * 1000:.1f} ms')
+        self.stdout.write(f'  Un worker síncrono hasheando en línea: {1 / cost:.1f} logins/s como máximo')
+
+        # Rendimiento del pool con todos sus procesos ocupados
+        service = HashingService(workers=workers, max_pending=workers * samples, timeout=max(30.0, cost * samples * 4))
+        try:
+            service.make_passwords(['calentar'] * workers)  # arranque de los procesos fuera de la medida
+            total = workers * samples
+            start = time.perf_counter()
+            service.make_passwords(['calibracion'] * total)
+            elapsed = time.perf_counter() - start
+        finally:
+            service.shutdown()
+        throughput = total / elapsed
+        self.stdout.write(f'Pool de {workers} procesos: {throughput:.1f} hashes/s')
+        self.stdout.write(self.style.SUCCESS(
+            f'Máximo sostenible por worker (con este pool): {throughput:.1f} logins/s'
+        ))
+        self.stdout.write(
+            f'  Con PASSWORD_HASHING_MAX_PENDING={settings.PASSWORD_HASHING_MAX_PENDING} la espera máxima en cola '
+            f'es ~{settings.PASSWORD_HASHING_MAX_PENDING / throughput:.2f} s '
+            f'(PASSWORD_HASHING_TIMEOUT={settings.PASSWORD_HASHING_TIMEOUT} s)'
+        )
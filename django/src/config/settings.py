@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -9,6 +10,9 @@ load_dotenv(BASE_DIR.parent / "env_simple")
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY","insecure")
 DEBUG = os.getenv("DJANGO_DEBUG","0") == "1"
 ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS","*").split(",")
+# Directorio privado (0700) de los SQLite locales (cache, rate limiting); nunca /tmp:
+# contienen pickles que la aplicación deserializa y datos de los usuarios
+LOCAL_STATE_DIR = Path(os.getenv("LOCAL_STATE_DIR", BASE_DIR.parent / "run"))
 
 INSTALLED_APPS = [
     "django.contrib.admin",
@@ -27,6 +31,12 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # request.principal: usuario + perfil cargados una vez por petición
+    "models.principal.PrincipalMiddleware",
+    # HashingUnavailable -> 503 en cualquier vista que autentique (p. ej. /admin/login/)
+    "utils.hashing.HashingUnavailableMiddleware",
+    # RateLimited -> 429 fuera de las vistas que lo gestionan (el backend limita todos los logins)
+    "utils.ratelimit.RateLimitMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
 ]
 
@@ -49,11 +59,39 @@ DATABASES = {
     "default": {
         "ENGINE":"django.db.backends.sqlite3",
         "NAME": "/home/dopel/projects/jitsi-django/django/db/db.sqlite3",
+        # WAL: las lecturas no esperan a las escrituras; timeout: esperar al lock en vez de fallar
+        "OPTIONS": {
+            "timeout": 20,
+            "init_command": "PRAGMA journal_mode=WAL;",
+        },
     }
 }
 
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "static"
+# Las contraseñas se verifican en el pool de procesos de utils.hashing
+AUTHENTICATION_BACKENDS = ["utils.hashing.PooledModelBackend"]
+# Procesos del pool POR WORKER: cada worker de gunicorn tiene el suyo, así que el host corre
+# WEB_CONCURRENCY × PASSWORD_HASHING_WORKERS. Por defecto se reparte la mitad de las CPU entre los workers
+PASSWORD_HASHING_WORKERS = int(os.getenv(
+    "PASSWORD_HASHING_WORKERS",
+    str(max(1, (os.cpu_count() or 2) // 2 // max(1, int(os.getenv("WEB_CONCURRENCY", "1"))))),
+))
+# Hashes en curso admitidos por worker antes de responder 503 (backpressure)
+PASSWORD_HASHING_MAX_PENDING = int(os.getenv("PASSWORD_HASHING_MAX_PENDING", str(PASSWORD_HASHING_WORKERS * 4)))
+PASSWORD_HASHING_TIMEOUT = float(os.getenv("PASSWORD_HASHING_TIMEOUT", "5"))
+
+# Rate limiting (utils.ratelimit): contadores en un SQLite compartido por los workers del host
+RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "1") == "1"
+RATELIMIT_DB_PATH = os.getenv("RATELIMIT_DB_PATH", str(LOCAL_STATE_DIR / "ratelimit.sqlite3"))
+# Por grupo: {"ip"|"user": "N/periodo"} con periodo s, m, h o d (p. ej. "5/15m")
+RATELIMITS = {
+    "signup": {"ip": os.getenv("RATELIMIT_SIGNUP_IP", "5/h")},
+    # "user" en login es el nombre de usuario que se intenta (protege cada cuenta)
+    "login": {"ip": os.getenv("RATELIMIT_LOGIN_IP", "30/m"), "user": os.getenv("RATELIMIT_LOGIN_USER", "10/15m")},
+    "create_meeting": {"ip": os.getenv("RATELIMIT_MEETING_IP", "60/m"), "user": os.getenv("RATELIMIT_MEETING_USER", "20/m")},
+}
+
 LOGIN_URL = "/admin/login/"
 LOGIN_REDIRECT_URL = "/"
 
@@ -61,7 +99,61 @@ LOGIN_REDIRECT_URL = "/"
 JITSI_BASE_URL = os.getenv("JITSI_BASE_URL", "http://localhost:8080")
 JITSI_XMPP_REALM = os.getenv("JITSI_XMPP_REALM", "meet.localhost")
 JITSI_JWT_SECRET = os.getenv("JITSI_JWT_SECRET", "")
+# Al aprobar solicitudes se escribe en authreg una contraseña de Jitsi derivada del hash
+# (ver utils.jitsi.prosody_credential). Solo se puede desactivar si hay JITSI_JWT_SECRET.
+JITSI_AUTHREG_SYNC = os.getenv("JITSI_AUTHREG_SYNC", "1") == "1"
 JITSI_APP_ID = os.getenv("JITSI_APP_ID", "django-jitsi")
+JITSI_STUN_SERVERS = os.getenv("JVB_STUN_SERVERS", "stun.l.google.com:19302,stun1.l.google.com:19302")
+JITSI_TURN_SERVER = os.getenv("TURN_SERVER", "")
+JITSI_TURN_USERNAME = os.getenv("TURN_USERNAME", "")
+JITSI_TURN_PASSWORD = os.getenv("TURN_PASSWORD", "")
+# static-auth-secret de coturn: si está definido se usan credenciales TURN efímeras
+JITSI_TURN_SECRET = os.getenv("TURN_SECRET", "")
+JITSI_TURN_CREDENTIAL_TTL = int(os.getenv("TURN_CREDENTIAL_TTL", "3600"))
+# Las peticiones de una misma ventana (segundos) comparten credenciales TURN; menor que el TTL
+JITSI_TURN_CREDENTIAL_WINDOW = int(os.getenv("TURN_CREDENTIAL_WINDOW", "300"))
+# Regiones ICE por prefijo de IP del cliente (JSON), p. ej.:
+# {"eu": {"prefixes": ["81.0.0.0/8"], "stun": ["stun.eu.example.com:3478"], "turn": ["turn.eu.example.com:3478"]}}
+JITSI_ICE_REGIONS = json.loads(os.getenv("JITSI_ICE_REGIONS", "{}"))
+# Salas con más participantes esperados que este valor usan JVB en lugar de P2P
+JITSI_P2P_MAX_PARTICIPANTS = int(os.getenv("JITSI_P2P_MAX_PARTICIPANTS", "2"))
+# Despliegues de Jitsi entre los que se reparten las salas (JSON), p. ej.:
+# [{"name": "meet-1", "url": "https://meet1.example.com", "weight": 1}, ...]
+# Las salas creadas antes de configurar shards quedan en el shard "default" y, como las de
+# un shard que se retira de la lista, siguen en JITSI_BASE_URL (nunca se mueven por el anillo).
+JITSI_SHARDS = json.loads(os.getenv("JITSI_SHARDS", "[]"))
+# Cola de moderación: solicitudes por lote reclamado y duración del lease
+SIGNUP_CLAIM_BATCH_SIZE = int(os.getenv("SIGNUP_CLAIM_BATCH_SIZE", "10"))
+SIGNUP_CLAIM_LEASE_SECONDS = int(os.getenv("SIGNUP_CLAIM_LEASE_SECONDS", "300"))
+# Nombres de sala generados por adelantado en cada worker (0 = bajo demanda)
+JITSI_ROOM_POOL_SIZE = int(os.getenv("JITSI_ROOM_POOL_SIZE", "0"))
+JITSI_OCTO_BIND_ADDRESS = os.getenv("JVB_OCTO_BIND_ADDRESS", "0.0.0.0")
+
+# Logging: utils.jitsi escribe JSON desde un hilo de fondo (no bloquea a los workers)
+# y limita los avisos repetidos a uno por JITSI_LOG_RATE_LIMIT segundos
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "rate_limit": {
+            "()": "utils.log.RateLimitFilter",
+            "interval": int(os.getenv("JITSI_LOG_RATE_LIMIT", "60")),
+        },
+    },
+    "handlers": {
+        "queue": {
+            "class": "utils.log.NonBlockingQueueHandler",
+            "filters": ["rate_limit"],
+        },
+    },
+    "loggers": {
+        "utils": {
+            "handlers": ["queue"],
+            "level": os.getenv("JITSI_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
 
 # Internationalization
 LANGUAGE_CODE = "es-es"
@@ -72,11 +164,30 @@ USE_TZ = True
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Usuario + perfil de la sesión en cache; se invalidan por versión al cambiar (models.principal)
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", str(6 * 3600)))
+# Estadísticas de los paneles de admin en cache (utils.singleflight): segundos frescas y
+# segundos más en los que se sirven caducadas mientras una sola petición las recalcula
+ADMIN_STATS_CACHE_TTL = int(os.getenv("ADMIN_STATS_CACHE_TTL", "10"))
+ADMIN_STATS_STALE_TTL = int(os.getenv("ADMIN_STATS_STALE_TTL", "60"))
+# L1 en memoria de cada worker delante de la cache compartida (utils.tiered_cache):
+# entradas y segundos que una copia local puede ir por detrás de los demás workers
+TIERED_CACHE_L1_SIZE = int(os.getenv("TIERED_CACHE_L1_SIZE", "2048"))
+TIERED_CACHE_L1_TTL = float(os.getenv("TIERED_CACHE_L1_TTL", "1"))
+
 # Cache configuration
+# Compartida por todos los workers del host (utils.sqlite_cache): invalidar una
+# clave en un worker la invalida en todos
+# Guarda usuarios con el hash de su contraseña (models.principal): mantener
+# CACHE_DB_PATH en un directorio privado, como la base de datos
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'utils.sqlite_cache.SQLiteCache',
+        'LOCATION': os.getenv("CACHE_DB_PATH", str(LOCAL_STATE_DIR / "cache.sqlite3")),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv("CACHE_MAX_ENTRIES", "50000")),
+            'MAX_SIZE': int(os.getenv("CACHE_MAX_SIZE", str(64 * 1024 * 1024))),
+        },
     }
 }
 
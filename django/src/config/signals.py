@@ -15,4 +15,11 @@ def sync_user_to_authreg(sender, instance, created, **kwargs):
             cursor.execute("""
                 INSERT OR REPLACE INTO authreg (username, realm, password)
                 VALUES (%s, %s, %s)
-            """, [instance.username, XMPP_REALM, instance._plain_password])
\ No newline at end of file
+            """, [instance.username, XMPP_REALM, instance._plain_password])
+    elif getattr(instance, '_password', None) is not None:
+        # set_password: la contraseña de Jitsi derivada del hash anterior ya no vale
+        from utils.jitsi import prosody_credential
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE authreg SET password = %s WHERE username = %s AND realm = %s
+            """, [prosody_credential(instance.username, instance.password), instance.username, XMPP_REALM])
@@ -0,0 +1,175 @@
+"""
+Aprobación y rechazo de solicitudes de registro en bloque
+
+Pensado para importaciones de eventos con miles de solicitudes: todo ocurre
+en una transacción, con un número de consultas que no depende del tamaño del
+lote (salvo el troceado de sentencias muy grandes).
+
+La transición de estado es lo primero que se ejecuta y es un ``UPDATE``
+condicional (``WHERE status='pending'`` y sin reclamar por otro admin): si dos
+admins deciden la misma solicitud a la vez, solo uno la cambia y solo ese
+crea el usuario.
+"""
+import uuid
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from utils.jitsi import get_config, prosody_credential
+
+from . import counters
+from .models import SignupRequest, UserProfile
+from .moderation import available_to
+from .principal import invalidate_users
+
+User = get_user_model()
+
+# Filas por sentencia en los INSERT en bloque (límite de variables de SQLite)
+BATCH_SIZE = 300
+
+
+@dataclass
+class ApprovalResult:
+    """Resumen de una aprobación en bloque"""
+    approved: int = 0
+    created_users: list = field(default_factory=list)
+    existing_users: list = field(default_factory=list)
+
+
+def username_for(email: str) -> str:
+    """Nombre de usuario derivado del email (parte local)"""
+    return email.split("@")[0]
+
+
+def _split_name(full_name: str):
+    parts = full_name.split()
+    return (parts[0] if parts else ""), " ".join(parts[1:])
+
+
+def sync_authreg(credentials):
+    """
+    Insertar o actualizar credenciales en authreg con un único executemany
+
+    Args:
+        credentials: Iterable de (username, password)
+    """
+    realm = getattr(settings, "JITSI_XMPP_REALM", "meet.localhost")
+    rows = [(username, realm, password) for username, password in credentials]
+    if rows:
+        with connection.cursor() as cursor:
+            cursor.executemany("INSERT OR REPLACE INTO authreg (username, realm, password) VALUES (%s, %s, %s)", rows)
+
+
+def prosody_password(user):
+    """
+    Contraseña de Jitsi (authreg) que se puede mostrar a ``user``, o None
+
+    Solo la derivada con prosody_credential: si authreg guarda otra (p. ej.
+    la del admin inicial) o no hay fila, no hay nada que mostrar.
+    """
+    credential = prosody_credential(user.username, user.password)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM authreg WHERE username = %s AND realm = %s AND password = %s",
+            [user.username, getattr(settings, "JITSI_XMPP_REALM", "meet.localhost"), credential],
+        )
+        return credential if cursor.fetchone() else None
+
+
+def approve_requests(queryset, decided_by=None, decision_note="") -> ApprovalResult:
+    """
+    Aprobar las solicitudes pendientes de ``queryset`` y crear sus usuarios
+
+    Los usuarios existentes (mismo email o, si no, mismo username) se
+    reutilizan; el resto se crea con ``bulk_create`` usando el hash guardado
+    en la solicitud, sin volver a pasar por PBKDF2. También se crean los perfiles USER que falten y se marcan
+    las solicitudes como aprobadas.
+
+    Con JITSI_AUTHREG_SYNC, los usuarios nuevos reciben en authreg (en la misma
+    transacción) una contraseña de Jitsi derivada del hash con
+    prosody_credential: solo se conoce el hash, que no sirve para el login de
+    Prosody. El usuario la ve en el detalle de las salas que piden login.
+    """
+    result = ApprovalResult()
+    decided_at = now()
+    token = uuid.uuid4()
+    with transaction.atomic():
+        result.approved = _transition(queryset, SignupRequest.APPROVED, decided_by, decision_note, decided_at, token)
+        if not result.approved:
+            return result
+        pending = list(SignupRequest.objects.filter(claim_token=token).order_by("pk"))
+
+        emails = {req.email for req in pending}
+        usernames = {username_for(req.email) for req in pending}
+        existing = list(User.objects.filter(Q(email__in=emails) | Q(username__in=usernames)))
+        by_email = {user.email: user for user in existing}
+        by_username = {user.username: user for user in existing}
+
+        new_users = []
+        for req in pending:
+            username = username_for(req.email)
+            user = by_email.get(req.email) or by_username.get(username)
+            if user is None:
+                first_name, last_name = _split_name(req.full_name)
+                user = User(
+                    username=username,
+                    email=req.email,
+                    password=req.password_hash,  # ya hasheada en el registro
+                    first_name=first_name[:150],
+                    last_name=last_name[:150],
+                )
+                new_users.append((user, req))
+                by_email[req.email] = by_username[username] = user
+            elif user.pk is not None and user not in result.existing_users:
+                result.existing_users.append(user)
+
+        created = User.objects.bulk_create([user for user, _ in new_users], batch_size=BATCH_SIZE)
+        result.created_users = created
+        counters.apply({counters.USERS: len(created), counters.USERS_ACTIVE: len(created)})
+
+        users = created + result.existing_users
+        with_profile = set(UserProfile.objects.filter(user__in=users).values_list("user_id", flat=True))
+        profiles = UserProfile.objects.bulk_create(
+            [UserProfile(user=user, role=UserProfile.ROLE_USER) for user in users if user.pk not in with_profile],
+            batch_size=BATCH_SIZE,
+        )
+        counters.apply({counters.role_key(UserProfile.ROLE_USER): len(profiles)})
+        # bulk_create no dispara señales: los usuarios existentes acaban de recibir perfil
+        invalidate_users(profile.user_id for profile in profiles)
+
+        if get_config().authreg_sync:
+            sync_authreg((user.username, prosody_credential(user.username, user.password)) for user in created)
+    return result
+
+
+def reject_requests(queryset, decided_by=None, decision_note="") -> int:
+    """Rechazar las solicitudes pendientes de ``queryset``; devuelve cuántas"""
+    with transaction.atomic():
+        return _transition(queryset, SignupRequest.REJECTED, decided_by, decision_note, now(), uuid.uuid4())
+
+
+def _transition(queryset, status, decided_by, decision_note, decided_at, token) -> int:
+    """
+    Compare-and-set pending -> ``status`` sobre las filas disponibles para ``decided_by``
+
+    Las filas ganadas quedan marcadas con ``token``. Devuelve cuántas.
+    """
+    won = (
+        queryset.filter(status=SignupRequest.PENDING)
+        .filter(available_to(decided_by, decided_at))
+        .update(
+            status=status,
+            decided_at=decided_at,
+            decided_by=decided_by,
+            decision_note=decision_note,
+            claimed_by=None,
+            claimed_until=None,
+            claim_token=token,
+        )
+    )
+    counters.apply({counters.signup_key(SignupRequest.PENDING): -won, counters.signup_key(status): won})
+    return won
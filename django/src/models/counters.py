@@ -0,0 +1,177 @@
+"""
+Contadores para las estadísticas de los dashboards
+
+Cada alta, baja o cambio de estado/rol ajusta la fila correspondiente de
+``Counter`` dentro de la misma transacción que el cambio, así que las vistas
+leen todas sus estadísticas con una sola consulta por clave primaria en vez
+de varios ``COUNT(*)``. Los caminos que usan ``queryset.update`` (y por tanto
+no disparan señales) deben pasar por ``bulk_update_status``. Si los
+contadores se desvían, ``manage.py rebuild_counters`` los recalcula.
+"""
+from collections import Counter as Tally
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, post_init, post_save
+
+from utils.singleflight import get_or_compute
+from utils.tiered_cache import get_tiered_cache
+
+from .models import Counter, Meeting, SignupRequest, UserProfile
+
+User = get_user_model()
+
+USERS = "users"
+USERS_ACTIVE = "users_active"
+MEETINGS = "meetings"
+SIGNUP_REQUESTS = "signup_requests"
+
+STATS_CACHE_KEY = "admin_stats"  # cached_counters
+
+# Campos de los que depende la contribución de cada modelo
+TRACKED_FIELDS = {
+    User: ("is_active",),
+    UserProfile: ("role",),
+    SignupRequest: ("status",),
+    Meeting: (),
+}
+
+
+def signup_key(status):
+    return f"signup_{status}"
+
+
+def role_key(role):
+    return f"role_{role}"
+
+
+def counter_names():
+    """Todos los contadores conocidos"""
+    return (
+        [USERS, USERS_ACTIVE, MEETINGS, SIGNUP_REQUESTS]
+        + [signup_key(status) for status, _ in SignupRequest.STATUS_CHOICES]
+        + [role_key(role) for role, _ in UserProfile.ROLE_CHOICES]
+    )
+
+
+def contributions(instance):
+    """Contadores a los que suma 1 una fila"""
+    if isinstance(instance, User):
+        return {USERS: 1, USERS_ACTIVE: 1} if instance.is_active else {USERS: 1}
+    if isinstance(instance, UserProfile):
+        return {role_key(instance.role): 1}
+    if isinstance(instance, SignupRequest):
+        return {SIGNUP_REQUESTS: 1, signup_key(instance.status): 1}
+    if isinstance(instance, Meeting):
+        return {MEETINGS: 1}
+    return {}
+
+
+def apply(deltas):
+    """Sumar los deltas a los contadores (dentro de la transacción en curso)"""
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        if Counter.objects.filter(name=name).update(value=F("value") + delta):
+            continue
+        _, created = Counter.objects.get_or_create(name=name, defaults={"value": delta})
+        if not created:
+            Counter.objects.filter(name=name).update(value=F("value") + delta)
+
+
+def read_counters():
+    """Todos los contadores en una consulta; los que no existen valen 0"""
+    values = dict.fromkeys(counter_names(), 0)
+    values.update(Counter.objects.values_list("name", "value"))
+    return values
+
+
+def cached_counters():
+    """``read_counters`` para los paneles: en cache unos segundos, calculado una sola vez"""
+    return get_or_compute(
+        STATS_CACHE_KEY, read_counters, ttl=settings.ADMIN_STATS_CACHE_TTL, stale_ttl=settings.ADMIN_STATS_STALE_TTL,
+        cache=get_tiered_cache(),
+    )
+
+
+def compute_counts(user_model=User, profile_model=UserProfile, request_model=SignupRequest, meeting_model=Meeting):
+    """Valores exactos recalculados desde las tablas (acepta modelos históricos)"""
+    values = dict.fromkeys(counter_names(), 0)
+    users = user_model.objects.aggregate(total=Count("id"), active=Count("id", filter=Q(is_active=True)))
+    values[USERS] = users["total"]
+    values[USERS_ACTIVE] = users["active"]
+    values[MEETINGS] = meeting_model.objects.count()
+    for status, n in request_model.objects.values_list("status").annotate(n=Count("id")).order_by():
+        values[signup_key(status)] = n
+        values[SIGNUP_REQUESTS] += n
+    for role, n in profile_model.objects.values_list("role").annotate(n=Count("id")).order_by():
+        values[role_key(role)] = n
+    return values
+
+
+def rebuild(counter_model=Counter, **models):
+    """Recalcular todos los contadores; devuelve {nombre: (anterior, nuevo)} de los que cambian"""
+    with transaction.atomic():
+        current = dict(counter_model.objects.values_list("name", "value"))
+        fresh = compute_counts(**models)
+        drift = {name: (current.get(name), value) for name, value in fresh.items() if current.get(name) != value}
+        for name, (_, value) in drift.items():
+            counter_model.objects.update_or_create(name=name, defaults={"value": value})
+    return drift
+
+
+def bulk_update_status(queryset, status, **fields):
+    """
+    ``queryset.update(status=...)`` de SignupRequest manteniendo los contadores
+
+    Devuelve el número de filas actualizadas.
+    """
+    with transaction.atomic():
+        before = dict(queryset.values_list("status").annotate(n=Count("id")).order_by())
+        updated = queryset.update(status=status, **fields)
+        deltas = Tally()
+        for old_status, n in before.items():
+            deltas[signup_key(old_status)] -= n
+        deltas[signup_key(status)] += sum(before.values())
+        apply(deltas)
+    return updated
+
+
+def _snapshot(instance):
+    fields = TRACKED_FIELDS[type(instance)]
+    if instance.pk is None or instance.get_deferred_fields().intersection(fields):
+        return None
+    return contributions(instance)
+
+
+def remember_contributions(sender, instance, **kwargs):
+    instance._counted = _snapshot(instance)
+
+
+def count_saved(sender, instance, created, **kwargs):
+    if created:
+        old = {}
+    else:
+        old = getattr(instance, "_counted", None)
+        if old is None:
+            # Instancia cargada con campos diferidos: no sabemos qué contaba antes
+            return
+    new = contributions(instance)
+    deltas = Tally(new)
+    deltas.subtract(old)
+    apply(deltas)
+    instance._counted = new
+
+
+def count_deleted(sender, instance, **kwargs):
+    old = getattr(instance, "_counted", None) or contributions(instance)
+    apply({name: -n for name, n in old.items()})
+    instance._counted = {}
+
+
+for _model in TRACKED_FIELDS:
+    post_init.connect(remember_contributions, sender=_model, dispatch_uid=f"counters_init_{_model.__name__}")
+    post_save.connect(count_saved, sender=_model, dispatch_uid=f"counters_save_{_model.__name__}")
+    post_delete.connect(count_deleted, sender=_model, dispatch_uid=f"counters_delete_{_model.__name__}")
@@ -0,0 +1,18 @@
+"""
+Comando de Django para recalcular los contadores de los dashboards
+"""
+from django.core.management.base import BaseCommand
+from models.counters import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la tabla de contadores desde las tablas de usuarios, solicitudes y meetings'
+
+    def handle(self, *args, **options):
+        drift = rebuild()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Contadores correctos, sin cambios'))
+            return
+        for name, (old, new) in sorted(drift.items()):
+            self.stdout.write(f'  {name}: {old} -> {new}')
+        self.stdout.write(self.style.SUCCESS(f'{len(drift)} contadores corregidos'))
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0004_meeting_is_private'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='expected_participants',
+            field=models.PositiveIntegerField(blank=True, help_text='Participantes esperados; decide entre P2P y JVB', null=True),
+        ),
+    ]
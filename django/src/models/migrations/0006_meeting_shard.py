@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+def assign_default_shard(apps, schema_editor):
+    # Las salas existentes se crearon contra JITSI_BASE_URL (shard "default")
+    Meeting = apps.get_model('models', 'Meeting')
+    Meeting.objects.filter(shard='').update(shard='default')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0005_meeting_expected_participants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='shard',
+            field=models.CharField(blank=True, default='', help_text='Despliegue de Jitsi asignado a la sala', max_length=50),
+        ),
+        migrations.RunPython(assign_default_shard, migrations.RunPython.noop),
+    ]
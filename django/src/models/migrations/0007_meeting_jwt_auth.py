@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0006_meeting_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='jwt_auth',
+            field=models.BooleanField(default=True, help_text='Salas privadas: entrar con JWT emitido por Django en lugar de login en Prosody'),
+        ),
+    ]
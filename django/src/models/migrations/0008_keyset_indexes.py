@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0007_meeting_jwt_auth'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='meeting_owner_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='signuprequest',
+            index=models.Index(fields=['-created_at', '-id'], name='signup_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='signuprequest',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='signup_status_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Índice para la paginación por cursor de admin_users sobre (date_joined, id)"""
+
+    dependencies = [
+        ('models', '0008_keyset_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE INDEX IF NOT EXISTS auth_user_joined_id_idx ON auth_user (date_joined DESC, id DESC);",
+            reverse_sql="DROP INDEX IF EXISTS auth_user_joined_id_idx;",
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+# Copia congelada de models.counters a fecha de esta migración: no importar el
+# módulo vivo, que cambia (y arrastra cache y settings) con la aplicación
+STATUSES = ('pending', 'approved', 'rejected')
+ROLES = ('ENV_ADMIN', 'WEB_ADMIN', 'USER', 'GUEST')
+
+
+def fill_counters(apps, schema_editor):
+    # Valores iniciales calculados desde las tablas existentes
+    Counter = apps.get_model('models', 'Counter')
+    User = apps.get_model('auth', 'User')
+    UserProfile = apps.get_model('models', 'UserProfile')
+    SignupRequest = apps.get_model('models', 'SignupRequest')
+    Meeting = apps.get_model('models', 'Meeting')
+
+    values = {'users': 0, 'users_active': 0, 'meetings': 0, 'signup_requests': 0}
+    values.update({f'signup_{status}': 0 for status in STATUSES})
+    values.update({f'role_{role}': 0 for role in ROLES})
+    users = User.objects.aggregate(total=Count('id'), active=Count('id', filter=Q(is_active=True)))
+    values['users'] = users['total']
+    values['users_active'] = users['active']
+    values['meetings'] = Meeting.objects.count()
+    for status, n in SignupRequest.objects.values_list('status').annotate(n=Count('id')).order_by():
+        values[f'signup_{status}'] = n
+        values['signup_requests'] += n
+    for role, n in UserProfile.objects.values_list('role').annotate(n=Count('id')).order_by():
+        values[f'role_{role}'] = n
+    Counter.objects.bulk_create([Counter(name=name, value=value) for name, value in values.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0009_auth_user_date_joined_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,5 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth import get_user_model
-from django.utils.crypto import get_random_string
 import uuid
 
 def get_user():
@@ -25,9 +24,20 @@ class SignupRequest(models.Model):
     decided_at = models.DateTimeField(null=True, blank=True)
     decided_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name="decisions")
     decision_note = models.TextField(blank=True, help_text="Nota del administrador sobre la decisión")
+    # Cola de moderación (ver models.moderation): quién tiene reclamada la solicitud y hasta cuándo
+    claimed_by = models.ForeignKey(
+        'auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name="claimed_requests"
+    )
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    claim_token = models.UUIDField(null=True, blank=True, db_index=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Paginación por cursor en admin_requests, con y sin filtro de estado
+            models.Index(fields=["-created_at", "-id"], name="signup_created_id_idx"),
+            models.Index(fields=["status", "-created_at", "-id"], name="signup_status_created_id_idx"),
+        ]
         verbose_name = "Solicitud de Registro"
         verbose_name_plural = "Solicitudes de Registro"
 
@@ -35,38 +45,22 @@ class SignupRequest(models.Model):
         return f"{self.full_name} <{self.email}> [{self.status}]"
 
     def approve(self, decided_by=None, decision_note=""):
-        """Aprobar la solicitud y crear usuario si no existe"""
-        from django.utils.timezone import now
-        
-        self.status = self.APPROVED
-        self.decided_at = now()
-        self.decided_by = decided_by
-        self.decision_note = decision_note
-        self.save()
-        
-        # Crear usuario si no existe
-        username = self.email.split("@")[0]
-        User = get_user()
-        if not User.objects.filter(username=username).exists():
-            # Usar create_user para hashear la contraseña correctamente
-            user = User.objects.create_user(
-                username=username,
-                email=self.email,
-                password='testpass123',  # Contraseña por defecto para usuarios aprobados
-                first_name=self.full_name.split()[0] if self.full_name else '',
-                last_name=' '.join(self.full_name.split()[1:]) if len(self.full_name.split()) > 1 else ''
-            )
-            # Crear perfil con rol USER
-            UserProfile.objects.get_or_create(user=user, defaults={"role": UserProfile.ROLE_USER})
+        """
+        Aprobar la solicitud y crear el usuario con el hash guardado en el registro
+
+        Devuelve False si ya no estaba pendiente o la tiene reclamada otro admin.
+        """
+        from .approval import approve_requests
+        result = approve_requests(SignupRequest.objects.filter(pk=self.pk), decided_by=decided_by, decision_note=decision_note)
+        self.refresh_from_db()
+        return result.approved == 1
 
     def reject(self, decided_by=None, decision_note=""):
-        """Rechazar la solicitud"""
-        from django.utils.timezone import now
-        self.status = self.REJECTED
-        self.decided_at = now()
-        self.decided_by = decided_by
-        self.decision_note = decision_note
-        self.save()
+        """Rechazar la solicitud; devuelve False si ya no estaba pendiente"""
+        from .approval import reject_requests
+        rejected = reject_requests(SignupRequest.objects.filter(pk=self.pk), decided_by=decided_by, decision_note=decision_note)
+        self.refresh_from_db()
+        return rejected == 1
 
 
 class UserProfile(models.Model):
@@ -158,21 +152,120 @@ class Meeting(models.Model):
     owner = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name="meetings")
     created_at = models.DateTimeField(auto_now_add=True)
     is_private = models.BooleanField(default=False, help_text="Requiere autenticación en Jitsi")
+    expected_participants = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Participantes esperados; decide entre P2P y JVB"
+    )
+    jwt_auth = models.BooleanField(
+        default=True,
+        help_text="Salas privadas: entrar con JWT emitido por Django en lugar de login en Prosody",
+    )
+    shard = models.CharField(
+        max_length=50, blank=True, default="", help_text="Despliegue de Jitsi asignado a la sala"
+    )
+
+    class Meta:
+        indexes = [
+            # Paginación por cursor de las reuniones de cada usuario (user_dashboard)
+            models.Index(fields=["owner", "-created_at", "-id"], name="meeting_owner_created_id_idx"),
+        ]
+
+    ROOM_ALLOCATION_ATTEMPTS = 3
 
     @staticmethod
     def generate_room():
-        return "room-" + get_random_string(8)
+        from utils.rooms import get_allocator
+        return get_allocator().allocate()
+
+    @classmethod
+    def create_with_room(cls, **fields):
+        """
+        Crear una reunión con un nombre de sala nuevo
+
+        Si el nombre colisiona con uno existente (IntegrityError sobre room)
+        se reintenta con otro, como mucho ROOM_ALLOCATION_ATTEMPTS veces.
+        """
+        for attempt in range(cls.ROOM_ALLOCATION_ATTEMPTS):
+            room = cls.generate_room()
+            try:
+                with transaction.atomic():
+                    return cls.objects.create(room=room, **fields)
+            except IntegrityError:
+                if attempt == cls.ROOM_ALLOCATION_ATTEMPTS - 1 or not cls.objects.filter(room=room).exists():
+                    raise
+
+    def save(self, *args, **kwargs):
+        # Fijar el shard al crear la sala para que el link no cambie al añadir shards
+        if not self.shard and self.room:
+            from utils.jitsi import shard_for_room
+            self.shard = shard_for_room(self.room).name
+        super().save(*args, **kwargs)
+
+    def jitsi_base_url(self):
+        """URL base del despliegue de Jitsi que aloja la sala"""
+        from utils.jitsi import shard_base_url
+        return shard_base_url(self.room, self.shard)
+
+    def can_join_with_token(self, user):
+        """Usuarios a los que Django emite JWT para la sala privada: propietario y registrados"""
+        if not user.is_authenticated or not user.is_active:
+            return False
+        if user.pk == self.owner_id:
+            return True
+        profile = getattr(user, "profile", None)
+        return profile is not None and profile.role in {
+            UserProfile.ROLE_ENV_ADMIN, UserProfile.ROLE_WEB_ADMIN, UserProfile.ROLE_USER
+        }
+
+    def asks_jitsi_login(self, user):
+        """Si Jitsi pedirá usuario y contraseña a ``user`` (sala privada sin JWT para él)"""
+        from utils.jitsi import get_config
+        if not self.is_private:
+            return False
+        return not (self.jwt_auth and get_config().is_secure and self.can_join_with_token(user))
 
-    def jitsi_url(self):
-        from django.conf import settings
-        base = getattr(settings, "JITSI_BASE_URL", "http://localhost:8080")
+    def private_jitsi_url(self, user):
+        """
+        Link a la sala privada para ``user``
+
+        Con JWT (por defecto) Prosody no consulta authreg al entrar; si la sala
+        desactiva jwt_auth o el usuario no está autorizado, el link va sin token
+        y Jitsi pide usuario y contraseña.
+        """
+        base = self.jitsi_base_url()
+        if self.jwt_auth and user is not None and self.can_join_with_token(user):
+            from utils.jitsi import identity_jwt
+            token = identity_jwt(self.room, user, moderator=user.pk == self.owner_id)
+            if token:
+                return f"{base}/{self.room}?jwt={token}"
+        return f"{base}/{self.room}"
+
+    def jitsi_url(self, user=None):
+        base = self.jitsi_base_url()
         if self.is_private:
-            # Para salas privadas, el usuario debe autenticarse en Jitsi
-            return f"{base}/{self.room}"
+            # Para salas privadas: JWT con identidad del usuario o login en Jitsi
+            return self.private_jitsi_url(user)
         else:
             # Para salas públicas, usar JWT si está configurado
             from utils.jitsi import generate_meeting_link
-            return generate_meeting_link(self.room, self.owner.username)
+            return generate_meeting_link(self.room, self.owner.username, base_url=base)
+
+    def media_mode(self, regions=()):
+        """
+        Transporte de media (p2p/jvb/octo) según los participantes esperados
+
+        ``regions``: regiones de los participantes (``utils.jitsi.participant_regions``)
+        """
+        from utils.jitsi import choose_media_mode
+        return choose_media_mode(self.expected_participants, regions)
+
+    def __str__(self):
+        return f"{self.room} by {self.owner.username}"
+
+
+class Counter(models.Model):
+    """Contador agregado mantenido por señales (ver models.counters)"""
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField(default=0)
 
     def __str__(self):
-        return f"{self.room} by {self.owner.username}"
\ No newline at end of file
+        return f"{self.name}={self.value}"
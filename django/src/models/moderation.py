@@ -0,0 +1,83 @@
+"""
+Cola de moderación de solicitudes de registro
+
+Cada admin reclama un lote de solicitudes pendientes durante un tiempo
+limitado (lease). Todas las transiciones son ``UPDATE ... WHERE`` condicionales
+(compare-and-set): si dos admins compiten por la misma fila, solo uno la
+modifica y el otro simplemente no la recibe. No se mantienen transacciones
+largas ni bloqueos de fila, así que varios admins vacían la cola en paralelo
+también sobre SQLite.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SignupRequest
+
+# Reintentos de reclamación cuando otro admin se adelanta con parte del lote
+CLAIM_ATTEMPTS = 3
+
+
+def lease_seconds() -> int:
+    return getattr(settings, "SIGNUP_CLAIM_LEASE_SECONDS", 300)
+
+
+def available_to(admin, at=None) -> Q:
+    """Solicitudes sin reclamar, con el lease vencido o reclamadas por ``admin``"""
+    at = at or timezone.now()
+    free = Q(claimed_by__isnull=True) | Q(claimed_until__lt=at)
+    if admin is not None and admin.pk is not None:
+        free |= Q(claimed_by=admin)
+    return free
+
+
+def claimed_by(admin, at=None):
+    """Solicitudes pendientes con un lease vigente de ``admin``"""
+    return SignupRequest.objects.filter(
+        status=SignupRequest.PENDING, claimed_by=admin, claimed_until__gte=at or timezone.now()
+    )
+
+
+def claim_batch(admin, size=None) -> list:
+    """
+    Reclamar hasta ``size`` solicitudes pendientes más antiguas para ``admin``
+
+    Renueva también el lease de las que ya tenía. Devuelve las solicitudes
+    reclamadas en esta llamada.
+    """
+    size = size or getattr(settings, "SIGNUP_CLAIM_BATCH_SIZE", 10)
+    now = timezone.now()
+    until = now + timedelta(seconds=lease_seconds())
+    claimed_by(admin, now).update(claimed_until=until)
+
+    token = uuid.uuid4()
+    won = 0
+    for _ in range(CLAIM_ATTEMPTS):
+        candidates = list(
+            SignupRequest.objects.filter(status=SignupRequest.PENDING)
+            .filter(Q(claimed_by__isnull=True) | Q(claimed_until__lt=now))
+            .order_by("created_at", "id")
+            .values_list("pk", flat=True)[:size - won]
+        )
+        if not candidates:
+            break
+        # Compare-and-set: solo se llevan las filas que siguen libres en el momento del UPDATE
+        won += (
+            SignupRequest.objects.filter(pk__in=candidates, status=SignupRequest.PENDING)
+            .filter(Q(claimed_by__isnull=True) | Q(claimed_until__lt=now))
+            .update(claimed_by=admin, claimed_until=until, claim_token=token)
+        )
+        if won >= size:
+            break
+    return list(SignupRequest.objects.filter(claim_token=token).order_by("created_at", "id"))
+
+
+def release_claims(admin, ids=None) -> int:
+    """Devolver a la cola las solicitudes reclamadas por ``admin``"""
+    qs = SignupRequest.objects.filter(status=SignupRequest.PENDING, claimed_by=admin)
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    return qs.update(claimed_by=None, claimed_until=None)
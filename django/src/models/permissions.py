@@ -1,13 +1,17 @@
 from django.core.exceptions import PermissionDenied
 
+from .principal import as_principal
 
-def require_admin(user):
-    """Requiere que el usuario sea ENV_ADMIN o WEB_ADMIN"""
-    if not user.is_authenticated or not hasattr(user, "profile") or not user.profile.is_admin_like():
+
+def require_admin(principal):
+    """Requiere que el usuario sea ENV_ADMIN o WEB_ADMIN (acepta ``request.principal`` o un usuario)"""
+    principal = as_principal(principal)
+    if not principal.is_authenticated or not principal.is_admin_like:
         raise PermissionDenied()
 
 
-def require_registered(user):
+def require_registered(principal):
     """Requiere que el usuario sea ENV_ADMIN, WEB_ADMIN o USER (no GUEST)"""
-    if not user.is_authenticated or not hasattr(user, "profile") or user.profile.role not in {"ENV_ADMIN", "WEB_ADMIN", "USER"}:
+    principal = as_principal(principal)
+    if not principal.is_authenticated or not principal.is_registered:
         raise PermissionDenied()
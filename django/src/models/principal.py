@@ -0,0 +1,195 @@
+"""
+Identidad del usuario de la petición (usuario + perfil + rol)
+
+``PrincipalMiddleware`` instala ``request.principal`` una vez por petición.
+El usuario de la sesión se carga con su perfil en una sola consulta
+(``select_related("profile")``) o, normalmente, de la cache
+(``load_user``, con la L1 del worker de ``utils.tiered_cache``), así que los permisos, las vistas y el context processor leen
+el rol sin más consultas.
+
+Invalidación: cada usuario tiene un contador de versión en la cache
+(``user_version_{id}``) que suben los post_save/post_delete de User y
+UserProfile y las rutas en bloque (``invalidate_users``). La entrada
+``user_info_{id}:{versión}`` deja de leerse en cuanto la versión sube, en
+todos los workers a la vez; por eso el TTL puede ser de horas.
+
+La cache guarda la instancia completa de User, incluido el hash de la
+contraseña: lo necesita la comprobación de la sesión de Django
+(``get_session_auth_hash``) sin volver a la base de datos. El fichero de la
+cache es material de credenciales y debe ser tan privado como la propia base
+de datos (``utils.sqlite.ensure_private``, ``LOCAL_STATE_DIR``).
+"""
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from utils.singleflight import get_or_compute
+from utils.tiered_cache import get_tiered_cache
+
+from .models import UserProfile
+
+User = get_user_model()
+
+# Las entradas versionadas no cambian nunca: pueden vivir más en la L1 del worker
+VERSIONED_L1_TTL = 60
+
+REGISTERED_ROLES = frozenset({UserProfile.ROLE_ENV_ADMIN, UserProfile.ROLE_WEB_ADMIN, UserProfile.ROLE_USER})
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Usuario autenticado (o anónimo) con su perfil ya cargado"""
+    user: object
+    profile: Optional[UserProfile] = None
+
+    @classmethod
+    def for_user(cls, user) -> "Principal":
+        if not user.is_authenticated:
+            return cls(user)
+        try:
+            profile = user.profile  # sin consulta si vino con select_related
+        except UserProfile.DoesNotExist:
+            profile = None
+        return cls(user, profile)
+
+    @property
+    def is_authenticated(self) -> bool:
+        return self.user.is_authenticated
+
+    @property
+    def role(self) -> str:
+        return self.profile.role if self.profile is not None else UserProfile.ROLE_GUEST
+
+    @property
+    def is_admin_like(self) -> bool:
+        return self.profile is not None and self.profile.is_admin_like()
+
+    @property
+    def is_registered(self) -> bool:
+        return self.profile is not None and self.profile.role in REGISTERED_ROLES
+
+    @cached_property
+    def info(self) -> Optional[dict]:
+        """Datos del usuario para las plantillas (``user_info``)"""
+        if not self.is_authenticated:
+            return None
+        return {
+            'is_authenticated': True,
+            'username': self.user.username,
+            'email': self.user.email,
+            'role': self.role,
+        }
+
+
+ANONYMOUS = Principal(AnonymousUser())
+
+
+def as_principal(obj) -> Principal:
+    """Aceptar un Principal o un usuario (código que aún pasa ``request.user``)"""
+    return obj if isinstance(obj, Principal) else Principal.for_user(obj)
+
+
+def get_principal(request) -> Principal:
+    """Principal de la petición; también sin el middleware (p. ej. RequestFactory)"""
+    principal = getattr(request, "principal", None)
+    if principal is None:
+        user = getattr(request, "user", None)
+        principal = request.principal = Principal.for_user(user) if user is not None else ANONYMOUS
+    return principal
+
+
+class PrincipalMiddleware:
+    """Instala ``request.principal`` (perezoso); va después de AuthenticationMiddleware"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: Principal.for_user(request.user))
+        return self.get_response(request)
+
+
+def _user_key(user_id) -> str:
+    return f"user_info_{user_id}"
+
+
+def _version_key(user_id) -> str:
+    return f"user_version_{user_id}"
+
+
+def _initial_version() -> int:
+    # Si el contador se pierde (desalojo) no puede volver a un valor ya usado
+    return time.time_ns() // 1000
+
+
+def bump_user_versions(user_ids):
+    """Invalidar en todos los workers lo cacheado de estos usuarios"""
+    cache = get_tiered_cache()
+    for user_id in set(user_ids):
+        key = _version_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version())
+
+
+def invalidate_users(user_ids):
+    """
+    Subir la versión ahora y otra vez al confirmar la transacción
+
+    La segunda subida descarta lo que otro worker haya cacheado leyendo la
+    fila antigua mientras la transacción seguía abierta.
+    """
+    user_ids = set(user_ids)
+    bump_user_versions(user_ids)
+    transaction.on_commit(lambda: bump_user_versions(user_ids))
+
+
+def user_version(user_id) -> int:
+    """Versión actual del usuario (se crea si no existe)"""
+    # L1 con el TTL corto: es lo que propaga las invalidaciones entre workers
+    cache = get_tiered_cache()
+    version_key = _version_key(user_id)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, _initial_version())
+        version = cache.get(version_key)
+    return version
+
+
+def load_user(user_id):
+    """
+    Usuario con su perfil ya resuelto, de la cache o de una consulta
+
+    La clave incluye la versión: tras un cambio nadie vuelve a leer la entrada
+    anterior, y al caducar el TTL una sola petición recarga el usuario
+    (``utils.singleflight``). Devuelve None si no existe (``is_active`` lo
+    comprueba el backend). La entrada incluye el hash de la contraseña.
+    """
+    return get_or_compute(
+        f"{_user_key(user_id)}:{user_version(user_id)}",
+        lambda: User._default_manager.select_related("profile").filter(pk=user_id).first(),
+        ttl=settings.USER_CACHE_TTL,
+        cache=get_tiered_cache().with_ttl(VERSIONED_L1_TTL),
+    )
+
+
+def _user_changed(sender, instance, **kwargs):
+    invalidate_users([instance.pk])
+
+
+def _profile_changed(sender, instance, **kwargs):
+    invalidate_users([instance.user_id])
+
+
+post_save.connect(_user_changed, sender=User, dispatch_uid="principal_user_save")
+post_delete.connect(_user_changed, sender=User, dispatch_uid="principal_user_delete")
+post_save.connect(_profile_changed, sender=UserProfile, dispatch_uid="principal_profile_save")
+post_delete.connect(_profile_changed, sender=UserProfile, dispatch_uid="principal_profile_delete")
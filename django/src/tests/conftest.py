@@ -1,7 +1,12 @@
 import os
+import tempfile
 import django
 from django.conf import settings
 
 # Configurar Django para los tests
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Los tests que lo necesitan activan el rate limiting con override_settings
+os.environ.setdefault('RATELIMIT_ENABLED', '0')
+# Cache y rate limiting en un directorio nuevo por ejecución (no arrastrar entradas de otras)
+os.environ.setdefault('LOCAL_STATE_DIR', os.path.join(tempfile.mkdtemp(prefix='jitsi-state-'), 'run'))
 django.setup()
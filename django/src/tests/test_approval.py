@@ -0,0 +1,240 @@
+from unittest import mock
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from models import approval, counters
+from models.admin import SignupRequestAdmin
+from models.models import SignupRequest, UserProfile
+from models.principal import load_user
+
+User = get_user_model()
+
+PASSWORD_HASH = make_password("secret123")
+
+
+def make_requests(count, start=0):
+    for i in range(start, start + count):
+        SignupRequest.objects.create(
+            email=f"user{i}@example.com", full_name=f"Nombre{i} Apellido", password_hash=PASSWORD_HASH
+        )
+
+
+def authreg_users():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT username FROM authreg ORDER BY username")
+        return [row[0] for row in cursor.fetchall()]
+
+
+class TestBulkApproval(TestCase):
+    """Tests de models.approval"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user("root")
+
+    def approve_all(self):
+        with CaptureQueriesContext(connection) as ctx:
+            result = approval.approve_requests(SignupRequest.objects.all(), decided_by=self.admin, decision_note="ok")
+        return result, len(ctx.captured_queries)
+
+    def test_creates_users_profiles_and_authreg(self):
+        """Crea usuarios con el hash de la solicitud, perfiles USER y filas de authreg"""
+        make_requests(3)
+        result, _ = self.approve_all()
+        self.assertEqual(result.approved, 3)
+        self.assertEqual(len(result.created_users), 3)
+
+        user = User.objects.get(username="user1")
+        self.assertEqual(user.email, "user1@example.com")
+        self.assertEqual((user.first_name, user.last_name), ("Nombre1", "Apellido"))
+        self.assertTrue(user.check_password("secret123"))
+        self.assertEqual(user.profile.role, UserProfile.ROLE_USER)
+
+        req = SignupRequest.objects.get(email="user1@example.com")
+        self.assertEqual(req.status, SignupRequest.APPROVED)
+        self.assertEqual(req.decided_by, self.admin)
+        self.assertEqual(req.decision_note, "ok")
+        self.assertIsNotNone(req.decided_at)
+        self.assertEqual(authreg_users(), ["user0", "user1", "user2"])
+        self.assertEqual(counters.read_counters(), counters.compute_counts())
+
+    def test_query_count_independent_of_batch_size(self):
+        """El número de consultas no crece por solicitud; solo por lotes de INSERT"""
+        make_requests(5)
+        _, five = self.approve_all()
+        make_requests(20, start=5)
+        _, twenty = self.approve_all()
+        self.assertEqual(five, twenty)
+        make_requests(400, start=25)
+        _, many = self.approve_all()
+        self.assertLess(many, five + 10)
+
+    @override_settings(JITSI_AUTHREG_SYNC=False, JITSI_JWT_SECRET="test-secret-test-secret-test-secret")
+    def test_authreg_sync_disabled(self):
+        """Con JWT configurado se puede desactivar la escritura en authreg"""
+        make_requests(2)
+        self.approve_all()
+        self.assertEqual(authreg_users(), [])
+
+    def test_reuses_existing_users(self):
+        """Un usuario con el mismo email se reutiliza y recibe el perfil que le falte"""
+        existing = User.objects.create_user("otro", email="user0@example.com")
+        self.assertFalse(hasattr(load_user(existing.pk), "profile"))
+        make_requests(2)
+        result, _ = self.approve_all()
+        self.assertEqual(result.existing_users, [existing])
+        self.assertEqual(len(result.created_users), 1)
+        self.assertEqual(User.objects.get(pk=existing.pk).profile.role, UserProfile.ROLE_USER)
+        # El perfil creado en bloque invalida el usuario cacheado
+        self.assertEqual(load_user(existing.pk).profile.role, UserProfile.ROLE_USER)
+        self.assertEqual(counters.read_counters(), counters.compute_counts())
+
+    def test_only_pending(self):
+        """Las solicitudes ya decididas no se tocan"""
+        make_requests(2)
+        SignupRequest.objects.filter(email="user0@example.com").update(status=SignupRequest.REJECTED)
+        result, _ = self.approve_all()
+        self.assertEqual(result.approved, 1)
+        self.assertFalse(User.objects.filter(username="user0").exists())
+
+    def test_reject(self):
+        """reject_requests marca como rechazadas solo las pendientes"""
+        make_requests(3)
+        approval.approve_requests(SignupRequest.objects.filter(email="user0@example.com"))
+        self.assertEqual(approval.reject_requests(SignupRequest.objects.all(), decided_by=self.admin), 2)
+        self.assertEqual(SignupRequest.objects.filter(status=SignupRequest.REJECTED).count(), 2)
+        self.assertEqual(counters.read_counters(), counters.compute_counts())
+
+    def test_admin_action(self):
+        """La acción del admin usa el servicio en bloque"""
+        make_requests(2)
+        request = RequestFactory().post("/")
+        request.user = self.admin
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        SignupRequestAdmin(SignupRequest, AdminSite()).approve_requests(request, SignupRequest.objects.all())
+        self.assertEqual(User.objects.filter(username__startswith="user").count(), 2)
+
+
+class TestBulkRequestsView(TestCase):
+    """Formulario de selección múltiple en request_list"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user("root")
+        UserProfile.objects.create(user=self.admin, role=UserProfile.ROLE_WEB_ADMIN)
+        self.client.force_login(self.admin)
+        make_requests(3)
+        self.ids = list(SignupRequest.objects.order_by("pk").values_list("pk", flat=True))
+
+    def test_list_has_bulk_form(self):
+        response = self.client.get(reverse("admin_requests"))
+        self.assertContains(response, 'id="bulk-form"')
+        self.assertContains(response, 'name="request_ids"', count=3)
+
+    def test_approve_selected(self):
+        response = self.client.post(reverse("bulk_requests"), {
+            "action": "approve", "request_ids": self.ids[:2], "status": "pending",
+        })
+        self.assertRedirects(response, reverse("admin_requests") + "?status=pending", fetch_redirect_response=False)
+        self.assertEqual(SignupRequest.objects.filter(status=SignupRequest.APPROVED).count(), 2)
+        self.assertTrue(User.objects.filter(username="user1").exists())
+
+    def test_reject_selected(self):
+        self.client.post(reverse("bulk_requests"), {"action": "reject", "request_ids": self.ids})
+        self.assertEqual(SignupRequest.objects.filter(status=SignupRequest.REJECTED).count(), 3)
+
+    def test_requires_admin(self):
+        user = User.objects.create_user("normal")
+        UserProfile.objects.create(user=user, role=UserProfile.ROLE_USER)
+        self.client.force_login(user)
+        response = self.client.post(reverse("bulk_requests"), {"action": "approve", "request_ids": self.ids})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(SignupRequest.objects.exclude(status=SignupRequest.PENDING).exists())
+
+
+class TestApprovalReusesSignupHash(TestCase):
+    """Aprobar no vuelve a hashear: el usuario recibe el hash de la solicitud"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user("root")
+        UserProfile.objects.create(user=self.admin, role=UserProfile.ROLE_WEB_ADMIN)
+        self.client.force_login(self.admin)
+        self.req = SignupRequest.objects.create(
+            email="alice@example.com", full_name="Alice Doe", password_hash=PASSWORD_HASH
+        )
+
+    def test_no_pbkdf2_on_approval(self):
+        """Ni la vista ni SignupRequest.approve ejecutan el hasher"""
+        with mock.patch("django.contrib.auth.hashers.PBKDF2PasswordHasher.encode", side_effect=AssertionError):
+            response = self.client.post(reverse("approve_request", args=[self.req.pk]), {"decision_note": "ok"})
+        self.assertEqual(response.status_code, 302)
+        user = User.objects.get(username="alice")
+        self.assertEqual(user.password, PASSWORD_HASH)
+        self.client.logout()
+        self.assertTrue(self.client.login(username="alice", password="secret123"))
+
+    def test_model_approve(self):
+        """SignupRequest.approve crea el usuario sin contraseña por defecto"""
+        self.req.approve(decided_by=self.admin, decision_note="ok")
+        self.assertEqual(self.req.status, SignupRequest.APPROVED)
+        self.assertEqual(self.req.decided_by, self.admin)
+        user = User.objects.get(username="alice")
+        self.assertFalse(user.check_password("testpass123"))
+        self.assertTrue(user.check_password("secret123"))
+
+    def test_prosody_credential(self):
+        """authreg recibe una credencial derivada del hash, no el hash"""
+        from utils.jitsi import prosody_credential
+        self.req.approve()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT password FROM authreg WHERE username = %s", ["alice"])
+            (stored,) = cursor.fetchone()
+        self.assertEqual(stored, prosody_credential("alice", PASSWORD_HASH))
+        self.assertNotIn(PASSWORD_HASH, stored)
+        self.assertNotEqual(stored, prosody_credential("alice", make_password("otra")))
+
+    def test_password_change_updates_authreg(self):
+        """Al cambiar la contraseña, authreg recibe la credencial del nuevo hash"""
+        self.req.approve()
+        user = User.objects.get(username="alice")
+        old = approval.prosody_password(user)
+        user.set_password("nueva-clave-123")
+        user.save()
+        self.assertIsNotNone(approval.prosody_password(user))
+        self.assertNotEqual(approval.prosody_password(user), old)
+
+    def test_meeting_detail_shows_jitsi_password(self):
+        """En una sala con login en Jitsi, el usuario aprobado ve su contraseña de authreg"""
+        from models.models import Meeting
+        self.req.approve()
+        user = User.objects.get(username="alice")
+        meeting = Meeting.objects.create(room="room-login", owner=user, is_private=True, jwt_auth=False)
+        self.client.force_login(user)
+        response = self.client.get(reverse("meeting_detail", args=[meeting.pk]))
+        self.assertContains(response, approval.prosody_password(user))
+        self.assertIn("no-store", response["Cache-Control"])
+
+    def test_create_meeting_with_prosody_login(self):
+        """El formulario permite crear salas privadas con login en Jitsi"""
+        from models.models import Meeting
+        self.client.post(reverse("create_meeting"), {"is_private": "1", "prosody_login": "1"})
+        meeting = Meeting.objects.get(owner=self.admin)
+        self.assertTrue(meeting.is_private)
+        self.assertFalse(meeting.jwt_auth)
+
+    def test_only_pending_can_be_approved(self):
+        """Aprobar una solicitud ya rechazada no crea usuario"""
+        self.req.reject()
+        self.client.post(reverse("approve_request", args=[self.req.pk]))
+        self.req.refresh_from_db()
+        self.assertEqual(self.req.status, SignupRequest.REJECTED)
+        self.assertFalse(User.objects.filter(username="alice").exists())
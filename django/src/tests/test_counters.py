@@ -0,0 +1,131 @@
+from io import StringIO
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from models import counters
+from models.admin import SignupRequestAdmin
+from models.models import Counter, Meeting, SignupRequest, UserProfile
+from utils.tiered_cache import get_tiered_cache
+
+User = get_user_model()
+
+
+class TestCounters(TestCase):
+    """La tabla de contadores sigue a los cambios de los modelos"""
+
+    def assertCountersMatch(self):
+        self.assertEqual(counters.read_counters(), counters.compute_counts())
+
+    def test_users_and_profiles(self):
+        """Altas, cambios de is_active y de rol, y bajas en cascada"""
+        user = User.objects.create_user("ana")
+        profile = UserProfile.objects.create(user=user, role=UserProfile.ROLE_GUEST)
+        self.assertCountersMatch()
+
+        user.is_active = False
+        user.save()
+        profile.role = UserProfile.ROLE_USER
+        profile.save()
+        values = counters.read_counters()
+        self.assertEqual(values[counters.USERS_ACTIVE], 0)
+        self.assertEqual(values[counters.role_key(UserProfile.ROLE_USER)], 1)
+        self.assertEqual(values[counters.role_key(UserProfile.ROLE_GUEST)], 0)
+
+        Meeting.create_with_room(owner=user)
+        User.objects.get(pk=user.pk).delete()
+        self.assertCountersMatch()
+        self.assertEqual(counters.read_counters()[counters.MEETINGS], 0)
+
+    def test_reloaded_instance(self):
+        """Una instancia cargada de la BD descuenta su estado anterior al guardarse"""
+        SignupRequest.objects.create(email="a@example.com", full_name="A")
+        req = SignupRequest.objects.get()
+        req.reject()
+        values = counters.read_counters()
+        self.assertEqual(values[counters.signup_key(SignupRequest.PENDING)], 0)
+        self.assertEqual(values[counters.signup_key(SignupRequest.REJECTED)], 1)
+
+    def test_unchanged_save_does_not_write(self):
+        """Guardar sin cambiar campos contados no toca la tabla de contadores"""
+        user = User.objects.create_user("ana")
+        with CaptureQueriesContext(connection) as ctx:
+            user.first_name = "Ana"
+            user.save()
+        self.assertFalse(any("models_counter" in q["sql"] for q in ctx.captured_queries))
+
+    def test_rolled_back_with_transaction(self):
+        """Si la transacción se deshace, el contador también"""
+        try:
+            with transaction.atomic():
+                User.objects.create_user("ana")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(counters.read_counters()[counters.USERS], 0)
+
+    def test_admin_bulk_actions(self):
+        """reject_requests y reset_to_pending (queryset.update) mantienen los contadores"""
+        for i in range(4):
+            SignupRequest.objects.create(email=f"u{i}@example.com", full_name=f"U{i}")
+        admin = SignupRequestAdmin(SignupRequest, AdminSite())
+        admin.reject_requests(None, SignupRequest.objects.filter(email__in=["u0@example.com", "u1@example.com"]))
+        self.assertEqual(counters.read_counters()[counters.signup_key(SignupRequest.REJECTED)], 2)
+        self.assertCountersMatch()
+        admin.reset_to_pending(None, SignupRequest.objects.all())
+        self.assertEqual(counters.read_counters()[counters.signup_key(SignupRequest.PENDING)], 4)
+        self.assertCountersMatch()
+
+    def test_rebuild_command(self):
+        """rebuild_counters corrige la deriva"""
+        User.objects.create_user("ana")
+        Counter.objects.filter(name=counters.USERS).update(value=42)
+        Counter.objects.filter(name=counters.MEETINGS).delete()
+        out = StringIO()
+        call_command("rebuild_counters", stdout=out)
+        self.assertIn("users: 42 -> 1", out.getvalue())
+        self.assertCountersMatch()
+
+        out = StringIO()
+        call_command("rebuild_counters", stdout=out)
+        self.assertIn("sin cambios", out.getvalue())
+
+
+class TestStatsViews(TestCase):
+    """Las vistas leen sus estadísticas con una sola consulta a la tabla de contadores"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user("root")
+        UserProfile.objects.create(user=self.admin, role=UserProfile.ROLE_ENV_ADMIN)
+        SignupRequest.objects.create(email="a@example.com", full_name="A")
+        self.client.force_login(self.admin)
+
+    def assertOneCounterLookup(self, url):
+        get_tiered_cache().clear()  # L1 del worker y cache compartida
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        sql = [q["sql"] for q in ctx.captured_queries]
+        self.assertEqual(len([q for q in sql if "models_counter" in q]), 1)
+        self.assertFalse([q for q in sql if "COUNT(" in q.upper()])
+        return response
+
+    def test_env_admin_dashboard(self):
+        response = self.assertOneCounterLookup(reverse("dashboard"))
+        self.assertEqual(response.context["pending_requests"], 1)
+        self.assertEqual(response.context["total_users"], 1)
+
+    def test_admin_requests(self):
+        response = self.assertOneCounterLookup(reverse("admin_requests"))
+        self.assertEqual(response.context["stats"]["pending"], 1)
+
+    def test_admin_users(self):
+        response = self.assertOneCounterLookup(reverse("admin_users"))
+        self.assertEqual(response.context["role_stats"][UserProfile.ROLE_ENV_ADMIN], 1)
@@ -0,0 +1,151 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model, hashers
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from models.models import SignupRequest, UserProfile
+from utils import hashing
+from utils.hashing import HashingBusy, HashingService, HashingTimeout, HashingUnavailable
+
+User = get_user_model()
+
+
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 con pocas iteraciones para que los tests sean rápidos"""
+    iterations = 1000
+
+
+FAST_HASHERS = ["tests.test_hashing.FastPBKDF2PasswordHasher", "django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TestHashingService(TestCase):
+    """Tests de utils.hashing.HashingService"""
+
+    def setUp(self):
+        self.service = HashingService(workers=1, max_pending=2, timeout=30)
+        self.addCleanup(self.service.shutdown)
+
+    def test_compatible_with_django(self):
+        """Los hashes del pool y los de Django se verifican mutuamente"""
+        encoded = self.service.make_password("secret")
+        self.assertTrue(encoded.startswith("pbkdf2_sha256$1000$"))
+        self.assertTrue(hashers.check_password("secret", encoded))
+        self.assertTrue(self.service.check_password("secret", hashers.make_password("secret")))
+        self.assertFalse(self.service.check_password("otra", encoded))
+
+    def test_unusable_and_invalid(self):
+        self.assertFalse(self.service.check_password("x", hashers.make_password(None)))
+        self.assertFalse(self.service.check_password("x", "no-es-un-hash"))
+        self.assertFalse(self.service.check_password(None, self.service.make_password("x")))
+
+    def test_inline_mode(self):
+        """workers=0 calcula en el propio proceso con el mismo formato"""
+        service = HashingService(workers=0)
+        self.assertTrue(hashers.check_password("secret", service.make_password("secret")))
+
+    @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+    def test_other_hashers_run_inline(self):
+        """Los hashers que no son PBKDF2 usan las funciones de Django"""
+        encoded = self.service.make_password("secret")
+        self.assertTrue(encoded.startswith("md5$"))
+        self.assertTrue(self.service.check_password("secret", encoded))
+        self.assertIsNone(self.service._executor)
+
+    def test_backpressure(self):
+        """Con todos los huecos ocupados se rechaza en lugar de encolar"""
+        self.service._slots.acquire()
+        self.service._slots.acquire()
+        with self.assertRaises(HashingBusy):
+            self.service.make_password("secret")
+        self.service._slots.release()
+        self.service._slots.release()
+        self.assertTrue(self.service.make_password("secret"))
+
+    def test_timeout(self):
+        """Un hash que no termina a tiempo lanza HashingTimeout"""
+        service = HashingService(workers=1, max_pending=2, timeout=0.001)
+        self.addCleanup(service.shutdown)
+        with mock.patch.object(FastPBKDF2PasswordHasher, "iterations", 5_000_000):
+            with self.assertRaises(HashingTimeout):
+                service.make_password("secret")
+
+    def test_upgrades_outdated_hash(self):
+        """Un hash con otro algoritmo o menos iteraciones se actualiza al verificarlo"""
+        old = hashers.make_password("secret", hasher="md5")
+        setter = mock.Mock()
+        self.assertTrue(self.service.check_password("secret", old, setter))
+        setter.assert_called_once_with("secret")
+
+        current = self.service.make_password("secret")
+        setter.reset_mock()
+        self.assertTrue(self.service.check_password("secret", current, setter))
+        setter.assert_not_called()
+
+    def test_make_passwords(self):
+        encoded = self.service.make_passwords(["a", "b", "c"])
+        self.assertEqual([hashers.check_password(p, e) for p, e in zip("abc", encoded)], [True] * 3)
+
+    def test_broken_pool_is_replaced(self):
+        """Si muere un proceso del pool se responde HashingUnavailable y el siguiente hash usa otro pool"""
+        self.service.make_password("secret")
+        broken = self.service._executor
+        for process in list(broken._processes.values()):
+            process.kill()
+            process.join()
+        with self.assertRaises(HashingUnavailable):
+            self.service.make_password("secret")
+        self.assertIsNot(self.service._executor, broken)
+        self.assertTrue(hashers.check_password("secret", self.service.make_password("secret")))
+        self.assertEqual(self.service._slots._value, self.service.max_pending)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, PASSWORD_HASHING_WORKERS=1)
+class TestHashingIntegration(TestCase):
+    """Registro, login y creación de admins usan el servicio de hashing"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("ana", "ana@example.com", "pass123")
+        UserProfile.objects.create(user=self.user, role=UserProfile.ROLE_USER)
+
+    def test_login_through_pool(self):
+        with mock.patch.object(HashingService, "check_password", wraps=hashing.get_service().check_password) as check:
+            response = self.client.post(reverse("home"), {"login": "1", "username": "ana", "password": "pass123"})
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+        check.assert_called_once()
+
+    def test_signup_through_pool(self):
+        with mock.patch.object(HashingService, "make_password", return_value="pbkdf2_sha256$1$s$h") as make:
+            self.client.post(reverse("home"), {
+                "signup_request": "1", "email": "bob@example.com", "full_name": "Bob", "password": "secret123",
+            })
+        make.assert_called_once_with("secret123")
+        self.assertEqual(SignupRequest.objects.get().password_hash, "pbkdf2_sha256$1$s$h")
+
+    def test_busy_returns_503(self):
+        """Con el pool saturado el login responde 503 y no autentica"""
+        with mock.patch.object(HashingService, "_run", side_effect=HashingBusy):
+            response = self.client.post(reverse("home"), {"login": "1", "username": "ana", "password": "pass123"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "5")
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+    def test_admin_login_busy_returns_503(self):
+        """/admin/login/ (LOGIN_URL) usa el mismo backend: 503 en lugar de un 500"""
+        with mock.patch.object(HashingService, "_run", side_effect=HashingBusy):
+            response = self.client.post(reverse("admin:login"), {"username": "ana", "password": "pass123"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "5")
+
+    def test_create_admins_from_env(self):
+        from config.admin_setup import create_admins_from_env
+        env = {"DJANGO_ADMINS": "root:root@example.com:s3cret,ops:ops@example.com:0ps"}
+        with mock.patch.dict("os.environ", env), mock.patch("builtins.print"):
+            with mock.patch.object(HashingService, "make_passwords", wraps=hashing.get_service().make_passwords) as make:
+                self.assertEqual(create_admins_from_env(), 2)
+        make.assert_called_once()
+        self.assertTrue(User.objects.get(username="ops").check_password("0ps"))
@@ -0,0 +1,576 @@
+from django.test import TestCase, override_settings
+from django.core.exceptions import ImproperlyConfigured
+from utils import jitsi
+
+
+class TestJitsiConfig(TestCase):
+    """Tests para la configuración cacheada de Jitsi"""
+
+    def tearDown(self):
+        jitsi.reload_config()
+
+    @override_settings(
+        JITSI_BASE_URL="https://meet.example.com/",
+        JITSI_STUN_SERVERS="stun.a.com:3478, stun.b.com:3478,",
+        JITSI_TURN_SERVER="turn.example.com:3478",
+        JITSI_TURN_USERNAME="user",
+        JITSI_TURN_PASSWORD="secret",
+    )
+    def test_config_parsed_from_settings(self):
+        """Test que la configuración se construye desde settings.JITSI_*"""
+        config = jitsi.get_config()
+        self.assertEqual(config.base_url, "https://meet.example.com")
+        self.assertEqual(config.stun_servers, ("stun.a.com:3478", "stun.b.com:3478"))
+        self.assertEqual(len(config.turn_servers), 1)
+        self.assertEqual(
+            [server["urls"] for server in jitsi.get_ice_servers()],
+            ["stun:stun.a.com:3478", "stun:stun.b.com:3478", ["turn:turn.example.com:3478"]],
+        )
+
+    def test_config_is_cached(self):
+        """Test que la configuración se construye una sola vez"""
+        self.assertIs(jitsi.get_config(), jitsi.get_config())
+
+    def test_reload_config(self):
+        """Test que reload_config reconstruye la configuración"""
+        config = jitsi.get_config()
+        with self.settings(JITSI_BASE_URL="https://other.example.com"):
+            reloaded = jitsi.reload_config()
+        self.assertIsNot(config, reloaded)
+        self.assertEqual(reloaded.base_url, "https://other.example.com")
+
+    @override_settings(JITSI_BASE_URL="meet.example.com")
+    def test_invalid_base_url(self):
+        """Test que una URL base sin esquema se rechaza"""
+        with self.assertRaises(ImproperlyConfigured):
+            jitsi.get_config()
+
+    @override_settings(JITSI_JWT_SECRET="", JITSI_AUTHREG_SYNC=False)
+    def test_requires_jwt_or_authreg(self):
+        """Test que sin JWT ni authreg la configuración se rechaza al arrancar"""
+        with self.assertRaises(ImproperlyConfigured):
+            jitsi.get_config()
+
+    @override_settings(JITSI_JWT_SECRET="test-secret-test-secret-test-secret", JITSI_BASE_URL="https://meet.example.com")
+    def test_generate_meeting_link_with_jwt(self):
+        """Test que el link incluye JWT cuando hay secreto configurado"""
+        link = jitsi.generate_meeting_link("room-test", "alice")
+        self.assertTrue(link.startswith("https://meet.example.com/room-test?jwt="))
+
+    def test_ice_servers_are_copies(self):
+        """Test que mutar la lista devuelta no altera la configuración"""
+        jitsi.get_ice_servers().clear()
+        self.assertTrue(jitsi.get_ice_servers())
+
+
+@override_settings(JITSI_JWT_SECRET="test-secret-test-secret-test-secret")
+class TestJWTCache(TestCase):
+    """Tests para la cache de JWT con TTL"""
+
+    def setUp(self):
+        jitsi.reload_config()
+
+    def tearDown(self):
+        jitsi.reload_config()
+
+    def test_token_reused_between_calls(self):
+        """Test que el mismo (sub, room, user) reutiliza el token"""
+        first = jitsi.generate_meeting_link("room-a", "alice")
+        second = jitsi.generate_meeting_link("room-a", "alice")
+        self.assertEqual(first, second)
+        stats = jitsi.jwt_cache_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_token_times_are_bucketed(self):
+        """Test que nbf/exp se alinean a la ventana configurada"""
+        import jwt
+        config = jitsi.get_config()
+        token = jitsi.cached_jitsi_jwt(room="room-a", user_name="alice")
+        payload = jwt.decode(token, options={"verify_signature": False})
+        self.assertEqual((payload["exp"] - config.jwt_lifetime) % config.jwt_bucket, 0)
+
+    def test_token_refreshed_near_expiry(self):
+        """Test que un token dentro del margen de exp se vuelve a firmar"""
+        from unittest import mock
+        config = jitsi.get_config()
+        start = 1_700_000_000
+        with mock.patch("utils.jitsi.time.time", return_value=start):
+            first = jitsi.cached_jitsi_jwt(room="room-a", user_name="alice")
+        later = start + config.jwt_lifetime - config.jwt_refresh_margin
+        with mock.patch("utils.jitsi.time.time", return_value=later):
+            second = jitsi.cached_jitsi_jwt(room="room-a", user_name="alice")
+        self.assertNotEqual(first, second)
+
+    @override_settings(JITSI_JWT_CACHE_SIZE=2)
+    def test_lru_eviction(self):
+        """Test que la cache respeta su tamaño máximo"""
+        for room in ("room-a", "room-b", "room-c"):
+            jitsi.cached_jitsi_jwt(room=room, user_name="alice")
+        stats = jitsi.jwt_cache_stats()
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["evictions"], 1)
+
+
+@override_settings(JITSI_JWT_SECRET="test-secret-test-secret-test-secret")
+class TestGenerateMeetingLinks(TestCase):
+    """Tests para la generación de links en bloque"""
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from models.models import Meeting
+        jitsi.reload_config()
+        User = get_user_model()
+        self.alice = User.objects.create(username="alice", email="alice@example.com")
+        self.bob = User.objects.create(username="bob", email="bob@example.com")
+        for i in range(3):
+            Meeting.objects.create(room=f"room-a{i}", owner=self.alice)
+        Meeting.objects.create(room="room-b0", owner=self.bob)
+        Meeting.objects.create(room="room-private", owner=self.bob, is_private=True)
+        self.Meeting = Meeting
+
+    def tearDown(self):
+        jitsi.reload_config()
+
+    def test_signer_matches_pyjwt(self):
+        """Test que HS256Signer produce el mismo token que pyjwt"""
+        import jwt
+        payload = {"room": "room-a", "exp": 1_700_000_000, "context": {"user": {"name": "ñandú"}}}
+        secret = "test-secret-test-secret-test-secret"
+        self.assertEqual(jitsi.HS256Signer(secret).sign(payload), jwt.encode(payload, secret, algorithm="HS256"))
+
+    def test_links_match_jitsi_url(self):
+        """Test que el resultado coincide con meeting.jitsi_url por fila"""
+        meetings = list(self.Meeting.objects.all())
+        links = jitsi.generate_meeting_links(meetings, self.alice)
+        self.assertEqual(links, {m.room: m.jitsi_url() for m in meetings})
+
+    def test_owners_resolved_in_one_query(self):
+        """Test que los propietarios desconocidos se resuelven en una consulta"""
+        meetings = list(self.Meeting.objects.all())
+        with self.assertNumQueries(1):
+            jitsi.generate_meeting_links(meetings)
+        jitsi.reload_config()
+        with self.assertNumQueries(0):
+            jitsi.generate_meeting_links([m for m in meetings if m.owner_id == self.alice.pk], self.alice)
+
+    def test_export_view(self):
+        """Test que la exportación de meetings usa los links en bloque del propietario"""
+        from models.models import UserProfile
+        UserProfile.objects.create(user=self.alice, role=UserProfile.ROLE_USER)
+        self.client.force_login(self.alice)
+        response = self.client.get("/meet/export/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("attachment", response["Content-Disposition"])
+        self.assertIn("no-store", response["Cache-Control"])
+        data = response.json()
+        self.assertIsNone(data["next"])
+        meetings = self.Meeting.objects.filter(owner=self.alice)
+        links = {m.room: m.jitsi_url() for m in meetings}
+        self.assertEqual({row["room"]: row["jitsi_url"] for row in data["meetings"]}, links)
+        self.assertTrue(all(row["join_url"].endswith("/join/") for row in data["meetings"]))
+
+    def test_export_view_requires_registered(self):
+        """Test que los GUEST no pueden exportar"""
+        from models.models import UserProfile
+        UserProfile.objects.create(user=self.bob, role=UserProfile.ROLE_GUEST)
+        self.client.force_login(self.bob)
+        self.assertEqual(self.client.get("/meet/export/").status_code, 403)
+
+
+@override_settings(JITSI_JWT_SECRET="test-secret-test-secret-test-secret", JITSI_BASE_URL="https://meet.example.com")
+class TestJoinMeetingView(TestCase):
+    """Tests para el endpoint de unión que firma el JWT al hacer clic"""
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from models.models import Meeting, UserProfile
+        User = get_user_model()
+        self.owner = User.objects.create(username="owner", email="owner@example.com")
+        self.guest = User.objects.create(username="guest", email="guest@example.com")
+        UserProfile.objects.create(user=self.owner, role=UserProfile.ROLE_USER)
+        UserProfile.objects.create(user=self.guest, role=UserProfile.ROLE_GUEST)
+        self.meeting = Meeting.objects.create(room="room-join", owner=self.owner)
+        self.private = Meeting.objects.create(room="room-private", owner=self.owner, is_private=True)
+
+    def test_join_requires_login(self):
+        """Test que unirse requiere autenticación"""
+        response = self.client.get(f"/meet/{self.meeting.pk}/join/")
+        self.assertTrue(response["Location"].startswith("/admin/login/"))
+
+    def test_join_redirects_with_jwt_for_current_user(self):
+        """Test que el token se firma al hacer clic y con el usuario que se une"""
+        import jwt
+        self.client.force_login(self.guest)
+        response = self.client.get(f"/meet/{self.meeting.pk}/join/")
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("no-store", response["Cache-Control"])
+        location = response["Location"]
+        self.assertTrue(location.startswith("https://meet.example.com/room-join?jwt="))
+        payload = jwt.decode(location.split("jwt=")[1], options={"verify_signature": False})
+        self.assertEqual(payload["context"]["user"]["name"], "guest")
+
+    def test_join_private_meeting_without_jwt(self):
+        """Test que los GUEST entran a salas privadas sin token (login en Jitsi)"""
+        self.client.force_login(self.guest)
+        response = self.client.get(f"/meet/{self.private.pk}/join/")
+        self.assertEqual(response["Location"], "https://meet.example.com/room-private")
+
+    def test_join_private_meeting_with_identity_jwt(self):
+        """Test que los usuarios registrados entran a salas privadas con JWT propio"""
+        import jwt
+        self.client.force_login(self.owner)
+        response = self.client.get(f"/meet/{self.private.pk}/join/")
+        location = response["Location"]
+        self.assertTrue(location.startswith("https://meet.example.com/room-private?jwt="))
+        payload = jwt.decode(location.split("jwt=")[1], options={"verify_signature": False})
+        self.assertEqual(payload["room"], "room-private")
+        self.assertEqual(payload["context"]["user"]["id"], str(self.owner.pk))
+        self.assertEqual(payload["context"]["user"]["email"], "owner@example.com")
+        self.assertTrue(payload["context"]["user"]["moderator"])
+
+    def test_join_reuses_cached_tokens(self):
+        """Test que unirse de nuevo reutiliza el token de la cache LRU, por identidad"""
+        jitsi.reload_config()
+        self.client.force_login(self.guest)
+        first = self.client.get(f"/meet/{self.meeting.pk}/join/")["Location"]
+        self.assertEqual(self.client.get(f"/meet/{self.meeting.pk}/join/")["Location"], first)
+        self.client.force_login(self.owner)
+        private = self.client.get(f"/meet/{self.private.pk}/join/")["Location"]
+        self.assertEqual(self.client.get(f"/meet/{self.private.pk}/join/")["Location"], private)
+        self.assertNotEqual(self.client.get(f"/meet/{self.meeting.pk}/join/")["Location"], first)
+        stats = jitsi.jwt_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (2, 3, 3))
+
+    def test_join_private_meeting_opt_out(self):
+        """Test que una sala con jwt_auth=False mantiene el login en Prosody"""
+        self.private.jwt_auth = False
+        self.private.save()
+        self.client.force_login(self.owner)
+        response = self.client.get(f"/meet/{self.private.pk}/join/")
+        self.assertEqual(response["Location"], "https://meet.example.com/room-private")
+
+    def test_dashboard_renders_no_tokens(self):
+        """Test que el dashboard solo contiene URLs de redirección"""
+        self.client.force_login(self.owner)
+        response = self.client.get("/dashboard/")
+        self.assertContains(response, f"/meet/{self.meeting.pk}/join/")
+        self.assertNotContains(response, "jwt=")
+
+
+@override_settings(
+    JITSI_TURN_SERVER="turn.example.com:3478",
+    JITSI_TURN_SECRET="turn-secret",
+    JITSI_TURN_CREDENTIAL_TTL=3600,
+    JITSI_TURN_CREDENTIAL_WINDOW=300,
+)
+class TestEphemeralTurnCredentials(TestCase):
+    """Tests para las credenciales TURN efímeras"""
+
+    def tearDown(self):
+        jitsi.reload_config()
+
+    def test_credentials_follow_coturn_rest_api(self):
+        """Test que username/credential siguen el formato de coturn"""
+        import base64
+        import hashlib
+        import hmac
+        credentials = jitsi.turn_credentials("alice")
+        expiry, user_id = credentials["username"].split(":")
+        self.assertEqual(user_id, "alice")
+        self.assertEqual(int(expiry), credentials["expires_at"])
+        expected = base64.b64encode(
+            hmac.new(b"turn-secret", credentials["username"].encode(), hashlib.sha1).digest()
+        ).decode()
+        self.assertEqual(credentials["credential"], expected)
+
+    def test_credentials_cached_per_window(self):
+        """Test que las llamadas de una misma ventana reutilizan las credenciales"""
+        from unittest import mock
+        start = 1_700_000_100
+        with mock.patch("utils.jitsi.time.time", return_value=start):
+            first = jitsi.turn_credentials("alice")
+            self.assertIs(first, jitsi.turn_credentials("alice"))
+        with mock.patch("utils.jitsi.time.time", return_value=start + 300):
+            self.assertNotEqual(first["username"], jitsi.turn_credentials("alice")["username"])
+
+    def test_ice_servers_include_ephemeral_turn(self):
+        """Test que get_ice_servers incluye el TURN efímero"""
+        turn = jitsi.get_ice_servers("alice")[-1]
+        self.assertEqual(turn["urls"], ["turn:turn.example.com:3478"])
+        self.assertTrue(turn["username"].endswith(":alice"))
+
+    def test_ice_servers_endpoint(self):
+        """Test que el endpoint JSON fija Cache-Control según la validez"""
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.create(username="alice", email="alice@example.com")
+        self.client.force_login(user)
+        response = self.client.get("/meet/ice-servers/")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIn(f"max-age={data['ttl']}", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+        self.assertGreater(data["ttl"], 3600 - 300)
+        self.assertTrue(data["iceServers"][-1]["username"].endswith(":alice"))
+
+    def test_ice_servers_endpoint_reads_credentials_once(self):
+        """Test que iceServers y ttl salen de la misma lectura de credenciales"""
+        import time
+        from unittest import mock
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.create(username="alice", email="alice@example.com")
+        self.client.force_login(user)
+        with mock.patch("views.views.turn_credentials", wraps=jitsi.turn_credentials) as view_read, \
+                mock.patch.object(jitsi, "turn_credentials", wraps=jitsi.turn_credentials) as inner_read:
+            data = self.client.get("/meet/ice-servers/").json()
+        self.assertEqual(view_read.call_count, 1)
+        inner_read.assert_not_called()
+        expires_at = int(data["iceServers"][-1]["username"].split(":")[0])
+        self.assertLessEqual(abs(expires_at - int(time.time()) - data["ttl"]), 1)
+
+
+class TestPrefixTable(TestCase):
+    """Tests para la tabla de prefijos IP"""
+
+    def test_longest_prefix_wins(self):
+        from utils.prefixes import PrefixTable
+        table = PrefixTable([("10.0.0.0/8", "wide"), ("10.1.0.0/16", "narrow"), ("2001:db8::/32", "v6")])
+        self.assertEqual(table.lookup("10.1.2.3"), "narrow")
+        self.assertEqual(table.lookup("10.2.0.1"), "wide")
+        self.assertEqual(table.lookup("::ffff:10.1.0.9"), "narrow")
+        self.assertEqual(table.lookup("2001:db8::1"), "v6")
+        self.assertIsNone(table.lookup("192.168.1.1"))
+        self.assertIsNone(table.lookup("not-an-ip"))
+        self.assertEqual(len(table), 3)
+
+
+@override_settings(
+    JITSI_STUN_SERVERS="stun.global.com:3478",
+    JITSI_TURN_SERVER="turn.global.com:3478",
+    JITSI_TURN_SECRET="turn-secret",
+    JITSI_ICE_REGIONS={
+        "eu": {"prefixes": ["81.0.0.0/8"], "stun": ["stun.eu.com:3478"], "turn": ["turn.eu.com:3478"]},
+    },
+)
+class TestIceRegions(TestCase):
+    """Tests para la selección de servidores ICE por región"""
+
+    def tearDown(self):
+        jitsi.reload_config()
+
+    def test_region_servers_first(self):
+        """Test que los servidores de la región del cliente van primero"""
+        servers = jitsi.get_ice_servers("alice", "81.2.3.4")
+        self.assertEqual([s["urls"] for s in servers[:2]], ["stun:stun.eu.com:3478", "stun:stun.global.com:3478"])
+        self.assertEqual(servers[-1]["urls"], ["turn:turn.eu.com:3478", "turn:turn.global.com:3478"])
+
+    def test_unknown_ip_uses_global_servers(self):
+        """Test que una IP sin región recibe la lista global"""
+        servers = jitsi.get_ice_servers("alice", "192.0.2.1")
+        self.assertEqual([s["urls"] for s in servers], ["stun:stun.global.com:3478", ["turn:turn.global.com:3478"]])
+
+    def test_create_p2p_room_orders_by_region(self):
+        """Test que create_p2p_room usa la región del cliente"""
+        room = jitsi.create_p2p_room("room-eu", "alice", client_ip="81.2.3.4")
+        self.assertEqual(room["p2p_config"]["stun_servers"][0], "stun.eu.com:3478")
+
+    @override_settings(JITSI_ICE_REGIONS={"eu": {"prefixes": ["81.0.0.0/33"]}})
+    def test_invalid_prefix(self):
+        """Test que un prefijo inválido se rechaza al cargar la configuración"""
+        with self.assertRaises(ImproperlyConfigured):
+            jitsi.get_config()
+
+
+class TestMediaPolicy(TestCase):
+    """Tests para la política P2P / JVB / Octo"""
+
+    def tearDown(self):
+        jitsi.reload_config()
+
+    def test_small_rooms_use_p2p(self):
+        self.assertEqual(jitsi.choose_media_mode(2), jitsi.MEDIA_P2P)
+        self.assertEqual(jitsi.choose_media_mode(None), jitsi.MEDIA_P2P)
+
+    def test_large_rooms_use_jvb(self):
+        self.assertEqual(jitsi.choose_media_mode(8, regions=["eu"]), jitsi.MEDIA_JVB)
+
+    def test_multi_region_rooms_use_octo(self):
+        self.assertEqual(jitsi.choose_media_mode(8, regions=["eu", "us"]), jitsi.MEDIA_OCTO)
+        with self.settings(JITSI_OCTO_BIND_ADDRESS=""):
+            self.assertEqual(jitsi.choose_media_mode(8, regions=["eu", "us"]), jitsi.MEDIA_JVB)
+
+    def test_create_p2p_room_emits_config_fragment(self):
+        """Test que create_p2p_room devuelve el fragmento de config.js del modo elegido"""
+        room = jitsi.create_p2p_room("room-big", "alice", expected_participants=10)
+        self.assertEqual(room["media_mode"], jitsi.MEDIA_JVB)
+        self.assertEqual(room["jitsi_config"], {"p2p": {"enabled": False}})
+        self.assertNotIn("p2p_config", room)
+        room = jitsi.create_p2p_room("room-small", "alice", expected_participants=2)
+        self.assertTrue(room["p2p_config"]["enabled"])
+        self.assertFalse(room["jvb_config"]["enabled"])
+
+    def test_config_url_hash(self):
+        fragment = jitsi.media_config_fragment(jitsi.MEDIA_OCTO, "eu")
+        self.assertEqual(
+            jitsi.config_url_hash(fragment),
+            "#config.p2p.enabled=false&config.testing.octo.probability=1"
+            "&config.deploymentInfo.userRegion=%22eu%22",
+        )
+
+    def test_join_large_meeting_disables_p2p(self):
+        """Test que unirse a una sala grande desactiva P2P vía hash de config"""
+        from django.contrib.auth import get_user_model
+        from models.models import Meeting
+        user = get_user_model().objects.create(username="alice", email="alice@example.com")
+        meeting = Meeting.objects.create(room="room-big", owner=user, expected_participants=10)
+        self.client.force_login(user)
+        response = self.client.get(f"/meet/{meeting.pk}/join/")
+        self.assertTrue(response["Location"].endswith("#config.p2p.enabled=false"))
+
+    @override_settings(JITSI_ICE_REGIONS={"eu": {"prefixes": ["81.0.0.0/8"]}, "us": {"prefixes": ["3.0.0.0/8"]}})
+    def test_join_from_second_region_uses_octo(self):
+        """Test que las regiones de quienes entran deciden Octo en las salas grandes"""
+        from django.contrib.auth import get_user_model
+        from models.models import Meeting
+        user = get_user_model().objects.create(username="alice", email="alice@example.com")
+        meeting = Meeting.objects.create(room="room-octo", owner=user, expected_participants=10)
+        self.client.force_login(user)
+        first = self.client.get(f"/meet/{meeting.pk}/join/", REMOTE_ADDR="81.2.3.4")["Location"]
+        self.assertNotIn("config.testing.octo", first)
+        self.assertIn("userRegion=%22eu%22", first)
+        second = self.client.get(f"/meet/{meeting.pk}/join/", REMOTE_ADDR="3.4.5.6")["Location"]
+        self.assertIn("config.testing.octo.probability=1", second)
+        self.assertIn("userRegion=%22us%22", second)
+        self.assertEqual(jitsi.participant_regions("room-octo"), ("eu", "us"))
+
+
+SHARDS = [
+    {"name": "a", "url": "https://a.example.com", "weight": 1},
+    {"name": "b", "url": "https://b.example.com", "weight": 1},
+    {"name": "c", "url": "https://c.example.com", "weight": 2},
+]
+
+
+class TestShards(TestCase):
+    """Tests para el reparto de salas entre despliegues de Jitsi"""
+
+    def tearDown(self):
+        jitsi.reload_config()
+
+    def test_hash_ring_bounded_remap(self):
+        """Test que añadir un nodo solo mueve una fracción acotada de claves"""
+        from utils.hashring import HashRing
+        ring = HashRing([("a", 1), ("b", 1), ("c", 1)])
+        keys = [f"room-{i}" for i in range(5000)]
+        before = {key: ring.get(key) for key in keys}
+        ring.add("d", 1)
+        moved = [key for key in keys if ring.get(key) != before[key]]
+        self.assertLess(len(moved) / len(keys), 0.35)
+        self.assertTrue(all(ring.get(key) == "d" for key in moved))
+
+    @override_settings(JITSI_SHARDS=SHARDS)
+    def test_meeting_shard_is_stored_and_stable(self):
+        """Test que el shard se guarda al crear la sala y se mantiene"""
+        from django.contrib.auth import get_user_model
+        from models.models import Meeting
+        user = get_user_model().objects.create(username="alice", email="alice@example.com")
+        meeting = Meeting.objects.create(room="room-shard", owner=user)
+        self.assertEqual(meeting.shard, jitsi.shard_for_room("room-shard").name)
+        self.assertTrue(meeting.jitsi_url().startswith(jitsi.shard_for_room("room-shard").base_url))
+        meeting.shard = "c"
+        self.assertTrue(meeting.jitsi_url().startswith("https://c.example.com/"))
+        self.assertEqual(jitsi.generate_meeting_links([meeting])["room-shard"], meeting.jitsi_url())
+
+    @override_settings(JITSI_SHARDS=SHARDS, JITSI_BASE_URL="https://legacy.example.com")
+    def test_legacy_and_unknown_shards_stay_on_base_url(self):
+        """Las salas del shard "default" (o de uno retirado) no pasan al anillo al configurar shards"""
+        from django.contrib.auth import get_user_model
+        from models.models import Meeting
+        user = get_user_model().objects.create(username="alice", email="alice@example.com")
+        for shard in ("default", "retirado"):
+            meeting = Meeting.objects.create(room=f"room-{shard}", owner=user, shard=shard)
+            self.assertEqual(meeting.jitsi_base_url(), "https://legacy.example.com")
+            self.assertTrue(meeting.jitsi_url().startswith(f"https://legacy.example.com/{meeting.room}"))
+
+    def test_default_single_shard(self):
+        """Test que sin JITSI_SHARDS todas las salas van a JITSI_BASE_URL"""
+        self.assertEqual(jitsi.shard_base_url("room-x"), jitsi.get_config().base_url)
+
+    @override_settings(JITSI_SHARDS=[{"name": "a", "url": "a.example.com"}])
+    def test_invalid_shard(self):
+        with self.assertRaises(ImproperlyConfigured):
+            jitsi.get_config()
+
+
+class TestJitsiLogging(TestCase):
+    """Tests para el logging estructurado y los contadores de firma"""
+
+    def setUp(self):
+        jitsi.metrics.reset()
+
+    def tearDown(self):
+        jitsi.reload_config()
+
+    def test_rate_limit_filter(self):
+        """Test que un aviso repetido solo pasa una vez por intervalo"""
+        import logging
+        from utils.log import RateLimitFilter
+        rate_limit = RateLimitFilter(interval=60)
+        records = [logging.LogRecord("utils.jitsi", logging.WARNING, "", 0, "aviso %s", (i,), None)
+                   for i in range(3)]
+        self.assertEqual([rate_limit.filter(r) for r in records], [True, False, False])
+        rate_limit.interval = 0
+        self.assertTrue(rate_limit.filter(records[0]))
+        self.assertEqual(records[0].suppressed, 2)
+
+    def test_structured_formatter(self):
+        """Test que el formatter emite JSON con los campos de extra"""
+        import json
+        import logging
+        from utils.log import StructuredFormatter
+        record = logging.LogRecord("utils.jitsi", logging.INFO, "", 0, "sala %s", ("room-a",), None)
+        record.room = "room-a"
+        data = json.loads(StructuredFormatter().format(record))
+        self.assertEqual(data["msg"], "sala room-a")
+        self.assertEqual(data["room"], "room-a")
+        self.assertEqual(data["level"], "INFO")
+
+    def test_queue_listener_after_fork(self):
+        """Test que un worker creado con fork (gunicorn --preload) vacía su propia cola"""
+        import logging
+        import multiprocessing
+        from utils.log import NonBlockingQueueHandler
+        handler = NonBlockingQueueHandler()
+        results = multiprocessing.get_context("fork").SimpleQueue()
+
+        def child():
+            import time
+            handler.emit(logging.LogRecord("utils.test", logging.DEBUG, "", 0, "desde el hijo", (), None))
+            deadline = time.monotonic() + 5
+            while not handler.queue.empty() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            listener = NonBlockingQueueHandler._listener
+            results.put((handler.queue.empty(), listener is not None and listener._thread.is_alive()))
+
+        process = multiprocessing.get_context("fork").Process(target=child)
+        process.start()
+        process.join(10)
+        self.assertEqual(results.get(), (True, True))
+
+    @override_settings(JITSI_JWT_SECRET="")
+    def test_unsigned_fallback_counted(self):
+        """Test que los links sin JWT se cuentan y no se imprimen"""
+        with self.assertLogs("utils.jitsi", level="WARNING"):
+            jitsi.generate_meeting_link("room-a", "alice")
+        self.assertEqual(jitsi.jitsi_metrics()["jwt_unsigned_fallbacks"], 1)
+
+    @override_settings(JITSI_JWT_SECRET="test-secret-test-secret-test-secret")
+    def test_signing_latency_and_failures(self):
+        """Test que se miden latencia y fallos de firma"""
+        from unittest import mock
+        jitsi.jitsi_jwt(room="room-a")
+        self.assertEqual(jitsi.jitsi_metrics()["jwt_signing_latency"]["count"], 1)
+        with mock.patch("utils.jitsi.jwt.encode", side_effect=ValueError("boom")):
+            with self.assertLogs("utils.jitsi", level="ERROR"):
+                self.assertIsNone(jitsi.jitsi_jwt(room="room-a"))
+        self.assertEqual(jitsi.jitsi_metrics()["jwt_signing_failures"], 1)
@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from models import approval, counters, moderation
+from models.models import SignupRequest, UserProfile
+
+User = get_user_model()
+
+
+def make_requests(count):
+    for i in range(count):
+        SignupRequest.objects.create(email=f"user{i}@example.com", full_name=f"U{i}", password_hash="x")
+
+
+class TestClaims(TestCase):
+    """Tests de models.moderation"""
+
+    def setUp(self):
+        self.ana = User.objects.create_user("ana")
+        self.bob = User.objects.create_user("bob")
+        make_requests(5)
+
+    def test_claims_are_exclusive(self):
+        """Dos admins reclaman lotes disjuntos, empezando por las más antiguas"""
+        mine = moderation.claim_batch(self.ana, size=3)
+        theirs = moderation.claim_batch(self.bob, size=3)
+        self.assertEqual([r.email for r in mine], ["user0@example.com", "user1@example.com", "user2@example.com"])
+        self.assertEqual(len(theirs), 2)
+        self.assertFalse({r.pk for r in mine} & {r.pk for r in theirs})
+        self.assertEqual(moderation.claim_batch(self.bob, size=3), [])
+
+    def test_expired_lease_can_be_reclaimed(self):
+        moderation.claim_batch(self.ana, size=5)
+        SignupRequest.objects.update(claimed_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(moderation.claim_batch(self.bob, size=5)), 5)
+
+    def test_reclaim_renews_own_lease(self):
+        moderation.claim_batch(self.ana, size=2)
+        SignupRequest.objects.filter(claimed_by=self.ana).update(claimed_until=timezone.now() + timedelta(seconds=5))
+        moderation.claim_batch(self.ana, size=1)
+        self.assertEqual(moderation.claimed_by(self.ana).count(), 3)
+        self.assertFalse(
+            moderation.claimed_by(self.ana).filter(claimed_until__lt=timezone.now() + timedelta(seconds=60)).exists()
+        )
+
+    def test_release(self):
+        moderation.claim_batch(self.ana, size=5)
+        self.assertEqual(moderation.release_claims(self.ana), 5)
+        self.assertEqual(len(moderation.claim_batch(self.bob, size=5)), 5)
+
+    def test_decisions_respect_claims(self):
+        """Nadie puede aprobar ni rechazar lo que otro tiene reclamado"""
+        claimed = moderation.claim_batch(self.ana, size=1)[0]
+        qs = SignupRequest.objects.filter(pk=claimed.pk)
+        self.assertEqual(approval.approve_requests(qs, decided_by=self.bob).approved, 0)
+        self.assertEqual(approval.reject_requests(qs, decided_by=self.bob), 0)
+        self.assertEqual(approval.approve_requests(qs, decided_by=self.ana).approved, 1)
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, SignupRequest.APPROVED)
+        self.assertIsNone(claimed.claimed_by)
+
+    def test_second_decision_loses(self):
+        """La segunda decisión sobre la misma solicitud no hace nada"""
+        req = SignupRequest.objects.get(email="user0@example.com")
+        stale = SignupRequest.objects.get(pk=req.pk)
+        self.assertTrue(req.approve(decided_by=self.ana))
+        self.assertFalse(stale.approve(decided_by=self.bob))
+        self.assertFalse(stale.reject(decided_by=self.bob))
+        self.assertEqual(stale.status, SignupRequest.APPROVED)
+        self.assertEqual(User.objects.filter(username="user0").count(), 1)
+        self.assertEqual(counters.read_counters(), counters.compute_counts())
+
+
+class TestModerationViews(TestCase):
+    """Botones de reclamar/liberar y decisiones en conflicto"""
+
+    def setUp(self):
+        cache.clear()
+        self.ana = User.objects.create_user("ana")
+        self.bob = User.objects.create_user("bob")
+        for user in (self.ana, self.bob):
+            UserProfile.objects.create(user=user, role=UserProfile.ROLE_WEB_ADMIN)
+        make_requests(3)
+        self.client.force_login(self.ana)
+
+    def test_claim_and_list_mine(self):
+        response = self.client.post(reverse("claim_requests"))
+        self.assertRedirects(response, reverse("admin_requests") + "?status=mine", fetch_redirect_response=False)
+        response = self.client.get(reverse("admin_requests"), {"status": "mine"})
+        self.assertEqual(len(response.context["page"]), 3)
+        self.assertContains(response, "Liberar mis reclamadas")
+
+        self.client.post(reverse("release_requests"))
+        self.assertFalse(moderation.claimed_by(self.ana).exists())
+
+    def test_claimed_by_other_is_locked(self):
+        moderation.claim_batch(self.bob, size=1)
+        response = self.client.get(reverse("admin_requests"))
+        self.assertContains(response, 'name="request_ids"', count=2)
+        self.assertContains(response, "Reclamada por bob")
+
+    def test_conflicting_approval(self):
+        req = moderation.claim_batch(self.bob, size=1)[0]
+        response = self.client.post(reverse("approve_request", args=[req.pk]))
+        self.assertRedirects(response, reverse("request_detail", args=[req.pk]), fetch_redirect_response=False)
+        req.refresh_from_db()
+        self.assertEqual(req.status, SignupRequest.PENDING)
+        self.assertFalse(User.objects.filter(username="user0").exists())
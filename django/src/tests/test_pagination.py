@@ -0,0 +1,201 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from models.models import Meeting, SignupRequest, UserProfile
+from utils.pagination import KeysetPaginator, decode_cursor, encode_cursor
+from utils.tiered_cache import get_tiered_cache
+
+User = get_user_model()
+
+
+class TestKeysetPaginator(TestCase):
+    """Tests de utils.pagination.KeysetPaginator"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("owner")
+        for _ in range(25):
+            Meeting.create_with_room(owner=self.user)
+        # Varias filas con el mismo created_at: el id desempata
+        Meeting.objects.filter(pk__in=list(Meeting.objects.values_list("pk", flat=True)[:10])).update(
+            created_at=timezone.now()
+        )
+        self.expected = list(Meeting.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+
+    def walk_forward(self, paginator):
+        pks, cursor = [], ""
+        while True:
+            page = paginator.page(after=cursor)
+            pks.extend(m.pk for m in page)
+            if not page.has_next:
+                return pks, page
+            cursor = page.next_cursor
+
+    def test_forward_covers_every_row_once(self):
+        """Recorrer todas las páginas devuelve cada fila una vez y en orden"""
+        pks, _ = self.walk_forward(KeysetPaginator(Meeting.objects.all(), per_page=7))
+        self.assertEqual(pks, self.expected)
+
+    def test_backward_navigation(self):
+        """before devuelve la página anterior en el mismo orden"""
+        paginator = KeysetPaginator(Meeting.objects.all(), per_page=7)
+        first = paginator.page()
+        second = paginator.page(after=first.next_cursor)
+        self.assertTrue(second.has_previous)
+        back = paginator.page(before=second.previous_cursor)
+        self.assertEqual([m.pk for m in back], [m.pk for m in first])
+        self.assertFalse(back.has_previous)
+        self.assertTrue(back.has_next)
+
+    def test_first_page_flags(self):
+        """La primera página no tiene anterior; la última no tiene siguiente"""
+        paginator = KeysetPaginator(Meeting.objects.all(), per_page=7)
+        first = paginator.page()
+        self.assertFalse(first.has_previous)
+        self.assertIsNone(first.previous_cursor)
+        _, last = self.walk_forward(paginator)
+        self.assertFalse(last.has_next)
+        self.assertIsNone(last.next_cursor)
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Un cursor manipulado no da error: se sirve la primera página"""
+        paginator = KeysetPaginator(Meeting.objects.all(), per_page=5)
+        for token in ("%%%", encode_cursor(["no-es-fecha", 1]), encode_cursor([1]), "bnVsbA"):
+            self.assertEqual([m.pk for m in paginator.page(after=token)], self.expected[:5])
+
+    def test_malformed_cursor_values(self):
+        """Valores del tipo equivocado, nulos o de otra longitud tampoco dan error"""
+        paginator = KeysetPaginator(Meeting.objects.all(), per_page=5)
+        for values in ([1, 2], [None, None], [{"a": 1}, "x"], [[1], 2], ["2024-01-01T00:00:00+00:00", None],
+                       ["2024-01-01T00:00:00+00:00", 1, 2], []):
+            for direction in ("after", "before"):
+                page = paginator.page(**{direction: encode_cursor(values)})
+                self.assertEqual([m.pk for m in page], self.expected[:5], (direction, values))
+
+    def test_cursor_roundtrip(self):
+        """encode_cursor/decode_cursor son inversos"""
+        self.assertEqual(decode_cursor(encode_cursor(["2024-01-01T00:00:00+00:00", 3])),
+                         ["2024-01-01T00:00:00+00:00", 3])
+
+    def test_no_offset_or_count(self):
+        """Las páginas profundas usan un seek, sin OFFSET ni COUNT"""
+        paginator = KeysetPaginator(Meeting.objects.all(), per_page=5)
+        cursor = paginator.page(after=paginator.page().next_cursor).next_cursor
+        with CaptureQueriesContext(connection) as ctx:
+            paginator.page(after=cursor)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        sql = ctx.captured_queries[0]["sql"].upper()
+        self.assertNotIn("OFFSET", sql)
+        self.assertNotIn("COUNT(", sql)
+
+
+class TestPaginatedViews(TestCase):
+    """user_dashboard y admin_requests paginan por cursor"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("owner")
+        UserProfile.objects.create(user=self.user, role=UserProfile.ROLE_USER)
+        self.admin = User.objects.create_user("admin")
+        UserProfile.objects.create(user=self.admin, role=UserProfile.ROLE_WEB_ADMIN)
+
+    def test_user_dashboard_pages(self):
+        """El dashboard muestra 20 meetings y enlaza a la siguiente página"""
+        rooms = [Meeting.create_with_room(owner=self.user).room for _ in range(25)]
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("dashboard"))
+        page = response.context["page"]
+        self.assertEqual(len(page), 20)
+        self.assertTrue(page.has_next)
+        self.assertContains(response, f"?after={page.next_cursor}")
+
+        response = self.client.get(reverse("dashboard"), {"after": page.next_cursor})
+        self.assertEqual([m.room for m in response.context["page"]], rooms[:5][::-1])
+
+    def test_admin_requests_keeps_status_filter(self):
+        """El filtro de estado se aplica y se conserva en los enlaces"""
+        for i in range(30):
+            status = SignupRequest.PENDING if i % 2 else SignupRequest.APPROVED
+            SignupRequest.objects.create(email=f"u{i}@example.com", full_name=f"U{i}", status=status)
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("admin_requests"), {"status": "pending"})
+        page = response.context["page"]
+        self.assertEqual(len(page), 15)
+        self.assertFalse(page.has_next)
+        self.assertTrue(all(r.status == SignupRequest.PENDING for r in page))
+
+        response = self.client.get(reverse("admin_requests"))
+        page = response.context["page"]
+        self.assertTrue(page.has_next)
+        response = self.client.get(reverse("admin_requests"), {"status": "approved", "after": page.next_cursor})
+        self.assertTrue(all(r.status == SignupRequest.APPROVED for r in response.context["page"]))
+
+    def test_admin_requests_malformed_cursor(self):
+        SignupRequest.objects.create(email="u@example.com", full_name="U")
+        self.client.force_login(self.admin)
+        for values in ([1, 2], [None, None], [{"a": 1}, "x"]):
+            for direction in ("after", "before"):
+                response = self.client.get(reverse("admin_requests"), {direction: encode_cursor(values)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context["page"]), 1)
+
+
+class TestAdminUsersPagination(TestCase):
+    """admin_users: cursor sobre (date_joined, id)"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user("admin")
+        UserProfile.objects.create(user=self.admin, role=UserProfile.ROLE_WEB_ADMIN)
+        for i in range(34):
+            user = User.objects.create_user(f"user{i:02d}", is_active=bool(i % 3))
+            UserProfile.objects.create(user=user, role=UserProfile.ROLE_USER)
+        self.client.force_login(self.admin)
+
+    def get(self, **params):
+        get_tiered_cache().clear()  # L1 del worker y cache compartida
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("admin_users"), params)
+        self.assertEqual(response.status_code, 200)
+        return response, ctx.captured_queries
+
+    def test_malformed_cursor(self):
+        """Un cursor manipulado en la URL devuelve la primera página, no un 500"""
+        first, _ = self.get()
+        for values in ([1, 2], [None, None], [{"a": 1}, "x"]):
+            for direction in ("after", "before"):
+                response, _ = self.get(**{direction: encode_cursor(values)})
+                self.assertEqual(response.context["page"].object_list, first.context["page"].object_list)
+
+    def test_walks_all_users(self):
+        """Las páginas cubren todos los usuarios, sin OFFSET"""
+        seen, params = [], {}
+        while True:
+            response, queries = self.get(**params)
+            page = response.context["page"]
+            seen.extend(u.pk for u in page)
+            self.assertFalse(any("OFFSET" in q["sql"].upper() for q in queries))
+            if not page.has_next:
+                break
+            params = {"after": page.next_cursor}
+        self.assertEqual(sorted(seen), sorted(User.objects.values_list("pk", flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_deep_page_same_queries_as_first(self):
+        """Una página profunda no hace más consultas que la primera"""
+        response, first = self.get()
+        response, second = self.get(after=response.context["page"].next_cursor)
+        response, third = self.get(after=response.context["page"].next_cursor)
+        self.assertEqual(len(first), len(third))
+
+    def test_totals(self):
+        """Los totales coinciden con las tablas"""
+        response, _ = self.get()
+        self.assertEqual(response.context["total_users"], 35)
+        self.assertEqual(response.context["inactive_users"], 12)
+        self.assertEqual(response.context["active_users"], 23)
+        self.assertEqual(response.context["role_stats"][UserProfile.ROLE_USER], 34)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from models.models import UserProfile
+from models.permissions import require_admin, require_registered
+from models.principal import Principal, invalidate_users, load_user
+from utils.tiered_cache import get_tiered_cache
+
+User = get_user_model()
+
+
+def auth_queries(queries):
+    """Consultas que cargan usuarios o perfiles"""
+    return [q["sql"] for q in queries if '"auth_user"' in q["sql"] or '"models_userprofile"' in q["sql"]]
+
+
+class TestPrincipal(TestCase):
+    """Tests de models.principal"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user("envadmin", password="x")
+        UserProfile.objects.create(user=self.admin, role=UserProfile.ROLE_ENV_ADMIN)
+        self.user = User.objects.create_user("user", password="x")
+        UserProfile.objects.create(user=self.user, role=UserProfile.ROLE_USER)
+        self.no_profile = User.objects.create_user("sinperfil", password="x")
+
+    def test_roles(self):
+        admin = Principal.for_user(self.admin)
+        self.assertEqual(admin.role, UserProfile.ROLE_ENV_ADMIN)
+        self.assertTrue(admin.is_admin_like)
+        self.assertEqual(admin.info["username"], "envadmin")
+
+        missing = Principal.for_user(self.no_profile)
+        self.assertEqual(missing.role, UserProfile.ROLE_GUEST)
+        self.assertFalse(missing.is_registered)
+
+        anonymous = Principal.for_user(AnonymousUser())
+        self.assertFalse(anonymous.is_authenticated)
+        self.assertIsNone(anonymous.info)
+
+    def test_permissions_accept_user_or_principal(self):
+        require_admin(Principal.for_user(self.admin))
+        require_admin(self.admin)
+        require_registered(self.user)
+        for check, user in ((require_admin, self.user), (require_registered, self.no_profile)):
+            with self.assertRaises(PermissionDenied):
+                check(Principal.for_user(user))
+        with self.assertRaises(PermissionDenied):
+            require_registered(AnonymousUser())
+
+    def test_one_auth_lookup_per_request(self):
+        """Usuario y perfil se cargan en una sola consulta aunque la vista los use varias veces"""
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "envadmin")
+        lookups = auth_queries(ctx.captured_queries)
+        self.assertEqual(len(lookups), 1, lookups)
+        self.assertIn("models_userprofile", lookups[0])
+
+    def test_cached_between_requests(self):
+        """Tras la primera petición el usuario sale de la cache compartida"""
+        self.client.force_login(self.admin)
+        self.client.get(reverse("dashboard"))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(reverse("dashboard")).status_code, 200)
+        self.assertEqual(auth_queries(ctx.captured_queries), [])
+
+    def test_role_change_invalidates(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("admin_requests")).status_code, 403)
+        profile = UserProfile.objects.get(user=self.user)
+        profile.role = UserProfile.ROLE_WEB_ADMIN
+        profile.save()
+        self.assertEqual(self.client.get(reverse("admin_requests")).status_code, 200)
+
+    def test_deactivation_invalidates(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("dashboard")).status_code, 200)
+        admin = Client()
+        admin.force_login(self.admin)
+        admin.post(reverse("toggle_user_status", args=[self.user.pk]))
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        # La sesión del usuario desactivado deja de ser válida en cualquier worker
+        self.assertEqual(self.client.get(reverse("dashboard")).status_code, 302)
+
+    def test_version_survives_eviction(self):
+        """Si se pierde el contador, una entrada antigua no vuelve a ser válida"""
+        load_user(self.user.pk)
+        get_tiered_cache().delete(f"user_version_{self.user.pk}")
+        UserProfile.objects.filter(user=self.user).update(role=UserProfile.ROLE_GUEST)
+        self.assertEqual(load_user(self.user.pk).profile.role, UserProfile.ROLE_GUEST)
+
+    def test_bulk_invalidation(self):
+        """Las rutas sin señales (queryset.update, bulk_create) invalidan explícitamente"""
+        self.assertEqual(load_user(self.user.pk).profile.role, UserProfile.ROLE_USER)
+        UserProfile.objects.filter(user=self.user).update(role=UserProfile.ROLE_GUEST)
+        self.assertEqual(load_user(self.user.pk).profile.role, UserProfile.ROLE_USER)
+        invalidate_users([self.user.pk])
+        self.assertEqual(load_user(self.user.pk).profile.role, UserProfile.ROLE_GUEST)
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from models.models import Meeting, UserProfile
+from utils.tiered_cache import get_tiered_cache
+
+User = get_user_model()
+
+
+class TestMeetingQueryCounts(TestCase):
+    """Las vistas de meetings hacen el mismo número de consultas con 1 o con N meetings"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("owner")
+        UserProfile.objects.create(user=self.user, role=UserProfile.ROLE_USER)
+        self.admin = User.objects.create_superuser("root", "root@example.com", None)
+        UserProfile.objects.create(user=self.admin, role=UserProfile.ROLE_ENV_ADMIN)
+
+    def add_meetings(self, count):
+        for _ in range(count):
+            Meeting.create_with_room(owner=self.user)
+
+    def count_queries(self, url):
+        get_tiered_cache().clear()  # L1 del worker y cache compartida
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url_for):
+        """Compara el número de consultas con 1 y con 20 meetings"""
+        self.add_meetings(1)
+        few = self.count_queries(url_for())
+        self.add_meetings(19)
+        many = self.count_queries(url_for())
+        self.assertEqual(few, many)
+
+    def test_user_dashboard(self):
+        """El dashboard no consulta el owner de cada meeting"""
+        self.client.force_login(self.user)
+        self.assertConstantQueries(lambda: reverse("dashboard"))
+
+    def test_meeting_detail(self):
+        """El owner se carga en la misma consulta que la meeting"""
+        self.client.force_login(self.admin)  # otro usuario: su consulta de sesión no se confunde con el owner
+        self.add_meetings(1)
+        meeting = Meeting.objects.get()
+        url = reverse("meeting_detail", args=[meeting.pk])
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertContains(response, "owner")
+        meeting_queries = [q["sql"] for q in ctx.captured_queries if '"models_meeting"' in q["sql"]]
+        self.assertEqual(len(meeting_queries), 1)
+        self.assertIn("JOIN", meeting_queries[0])
+        owner_lookups = [q["sql"] for q in ctx.captured_queries
+                         if q["sql"].startswith('SELECT "auth_user"') and f'"id" = {self.user.pk}' in q["sql"]]
+        self.assertEqual(owner_lookups, [])
+
+    def test_admin_changelist(self):
+        """El listado del admin usa list_select_related para el owner"""
+        self.client.force_login(self.admin)
+        self.assertConstantQueries(lambda: reverse("admin:models_meeting_changelist"))
@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from models.models import Meeting, SignupRequest, UserProfile
+from utils import ratelimit
+from utils.ratelimit import Rate, RateLimited, RateLimiter, SQLiteStore
+
+User = get_user_model()
+
+
+def _hammer(path, count, results):
+    """Proceso hijo: ``count`` peticiones contra el mismo límite"""
+    limiter = RateLimiter(SQLiteStore(path), {"g": {"ip": "50/h"}})
+    allowed = 0
+    for _ in range(count):
+        try:
+            limiter.check("g", ip="10.0.0.1", now=1000.0)
+            allowed += 1
+        except RateLimited:
+            pass
+    results.put(allowed)
+
+
+class TestRateLimiter(SimpleTestCase):
+    """Tests de utils.ratelimit"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "ratelimit.sqlite3")
+        self.store = SQLiteStore(self.path)
+        self.addCleanup(self.store.close)
+
+    def test_parse(self):
+        self.assertEqual(Rate.parse("10/m"), Rate(10, 60))
+        self.assertEqual(Rate.parse("5/15m"), Rate(5, 900))
+        self.assertEqual(Rate.parse("100 / h"), Rate(100, 3600))
+        with self.assertRaises(ValueError):
+            Rate.parse("10 por minuto")
+
+    def test_limit_within_window(self):
+        limiter = RateLimiter(self.store, {"g": {"ip": "3/m"}})
+        for _ in range(3):
+            limiter.check("g", ip="1.2.3.4", now=60.0)
+        with self.assertRaises(RateLimited) as ctx:
+            limiter.check("g", ip="1.2.3.4", now=61.0)
+        self.assertEqual(ctx.exception.scope, "ip")
+        self.assertGreater(ctx.exception.retry_after, 0)
+        # Otra IP tiene su propio contador
+        limiter.check("g", ip="5.6.7.8", now=61.0)
+
+    def test_sliding_window(self):
+        """La ventana anterior sigue contando en proporción al tiempo que queda de ella"""
+        limiter = RateLimiter(self.store, {"g": {"ip": "4/m"}})
+        for _ in range(4):
+            limiter.check("g", ip="ip", now=119.0)
+        # Al principio de la siguiente ventana la anterior pesa casi entera
+        with self.assertRaises(RateLimited) as ctx:
+            limiter.check("g", ip="ip", now=121.0)
+        # Reintentando pasado retry_after ya cabe
+        limiter.check("g", ip="ip", now=121.0 + ctx.exception.retry_after)
+        # Dos ventanas después ya no queda nada
+        for _ in range(4):
+            limiter.check("g", ip="ip", now=300.0)
+
+    def test_scopes(self):
+        """Se comprueba cada ámbito con identificador; sin identificador se omite"""
+        limiter = RateLimiter(self.store, {"login": {"ip": "100/m", "user": "2/m"}})
+        limiter.check("login", ip="ip", user="alice", now=0.0)
+        limiter.check("login", ip="ip", user="alice", now=0.0)
+        with self.assertRaises(RateLimited) as ctx:
+            limiter.check("login", ip="otra", user="alice", now=0.0)
+        self.assertEqual(ctx.exception.scope, "user")
+        for _ in range(5):
+            limiter.check("login", ip="ip", user=None, now=0.0)
+
+    def test_disabled_and_unknown_group(self):
+        limiter = RateLimiter(self.store, {"g": {"ip": "1/m"}}, enabled=False)
+        for _ in range(3):
+            limiter.check("g", ip="ip")
+        RateLimiter(self.store, {}).check("otro", ip="ip")
+
+    def test_prune(self):
+        self.store.hit("viejo", Rate(10, 60), now=0.0)
+        self.store.hit("nuevo", Rate(10, 60), now=1000.0)
+        self.assertEqual(self.store.prune(now=1000.0), 1)
+
+    def test_store_failure_fails_open(self):
+        limiter = RateLimiter(self.store, {"g": {"ip": "1/m"}})
+        with mock.patch.object(self.store, "hit", side_effect=ratelimit.sqlite3.OperationalError("locked")):
+            limiter.check("g", ip="ip")
+            limiter.check("g", ip="ip")
+
+    def test_shared_between_processes(self):
+        """Varios procesos comparten los contadores: en total solo pasan ``limit``"""
+        self.store.prune()  # crea el fichero como en un despliegue ya en marcha
+        ctx = multiprocessing.get_context("fork")
+        results = ctx.Queue()
+        workers = [ctx.Process(target=_hammer, args=(self.path, 30, results)) for _ in range(4)]
+        # Con la máquina cargada (resto de la suite) 1s de espera por el lock puede no bastar
+        with mock.patch("utils.ratelimit.BUSY_TIMEOUT", 30):
+            for worker in workers:
+                worker.start()
+        allowed = sum(results.get(timeout=30) for _ in workers)
+        for worker in workers:
+            worker.join()
+        self.assertEqual(allowed, 50)
+
+
+class TestRateLimitedViews(TestCase):
+    """Las vistas rechazan con 429 antes de hashear o escribir"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        overrides = override_settings(
+            RATELIMIT_ENABLED=True,
+            RATELIMIT_DB_PATH=os.path.join(tmp.name, "ratelimit.sqlite3"),
+            RATELIMITS={
+                "signup": {"ip": "2/h"},
+                "login": {"ip": "100/m", "user": "2/m"},
+                "create_meeting": {"user": "1/m"},
+            },
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def _signup(self, n):
+        return self.client.post(reverse("home"), {
+            "signup_request": "1",
+            "email": f"user{n}@example.com",
+            "full_name": f"User {n}",
+            "password": "ClaveSegura123!",
+        })
+
+    def test_signup(self):
+        self.assertEqual(self._signup(1).status_code, 302)
+        self._signup(2)
+        with mock.patch("views.forms.make_password") as make_password:
+            response = self._signup(3)
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response["Retry-After"]) > 0)
+        make_password.assert_not_called()
+        self.assertFalse(SignupRequest.objects.filter(email="user3@example.com").exists())
+
+    def test_login_per_username(self):
+        User.objects.create_user("alice", password="secret")
+        data = {"login": "1", "username": "alice", "password": "mal"}
+        self.client.post(reverse("home"), data)
+        self.client.post(reverse("home"), data)
+        with mock.patch("utils.hashing.check_password") as check_password:
+            response = self.client.post(reverse("home"), {**data, "username": "Alice"})
+        self.assertEqual(response.status_code, 429)
+        check_password.assert_not_called()
+        # Otra cuenta no está afectada
+        response = self.client.post(reverse("home"), {**data, "username": "bob"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_login_shares_limit(self):
+        """/admin/login/ (LOGIN_URL) cuenta contra el mismo límite que la home"""
+        User.objects.create_user("alice", password="secret")
+        self.client.post(reverse("home"), {"login": "1", "username": "alice", "password": "mal"})
+        self.client.post(reverse("admin:login"), {"username": "alice", "password": "mal"})
+        with mock.patch("utils.hashing.check_password") as check_password:
+            response = self.client.post(reverse("admin:login"), {"username": "alice", "password": "secret"})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response["Retry-After"]) > 0)
+        check_password.assert_not_called()
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+    def test_create_meeting(self):
+        user = User.objects.create_user("owner", password="x")
+        UserProfile.objects.create(user=user, role=UserProfile.ROLE_USER)
+        self.client.force_login(user)
+        self.assertEqual(self.client.post(reverse("create_meeting")).status_code, 302)
+        response = self.client.post(reverse("create_meeting"))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Meeting.objects.count(), 1)
+        # Los GET no cuentan
+        self.assertEqual(self.client.get(reverse("create_meeting")).status_code, 200)
@@ -0,0 +1,128 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase
+
+from models.models import Meeting
+from utils.rooms import ALPHABET, RANDOM_CHARS, RoomAllocator
+
+User = get_user_model()
+
+
+def _decode(chars: str) -> int:
+    value = 0
+    for char in chars:
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+
+class TestRoomAllocator(TestCase):
+    """Tests de utils.rooms.RoomAllocator"""
+
+    def test_format(self):
+        """Prefijo + 26 caracteres en base32 de Crockford"""
+        room = RoomAllocator().allocate()
+        self.assertTrue(room.startswith("room-"))
+        self.assertEqual(len(room), len("room-") + 26)
+        self.assertTrue(set(room[5:]) <= set("0123456789abcdefghjkmnpqrstvwxyz"))
+
+    def test_monotonic_within_same_millisecond(self):
+        """Con el reloj parado los nombres siguen siendo crecientes"""
+        allocator = RoomAllocator()
+        with mock.patch("utils.rooms.time.time_ns", return_value=1_700_000_000_000_000_000):
+            rooms = [allocator.allocate() for _ in range(1000)]
+        self.assertEqual(rooms, sorted(rooms))
+        self.assertEqual(len(set(rooms)), 1000)
+
+    def test_neighbours_not_guessable(self):
+        """En el mismo milisegundo los nombres no son consecutivos (no se deducen los vecinos)"""
+        allocator = RoomAllocator()
+        with mock.patch("utils.rooms.time.time_ns", return_value=1_700_000_000_000_000_000):
+            randoms = [_decode(allocator.allocate()[-RANDOM_CHARS:]) for _ in range(100)]
+        steps = {b - a for a, b in zip(randoms, randoms[1:])}
+        self.assertGreater(len(steps), 90)
+        self.assertGreater(min(steps), 1 << 32)
+
+    def test_overflow_moves_to_next_millisecond(self):
+        allocator = RoomAllocator()
+        with mock.patch("utils.rooms.time.time_ns", return_value=1_700_000_000_000_000_000):
+            first = allocator.allocate()
+            allocator._last_random = (1 << 80) - 1
+            second = allocator.allocate()
+        self.assertGreater(second, first)
+        self.assertEqual(allocator._last_ms, 1_700_000_000_001)
+
+    def test_clock_going_backwards(self):
+        """Si el reloj retrocede no se generan nombres menores"""
+        allocator = RoomAllocator()
+        with mock.patch("utils.rooms.time.time_ns", return_value=2_000_000_000_000_000_000):
+            first = allocator.allocate()
+        with mock.patch("utils.rooms.time.time_ns", return_value=1_000_000_000_000_000_000):
+            second = allocator.allocate()
+        self.assertGreater(second, first)
+
+    def test_time_ordered(self):
+        """Un milisegundo posterior produce un nombre mayor"""
+        allocator = RoomAllocator()
+        with mock.patch("utils.rooms.time.time_ns", return_value=1_000_000_000_000_000_000):
+            early = allocator.allocate()
+        with mock.patch("utils.rooms.time.time_ns", return_value=1_000_000_001_000_000_000):
+            late = allocator.allocate()
+        self.assertGreater(late, early)
+
+    def test_pool(self):
+        """La reserva sirve nombres únicos y ordenados"""
+        allocator = RoomAllocator(pool_size=64)
+        rooms = [allocator.allocate() for _ in range(200)]
+        self.assertEqual(rooms, sorted(rooms))
+        self.assertEqual(len(set(rooms)), 200)
+
+    def test_concurrent_allocation(self):
+        """100k nombres desde 8 hilos sin repetidos"""
+        allocator = RoomAllocator(pool_size=32)
+        results = []
+
+        def work():
+            results.append([allocator.allocate() for _ in range(12_500)])
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        rooms = [room for chunk in results for room in chunk]
+        self.assertEqual(len(rooms), 100_000)
+        self.assertEqual(len(set(rooms)), 100_000)
+        for chunk in results:
+            self.assertEqual(chunk, sorted(chunk))
+
+
+class TestCreateWithRoom(TestCase):
+    """Tests de Meeting.create_with_room"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="x")
+
+    def test_creates_meeting(self):
+        """Crea la reunión con un nombre generado"""
+        meeting = Meeting.create_with_room(owner=self.user, is_private=True)
+        self.assertTrue(meeting.room.startswith("room-"))
+        self.assertTrue(meeting.is_private)
+
+    def test_retries_on_collision(self):
+        """Si el nombre ya existe se reintenta con otro"""
+        Meeting.objects.create(room="room-taken", owner=self.user)
+        with mock.patch.object(Meeting, "generate_room", side_effect=["room-taken", "room-free"]):
+            meeting = Meeting.create_with_room(owner=self.user)
+        self.assertEqual(meeting.room, "room-free")
+
+    def test_gives_up_after_bounded_attempts(self):
+        """Tras ROOM_ALLOCATION_ATTEMPTS colisiones se propaga el error"""
+        Meeting.objects.create(room="room-taken", owner=self.user)
+        with mock.patch.object(Meeting, "generate_room", return_value="room-taken") as generate:
+            with self.assertRaises(IntegrityError):
+                Meeting.create_with_room(owner=self.user)
+        self.assertEqual(generate.call_count, Meeting.ROOM_ALLOCATION_ATTEMPTS)
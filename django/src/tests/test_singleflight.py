@@ -0,0 +1,123 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from utils import singleflight
+from utils.singleflight import get_or_compute
+
+
+class Computation:
+    """compute() que cuenta sus llamadas y puede tardar"""
+
+    def __init__(self, value="valor", delay=0.0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return self.value
+
+
+class TestSingleFlight(SimpleTestCase):
+    """Tests de utils.singleflight"""
+
+    def setUp(self):
+        self.cache = LocMemCache("singleflight-tests", {})
+        self.cache.clear()
+        singleflight.metrics.reset()
+
+    def test_fresh_hit(self):
+        compute = Computation()
+        self.assertEqual(get_or_compute("k", compute, ttl=60, cache=self.cache), "valor")
+        self.assertEqual(get_or_compute("k", compute, ttl=60, cache=self.cache), "valor")
+        self.assertEqual(compute.calls, 1)
+        self.assertEqual(singleflight.metrics.snapshot()["fresh_hits"], 1)
+
+    def test_none_is_cached(self):
+        compute = Computation(value=None)
+        get_or_compute("k", compute, ttl=60, cache=self.cache)
+        get_or_compute("k", compute, ttl=60, cache=self.cache)
+        self.assertEqual(compute.calls, 1)
+
+    def test_concurrent_misses_coalesce(self):
+        """Los hilos que piden la misma clave a la vez esperan a un único cálculo"""
+        compute = Computation(delay=0.2)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute("k", compute, ttl=60, cache=self.cache)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["valor"] * 8)
+        self.assertEqual(compute.calls, 1)
+
+    def test_leader_error_propagates(self):
+        def failing():
+            time.sleep(0.1)
+            raise RuntimeError("falla")
+
+        errors = []
+
+        def call():
+            try:
+                get_or_compute("k", failing, ttl=60, cache=self.cache)
+            except RuntimeError as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 3)
+        # El lock se libera: el siguiente intento vuelve a calcular
+        self.assertEqual(get_or_compute("k", Computation(), ttl=60, cache=self.cache), "valor")
+
+    def test_waits_for_other_worker(self):
+        """Con el lock de otro worker tomado se espera a su valor en lugar de calcular"""
+        self.cache.add("k:lock", 1)
+        timer = threading.Timer(0.1, lambda: self.cache.set("k", ("de otro worker", time.time() + 60)))
+        timer.start()
+        compute = Computation()
+        self.assertEqual(get_or_compute("k", compute, ttl=60, cache=self.cache), "de otro worker")
+        self.assertEqual(compute.calls, 0)
+
+    def test_wait_timeout_computes(self):
+        self.cache.add("k:lock", 1)
+        compute = Computation()
+        self.assertEqual(get_or_compute("k", compute, ttl=60, lock_timeout=0.1, cache=self.cache), "valor")
+        self.assertEqual(compute.calls, 1)
+
+    def test_stale_while_revalidate(self):
+        get_or_compute("k", Computation("viejo"), ttl=10, stale_ttl=60, cache=self.cache)
+        later = time.time() + 20
+        with mock.patch("utils.singleflight.time.time", return_value=later):
+            # Otro llamante está recalculando: se sirve el valor anterior sin esperar
+            self.cache.add("k:lock", 1)
+            compute = Computation("nuevo")
+            self.assertEqual(get_or_compute("k", compute, ttl=10, cache=self.cache), "viejo")
+            self.assertEqual(compute.calls, 0)
+            # Sin nadie recalculando, este llamante recalcula
+            self.cache.delete("k:lock")
+            self.assertEqual(get_or_compute("k", compute, ttl=10, cache=self.cache), "nuevo")
+            self.assertEqual(compute.calls, 1)
+
+    def test_refresh_error_serves_stale(self):
+        get_or_compute("k", Computation("viejo"), ttl=10, cache=self.cache)
+
+        def failing():
+            raise RuntimeError("base de datos caída")
+
+        with mock.patch("utils.singleflight.time.time", return_value=time.time() + 15):
+            self.assertEqual(get_or_compute("k", failing, ttl=10, cache=self.cache), "viejo")
+        self.assertIsNone(self.cache.get("k:lock"))
@@ -0,0 +1,164 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from utils.sqlite_cache import SQLiteCache
+
+
+def _make_cache(path, **options):
+    return SQLiteCache(path, {"OPTIONS": options})
+
+
+def _increment(path, count):
+    """Proceso hijo: ``count`` incrementos y ``count`` intentos de add"""
+    cache = _make_cache(path)
+    for i in range(count):
+        cache.incr("hits")
+        cache.add(f"once-{i}", os.getpid())
+
+
+class TestSQLiteCache(SimpleTestCase):
+    """Tests de utils.sqlite_cache.SQLiteCache"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "cache.sqlite3")
+        self.cache = _make_cache(self.path)
+        self.addCleanup(self.cache._db.close)
+
+    def test_get_set_delete(self):
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.set("a", {"role": "USER"})
+        self.cache.set("n", 5)
+        self.assertEqual(self.cache.get("a"), {"role": "USER"})
+        self.assertEqual(self.cache.get("n"), 5)
+        self.assertTrue(self.cache.delete("a"))
+        self.assertFalse(self.cache.delete("a"))
+        self.assertEqual(self.cache.get("a", "x"), "x")
+
+    def test_shared_between_instances(self):
+        """Otra instancia sobre el mismo fichero (otro worker) ve las escrituras y los borrados"""
+        other = _make_cache(self.path)
+        self.cache.set("user_info_1", "datos")
+        self.assertEqual(other.get("user_info_1"), "datos")
+        other.delete("user_info_1")
+        self.assertIsNone(self.cache.get("user_info_1"))
+
+    def test_ttl(self):
+        self.cache.set("a", 1, timeout=10)
+        self.cache.set("b", 1, timeout=None)
+        with mock.patch("utils.sqlite_cache.time.time", return_value=time.time() + 11):
+            self.assertIsNone(self.cache.get("a"))
+            self.assertFalse(self.cache.has_key("a"))
+            self.assertEqual(self.cache.get("b"), 1)
+        self.cache.set("c", 1, timeout=0)
+        self.assertIsNone(self.cache.get("c"))
+        self.assertTrue(self.cache.touch("b", timeout=10))
+        self.assertFalse(self.cache.touch("c"))
+
+    def test_add(self):
+        self.assertTrue(self.cache.add("a", 1))
+        self.assertFalse(self.cache.add("a", 2))
+        self.assertEqual(self.cache.get("a"), 1)
+        self.cache.set("b", 1, timeout=0)
+        self.assertTrue(self.cache.add("b", 2))
+        self.assertEqual(self.cache.get("b"), 2)
+
+    def test_incr_decr(self):
+        self.cache.set("n", 1)
+        self.assertEqual(self.cache.incr("n"), 2)
+        self.assertEqual(self.cache.decr("n", 5), -3)
+        self.assertEqual(self.cache.get("n"), -3)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+        self.cache.set("flag", True)
+        self.assertEqual(self.cache.incr("flag"), 2)
+        self.cache.set("big", 2 ** 70)
+        self.assertEqual(self.cache.incr("big"), 2 ** 70 + 1)
+
+    def test_many(self):
+        self.cache.set_many({"a": 1, "b": [2]})
+        self.assertEqual(self.cache.get_many(["a", "b", "c"]), {"a": 1, "b": [2]})
+        self.cache.delete_many(["a", "b"])
+        self.assertEqual(self.cache.get_many(["a", "b"]), {})
+
+    def test_clear_and_stats(self):
+        self.cache.set_many({"a": 1, "b": "x" * 100})
+        stats = self.cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertGreater(stats["bytes"], 100)
+        self.cache.clear()
+        self.assertEqual(self.cache.stats(), {"entries": 0, "bytes": 0, "evictions": 0})
+
+    def test_lru_eviction(self):
+        """Al superar MAX_ENTRIES se desalojan las entradas usadas hace más tiempo"""
+        cache = _make_cache(self.path, MAX_ENTRIES=10, CULL_FREQUENCY=2, LRU_RESOLUTION=0)
+        start = time.time()
+        for i in range(10):
+            with mock.patch("utils.sqlite_cache.time.time", return_value=start + i):
+                cache.set(f"k{i}", i)
+        with mock.patch("utils.sqlite_cache.time.time", return_value=start + 20):
+            cache.get("k0")  # k0 pasa a ser la más reciente
+        with mock.patch("utils.sqlite_cache.time.time", return_value=start + 21):
+            cache.set("k10", 10)
+        self.assertLessEqual(cache.stats()["entries"], 10)
+        self.assertEqual(cache.get("k0"), 0)
+        self.assertEqual(cache.get("k10"), 10)
+        self.assertIsNone(cache.get("k1"))
+        self.assertEqual(cache.stats()["evictions"], 5)
+
+    def test_cull_counts_expired_entries(self):
+        cache = _make_cache(self.path, MAX_ENTRIES=2, CULL_FREQUENCY=2)
+        start = time.time()
+        with mock.patch("utils.sqlite_cache.time.time", return_value=start):
+            cache.set("old", 1, timeout=1)
+            cache.set("k", 2)
+        with mock.patch("utils.sqlite_cache.time.time", return_value=start + 5):
+            cache.set("new", 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(cache.get("k"), 2)
+
+    def test_size_limit(self):
+        cache = _make_cache(self.path, MAX_SIZE=10000, LRU_RESOLUTION=0)
+        for i in range(50):
+            cache.set(f"k{i}", "x" * 1000)
+        self.assertLessEqual(cache.stats()["bytes"], 10000)
+        self.assertIsNotNone(cache.get("k49"))
+
+    def test_atomic_between_processes(self):
+        """incr y add son atómicos entre procesos"""
+        self.cache.set("hits", 0)
+        ctx = multiprocessing.get_context("fork")
+        workers = [ctx.Process(target=_increment, args=(self.path, 100)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get("hits"), 400)
+        self.assertEqual(len(self.cache.get_many([f"once-{i}" for i in range(100)])), 100)
+        self.assertEqual(self.cache.stats()["entries"], 101)
+
+    def test_private_file(self):
+        """El fichero (y su directorio) solo son accesibles para el usuario del proceso"""
+        path = os.path.join(os.path.dirname(self.path), "nuevo", "cache.sqlite3")
+        cache = _make_cache(path)
+        self.addCleanup(cache._db.close)
+        cache.set("a", 1)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+        self.assertEqual(os.stat(os.path.dirname(path)).st_mode & 0o777, 0o700)
+
+    def test_refuses_foreign_file(self):
+        """Un fichero creado antes por otro usuario (p. ej. con un pickle plantado) no se abre"""
+        open(self.path, "w").close()
+        os.chmod(self.path, 0o666)
+        cache = _make_cache(self.path)
+        with mock.patch("utils.sqlite.os.getuid", return_value=os.getuid() + 1):
+            with self.assertRaises(PermissionError):
+                cache.get("a")
+        cache.get("a")  # del mismo usuario: se abre y se restringen los permisos
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
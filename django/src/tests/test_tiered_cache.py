@@ -0,0 +1,113 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from models.models import UserProfile
+from utils.sqlite_cache import SQLiteCache
+from utils.tiered_cache import LocalLRU, TwoTierCache
+
+User = get_user_model()
+
+
+class TestLocalLRU(SimpleTestCase):
+    """Tests de utils.tiered_cache.LocalLRU"""
+
+    def test_eviction_and_expiry(self):
+        lru = LocalLRU(maxsize=2)
+        lru.set("a", 1, expires=100)
+        lru.set("b", 2, expires=100)
+        lru.get("a", now=0)  # "b" pasa a ser la menos usada
+        lru.set("c", 3, expires=100)
+        self.assertEqual(lru.get("a", now=0), 1)
+        self.assertEqual(lru.get("c", now=0), 3)
+        evicted = lru.get("b", now=0)
+        self.assertIs(lru.get("c", now=100), evicted)  # caducada: mismo resultado que desalojada
+        stats = lru.stats()
+        self.assertEqual((stats["evictions"], stats["expirations"], stats["size"]), (1, 1, 1))
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 2))
+
+    def test_mutable_values_are_copies(self):
+        lru = LocalLRU(maxsize=10)
+        lru.set("k", {"role": "USER"}, expires=100)
+        lru.get("k", now=0)["role"] = "ENV_ADMIN"
+        self.assertEqual(lru.get("k", now=0), {"role": "USER"})
+
+
+class TestTwoTierCache(SimpleTestCase):
+    """Tests de utils.tiered_cache.TwoTierCache"""
+
+    def setUp(self):
+        self.l2 = LocMemCache("tiered-tests", {})
+        self.l2.clear()
+        self.worker_a = TwoTierCache(self.l2, maxsize=100, ttl=1.0)
+        self.worker_b = TwoTierCache(self.l2, maxsize=100, ttl=1.0)
+
+    def test_l1_in_front_of_l2(self):
+        self.worker_a.set("k", "v")
+        self.assertEqual(self.worker_b.get("k"), "v")  # de la L2
+        with mock.patch.object(self.l2, "get") as l2_get:
+            self.assertEqual(self.worker_b.get("k"), "v")  # de la L1
+        l2_get.assert_not_called()
+        stats = self.worker_b.stats()
+        self.assertEqual(stats["l1"]["hits"], 1)
+        self.assertEqual(stats["l2"]["hits"], 1)
+        self.assertEqual(stats["l1"]["hit_ratio"], 0.5)
+        self.assertIsNone(self.worker_b.get("otra"))
+        self.assertEqual(self.worker_b.stats()["l2"]["misses"], 1)
+
+    def test_invalidation_reaches_other_workers_after_ttl(self):
+        self.worker_a.set("user_version_1", 1)
+        self.assertEqual(self.worker_b.get("user_version_1"), 1)
+        self.worker_a.incr("user_version_1")
+        # Local: inmediato; en el otro worker, cuando caduca su copia
+        self.assertEqual(self.worker_a.get("user_version_1"), 2)
+        self.assertEqual(self.worker_b.get("user_version_1"), 1)
+        with mock.patch("utils.tiered_cache.time.time", return_value=time.time() + 1.5):
+            self.assertEqual(self.worker_b.get("user_version_1"), 2)
+
+    def test_with_ttl_shares_l1(self):
+        versioned = self.worker_a.with_ttl(60)
+        versioned.set("user_info_1:7", "datos")
+        with mock.patch("utils.tiered_cache.time.time", return_value=time.time() + 30):
+            self.assertEqual(self.worker_a.get("user_info_1:7"), "datos")
+        self.assertEqual(self.worker_a.stats()["l1"]["hits"], 1)
+
+    def test_add_delete_go_to_l2(self):
+        self.assertTrue(self.worker_a.add("lock", 1))
+        self.assertFalse(self.worker_b.add("lock", 1))
+        self.worker_b.get("lock")
+        self.worker_a.delete("lock")
+        self.assertTrue(self.worker_a.add("lock", 1))
+
+    def test_l2_evictions(self):
+        self.assertIsNone(self.worker_a.stats()["l2"]["evictions"])  # LocMemCache no los cuenta
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        l2 = SQLiteCache(os.path.join(tmp.name, "cache.sqlite3"), {"OPTIONS": {"MAX_ENTRIES": 4}})
+        self.addCleanup(l2._db.close)
+        worker = TwoTierCache(l2, maxsize=100, ttl=1.0)
+        for i in range(5):
+            worker.set(f"k{i}", i)
+        self.assertEqual(worker.stats()["l2"]["evictions"], 1)
+
+
+class TestCacheStatsView(TestCase):
+
+    def test_admin_only(self):
+        user = User.objects.create_user("user")
+        UserProfile.objects.create(user=user, role=UserProfile.ROLE_USER)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse("cache_stats")).status_code, 403)
+
+        admin = User.objects.create_user("admin")
+        UserProfile.objects.create(user=admin, role=UserProfile.ROLE_ENV_ADMIN)
+        self.client.force_login(admin)
+        data = self.client.get(reverse("cache_stats")).json()
+        self.assertEqual(set(data["tiered"]), {"l1", "l2"})
+        self.assertIn("evictions", data["tiered"]["l1"])
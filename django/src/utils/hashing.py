@@ -0,0 +1,262 @@
+"""
+Hash de contraseñas fuera de los workers de peticiones
+
+PBKDF2 ocupa la CPU cientos de milisegundos. Este módulo lo ejecuta en un
+pool local y acotado de procesos: si ya hay demasiados hashes en curso se
+rechaza la petición (backpressure) en lugar de encolarla sin límite, y cada
+hash tiene un tiempo máximo. El formato resultante es idéntico al de
+``django.contrib.auth.hashers``; los hashers que no son PBKDF2 se ejecutan en
+línea con las funciones de Django.
+
+Cualquier vista que autentique (la home, ``/admin/login/``) puede recibir
+``HashingUnavailable``; ``HashingUnavailableMiddleware`` la convierte en un 503.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth import hashers
+from django.contrib.auth.backends import ModelBackend
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from utils import ratelimit
+from utils.pbkdf2 import pbkdf2_b64
+
+logger = logging.getLogger(__name__)
+
+RETRY_AFTER = 5  # segundos que se pide esperar al cliente cuando el pool no atiende
+
+
+class HashingUnavailable(Exception):
+    """El servicio de hash no puede atender la petición ahora"""
+
+
+class HashingBusy(HashingUnavailable):
+    """Demasiados hashes en curso (backpressure)"""
+
+
+class HashingTimeout(HashingUnavailable):
+    """El hash no terminó dentro del tiempo máximo"""
+
+
+def _pbkdf2_hasher(hasher):
+    """Nombre del digest si el hasher es PBKDF2 (el cálculo se puede delegar)"""
+    if isinstance(hasher, hashers.PBKDF2PasswordHasher):
+        return hasher.digest().name
+    return None
+
+
+class HashingService:
+    """
+    Pool de procesos acotado para PBKDF2
+
+    Args:
+        workers: Procesos del pool (0 = calcular en el propio proceso)
+        max_pending: Hashes en curso o en cola admitidos antes de rechazar
+        timeout: Segundos máximos de espera por cada hash
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 8, timeout: float = 5.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # forkserver: los hijos no heredan los hilos del worker (logging, etc.)
+                    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context(method)
+                    )
+        return self._executor
+
+    def _discard(self, executor):
+        """Retirar un pool roto (un hijo murió); el siguiente hash crea otro"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _run(self, password, salt, iterations, digest):
+        if self.workers <= 0:
+            return pbkdf2_b64(password, salt, iterations, digest)
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Pool de hashing saturado", extra={"max_pending": self.max_pending})
+            raise HashingBusy("Demasiadas operaciones de contraseña en curso")
+        try:
+            executor = self._get_executor()
+            future = executor.submit(pbkdf2_b64, password, salt, iterations, digest)
+        except BrokenProcessPool:
+            self._slots.release()
+            raise self._broken(executor) from None
+        except Exception:
+            self._slots.release()
+            raise
+        # El hueco se libera cuando el hijo termina, aunque el llamante ya no espere
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingTimeout(f"El hash superó {self.timeout}s") from None
+        except BrokenProcessPool:
+            raise self._broken(executor) from None
+
+    def _broken(self, executor) -> HashingUnavailable:
+        logger.warning("Pool de hashing roto (murió un proceso); se recrea")
+        self._discard(executor)
+        return HashingUnavailable("El pool de hashing se está recreando")
+
+    def make_password(self, password: str) -> str:
+        """Equivalente a ``hashers.make_password`` calculado en el pool"""
+        hasher = hashers.get_hasher()
+        digest = _pbkdf2_hasher(hasher)
+        if digest is None:
+            return hashers.make_password(password)
+        salt = hasher.salt()
+        derived = self._run(password, salt, hasher.iterations, digest)
+        return "%s$%d$%s$%s" % (hasher.algorithm, hasher.iterations, salt, derived)
+
+    def make_passwords(self, passwords) -> list:
+        """Varios hashes a la vez; con un pool de N procesos tarda ~1/N"""
+        passwords = list(passwords)
+        if len(passwords) <= 1 or self.workers <= 1:
+            return [self.make_password(password) for password in passwords]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(passwords))) as threads:
+            return list(threads.map(self.make_password, passwords))
+
+    def check_password(self, password, encoded, setter=None) -> bool:
+        """Equivalente a ``hashers.check_password`` calculado en el pool"""
+        if password is None or not hashers.is_password_usable(encoded):
+            return False
+        try:
+            hasher = hashers.identify_hasher(encoded)
+        except ValueError:
+            return False
+        digest = _pbkdf2_hasher(hasher)
+        if digest is None:
+            return hashers.check_password(password, encoded, setter)
+        algorithm, iterations, salt, expected = encoded.split("$", 3)
+        valid = constant_time_compare(self._run(password, salt, int(iterations), digest), expected)
+        preferred = hashers.get_hasher()
+        if valid and setter and (preferred.algorithm != hasher.algorithm or preferred.must_update(encoded)):
+            setter(password)
+        return valid
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> HashingService:
+    """Servicio del proceso, configurado con PASSWORD_HASHING_*"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = HashingService(
+                    workers=settings.PASSWORD_HASHING_WORKERS,
+                    max_pending=settings.PASSWORD_HASHING_MAX_PENDING,
+                    timeout=settings.PASSWORD_HASHING_TIMEOUT,
+                )
+    return _service
+
+
+@receiver(setting_changed)
+def _reset_service(*, setting, **kwargs):
+    global _service
+    if setting.startswith("PASSWORD_HASHING_") or setting == "PASSWORD_HASHERS":
+        with _service_lock:
+            if _service is not None:
+                _service.shutdown()
+            _service = None
+
+
+def make_password(password: str) -> str:
+    return get_service().make_password(password)
+
+
+def make_passwords(passwords) -> list:
+    return get_service().make_passwords(passwords)
+
+
+def check_password(password, encoded, setter=None) -> bool:
+    return get_service().check_password(password, encoded, setter)
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend que verifica la contraseña en el pool de hashing
+
+    Aplica el límite "login" antes de hashear, así que cubre todas las vistas
+    que autentican (la home y ``/admin/login/``).
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        User = get_user_model()
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        if request is not None:
+            # "user" es el nombre que se intenta: protege cada cuenta aunque cambie la IP
+            ratelimit.check("login", request, user=str(username).strip().lower())
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # Mismo coste que un usuario existente (evita distinguir usuarios por tiempo)
+            make_password(password)
+            return None
+
+        def setter(raw_password):
+            user.password = make_password(raw_password)
+            user.save(update_fields=["password"])
+
+        if check_password(password, user.password, setter) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        """Usuario de la sesión junto con su perfil (cache compartida o una consulta)"""
+        from models.principal import load_user
+
+        user = load_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+class HashingUnavailableMiddleware:
+    """503 con Retry-After cuando el pool no puede hashear (p. ej. en /admin/login/)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingUnavailable):
+            return None
+        response = HttpResponse(
+            "El servidor está ocupado. Inténtalo de nuevo en unos segundos.",
+            status=503,
+            content_type="text/plain; charset=utf-8",
+        )
+        response["Retry-After"] = str(RETRY_AFTER)
+        return response
@@ -0,0 +1,66 @@
+"""
+Anillo de hash consistente con pesos
+"""
+import bisect
+import hashlib
+from typing import Iterable, Tuple
+
+DEFAULT_REPLICAS = 160
+
+
+def _hash(key: str) -> int:
+    # Hash estable entre procesos (a diferencia de hash())
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Reparte claves entre nodos con pesos mediante hash consistente
+
+    Cada nodo ocupa ``replicas * weight`` puntos virtuales del anillo; una
+    clave pertenece al primer punto en sentido horario. Añadir un nodo solo
+    mueve las claves que caen en sus nuevos puntos (en promedio
+    peso_nuevo / peso_total de las claves).
+    """
+
+    def __init__(self, nodes: Iterable[Tuple[str, int]] = (), replicas: int = DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self._weights = {}
+        self._points = []
+        self._owners = []
+        for name, weight in nodes:
+            self._weights[name] = weight
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        ring = sorted(
+            (_hash(f"{name}#{i}"), name)
+            for name, weight in self._weights.items()
+            for i in range(max(1, int(self.replicas * weight)))
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [name for _, name in ring]
+
+    def add(self, name: str, weight: int = 1) -> None:
+        self._weights[name] = weight
+        self._rebuild()
+
+    def remove(self, name: str) -> None:
+        self._weights.pop(name, None)
+        self._rebuild()
+
+    def get(self, key: str) -> str:
+        """Nodo al que pertenece ``key``; lanza LookupError si el anillo está vacío"""
+        if not self._points:
+            raise LookupError("HashRing vacío")
+        index = bisect.bisect(self._points, _hash(key))
+        if index == len(self._points):
+            index = 0
+        return self._owners[index]
+
+    @property
+    def nodes(self) -> dict:
+        return dict(self._weights)
+
+    def __len__(self) -> int:
+        return len(self._weights)
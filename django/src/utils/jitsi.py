@@ -2,12 +2,448 @@
 Módulo para integración con Jitsi Meet
 Funcionalidades para generar JWT y links de reunión
 """
-import os
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import threading
 import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from typing import Optional
+from urllib.parse import quote
 
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.crypto import salted_hmac
 
-def jitsi_jwt(sub: str = "meet", room: str = "*", user_name: str = "Guest") -> Optional[str]:
+from utils.hashring import HashRing
+from utils.metrics import Metrics
+from utils.prefixes import PrefixTable
+
+try:
+    import jwt
+except ImportError:  # pragma: no cover - pyjwt está en requirements.txt
+    jwt = None
+
+logger = logging.getLogger(__name__)
+
+# Contadores de firma de JWT: jwt_signing_failures, jwt_unsigned_fallbacks, jwt_signing_latency
+metrics = Metrics()
+
+
+DEFAULT_STUN_SERVERS = "stun.l.google.com:19302,stun1.l.google.com:19302"
+JWT_LIFETIME = 60 * 30  # 30 minutos
+JWT_BUCKET = 60  # granularidad de nbf/exp para que todos los workers firmen el mismo token
+JWT_REFRESH_MARGIN = 5 * 60  # renovar el token cuando le queden menos de 5 minutos
+JWT_CACHE_SIZE = 2048
+TURN_CREDENTIAL_TTL = 60 * 60  # validez de las credenciales TURN efímeras
+TURN_CREDENTIAL_WINDOW = 5 * 60  # todas las llamadas de una ventana comparten credenciales
+TURN_CREDENTIAL_CACHE_SIZE = 10000
+P2P_MAX_PARTICIPANTS = 2  # Jitsi solo usa P2P en llamadas 1:1
+
+# Modos de transporte de media
+MEDIA_P2P = "p2p"
+MEDIA_JVB = "jvb"
+MEDIA_OCTO = "octo"
+
+DEFAULT_SHARD = "default"
+
+
+@dataclass(frozen=True)
+class IceRegion:
+    """Servidores ICE de una región, ya ordenados: primero los de la región"""
+    name: str
+    stun_ice_servers: tuple
+    turn_urls: tuple
+
+
+@dataclass(frozen=True)
+class JitsiShard:
+    """Despliegue de Jitsi independiente al que se pueden asignar salas"""
+    name: str
+    base_url: str
+    weight: float = 1
+
+
+@dataclass(frozen=True)
+class JitsiConfig:
+    """
+    Configuración inmutable de Jitsi construida una sola vez desde settings.JITSI_*
+
+    Las listas de STUN/TURN se precalculan aquí para que las funciones de
+    generación de links no vuelvan a leer ni parsear el entorno en cada llamada.
+    """
+    base_url: str
+    app_id: str
+    jwt_secret: str
+    stun_servers: tuple
+    turn_servers: tuple
+    stun_ice_servers: tuple
+    octo_enabled: bool
+    jwt_lifetime: int = JWT_LIFETIME
+    jwt_bucket: int = JWT_BUCKET
+    jwt_refresh_margin: int = JWT_REFRESH_MARGIN
+    jwt_cache_size: int = JWT_CACHE_SIZE
+    turn_urls: tuple = ()
+    turn_secret: str = ""
+    turn_credential_ttl: int = TURN_CREDENTIAL_TTL
+    turn_credential_window: int = TURN_CREDENTIAL_WINDOW
+    region_table: Optional[PrefixTable] = None
+    region_names: tuple = ()
+    p2p_max_participants: int = P2P_MAX_PARTICIPANTS
+    shards: tuple = ()
+    shard_ring: Optional[HashRing] = None
+    shards_by_name: dict = field(default_factory=dict)
+    authreg_sync: bool = True
+
+    @property
+    def is_secure(self) -> bool:
+        return bool(self.jwt_secret)
+
+    @classmethod
+    def from_settings(cls) -> "JitsiConfig":
+        """Construye y valida la configuración desde django.conf.settings"""
+        base_url = getattr(settings, "JITSI_BASE_URL", "http://localhost:8080").rstrip("/")
+        if not base_url.startswith(("http://", "https://")):
+            raise ImproperlyConfigured(
+                f"JITSI_BASE_URL debe empezar por http:// o https:// (recibido: {base_url!r})"
+            )
+
+        stun_raw = getattr(settings, "JITSI_STUN_SERVERS", DEFAULT_STUN_SERVERS)
+        stun_servers = tuple(s.strip() for s in stun_raw.split(",") if s.strip())
+
+        turn_servers = ()
+        turn_server = getattr(settings, "JITSI_TURN_SERVER", "")
+        turn_username = getattr(settings, "JITSI_TURN_USERNAME", "")
+        turn_password = getattr(settings, "JITSI_TURN_PASSWORD", "")
+        turn_secret = getattr(settings, "JITSI_TURN_SECRET", "")
+        if turn_server and turn_username and turn_password and not turn_secret:
+            # Credenciales estáticas; con JITSI_TURN_SECRET se generan efímeras
+            turn_servers = ({
+                "urls": [f"turn:{turn_server}"],
+                "username": turn_username,
+                "credential": turn_password,
+            },)
+
+        turn_credential_ttl = int(getattr(settings, "JITSI_TURN_CREDENTIAL_TTL", TURN_CREDENTIAL_TTL))
+        turn_credential_window = max(1, int(getattr(settings, "JITSI_TURN_CREDENTIAL_WINDOW", TURN_CREDENTIAL_WINDOW)))
+        if turn_secret and turn_credential_window >= turn_credential_ttl:
+            raise ImproperlyConfigured(
+                "JITSI_TURN_CREDENTIAL_WINDOW debe ser menor que JITSI_TURN_CREDENTIAL_TTL"
+            )
+
+        stun_ice_servers = tuple({"urls": f"stun:{stun}"} for stun in stun_servers)
+        turn_urls = (f"turn:{turn_server}",) if turn_server else ()
+        region_table = cls._build_region_table(
+            getattr(settings, "JITSI_ICE_REGIONS", {}), stun_servers, turn_urls
+        )
+
+        shards = cls._build_shards(getattr(settings, "JITSI_SHARDS", []), base_url)
+
+        jwt_lifetime = int(getattr(settings, "JITSI_JWT_LIFETIME", JWT_LIFETIME))
+        jwt_bucket = max(1, int(getattr(settings, "JITSI_JWT_BUCKET", JWT_BUCKET)))
+        jwt_refresh_margin = int(getattr(settings, "JITSI_JWT_REFRESH_MARGIN", JWT_REFRESH_MARGIN))
+
+        # Sin JWT ni authreg, nadie podría entrar a una sala privada
+        jwt_secret = getattr(settings, "JITSI_JWT_SECRET", "")
+        authreg_sync = bool(getattr(settings, "JITSI_AUTHREG_SYNC", True))
+        if not jwt_secret and not authreg_sync:
+            raise ImproperlyConfigured(
+                "Configura JITSI_JWT_SECRET o activa JITSI_AUTHREG_SYNC: sin ninguno de los dos "
+                "los usuarios aprobados no pueden entrar a las salas privadas"
+            )
+        if jwt_bucket + jwt_refresh_margin >= jwt_lifetime:
+            # Un token emitido al inicio del bucket debe seguir siendo reutilizable
+            raise ImproperlyConfigured(
+                "JITSI_JWT_BUCKET + JITSI_JWT_REFRESH_MARGIN debe ser menor que JITSI_JWT_LIFETIME"
+            )
+
+        return cls(
+            base_url=base_url,
+            app_id=getattr(settings, "JITSI_APP_ID", "django-jitsi") or "django-jitsi",
+            jwt_secret=jwt_secret,
+            stun_servers=stun_servers,
+            turn_servers=turn_servers,
+            stun_ice_servers=stun_ice_servers,
+            octo_enabled=getattr(settings, "JITSI_OCTO_BIND_ADDRESS", "0.0.0.0") != "",
+            jwt_lifetime=jwt_lifetime,
+            jwt_bucket=jwt_bucket,
+            jwt_refresh_margin=jwt_refresh_margin,
+            jwt_cache_size=int(getattr(settings, "JITSI_JWT_CACHE_SIZE", JWT_CACHE_SIZE)),
+            turn_urls=turn_urls,
+            turn_secret=turn_secret,
+            turn_credential_ttl=turn_credential_ttl,
+            turn_credential_window=turn_credential_window,
+            region_table=region_table,
+            region_names=tuple(getattr(settings, "JITSI_ICE_REGIONS", {})),
+            p2p_max_participants=int(getattr(settings, "JITSI_P2P_MAX_PARTICIPANTS", P2P_MAX_PARTICIPANTS)),
+            shards=shards,
+            shard_ring=HashRing((shard.name, shard.weight) for shard in shards),
+            shards_by_name={shard.name: shard for shard in shards},
+            authreg_sync=authreg_sync,
+        )
+
+    @staticmethod
+    def _build_shards(shards: list, base_url: str) -> tuple:
+        """
+        Construye los shards desde settings.JITSI_SHARDS
+
+        Formato: [{"name": "eu-1", "url": "https://meet-eu1.example.com", "weight": 2}, ...].
+        Sin shards configurados, JITSI_BASE_URL es el único shard.
+        """
+        if not shards:
+            return (JitsiShard(DEFAULT_SHARD, base_url),)
+        result = []
+        for shard in shards:
+            name = shard.get("name", "")
+            url = shard.get("url", "").rstrip("/")
+            weight = shard.get("weight", 1)
+            if not name or not url.startswith(("http://", "https://")) or weight <= 0:
+                raise ImproperlyConfigured(f"JITSI_SHARDS: shard inválido {shard!r}")
+            result.append(JitsiShard(name, url, weight))
+        if len({shard.name for shard in result}) != len(result):
+            raise ImproperlyConfigured("JITSI_SHARDS: nombres de shard duplicados")
+        return tuple(result)
+
+    @staticmethod
+    def _build_region_table(regions: dict, stun_servers: tuple, turn_urls: tuple) -> Optional[PrefixTable]:
+        """
+        Construye la tabla CIDR -> IceRegion desde settings.JITSI_ICE_REGIONS
+
+        Formato: {"eu": {"prefixes": ["81.0.0.0/8"], "stun": ["stun.eu:3478"],
+        "turn": ["turn.eu:3478"]}}. Los servidores globales se añaden detrás
+        de los de la región como respaldo.
+        """
+        if not regions:
+            return None
+        table = PrefixTable()
+        for name, region in regions.items():
+            region_stun = tuple(region.get("stun", ()))
+            ordered_stun = region_stun + tuple(s for s in stun_servers if s not in region_stun)
+            region_turn = tuple(f"turn:{server}" for server in region.get("turn", ()))
+            ice_region = IceRegion(
+                name=name,
+                stun_ice_servers=tuple({"urls": f"stun:{stun}"} for stun in ordered_stun),
+                turn_urls=region_turn + tuple(url for url in turn_urls if url not in region_turn),
+            )
+            for cidr in region.get("prefixes", ()):
+                try:
+                    table.add(cidr, ice_region)
+                except ValueError:
+                    raise ImproperlyConfigured(f"JITSI_ICE_REGIONS[{name!r}]: prefijo inválido {cidr!r}")
+        return table
+
+
+class JWTCache:
+    """
+    Cache LRU acotada de tokens firmados, con expiración según el ``exp`` del token
+
+    Un token se reutiliza mientras le quede más de ``refresh_margin`` segundos
+    de validez; a partir de ahí se considera caducado y se vuelve a firmar.
+    """
+
+    def __init__(self, maxsize: int = JWT_CACHE_SIZE, refresh_margin: int = JWT_REFRESH_MARGIN):
+        self.maxsize = maxsize
+        self.refresh_margin = refresh_margin
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] - now <= self.refresh_margin:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, token: str, exp: int) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (token, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class HS256Signer:
+    """
+    Firmador HS256 que prepara cabecera y clave HMAC una sola vez
+
+    Produce los mismos tokens que ``jwt.encode(payload, secret, "HS256")``, pero
+    sin recodificar la cabecera ni volver a preparar la clave en cada firma,
+    lo que abarata la generación de muchos tokens seguidos.
+    """
+
+    def __init__(self, secret: str):
+        header = json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode()
+        self._signing_prefix = _b64url(header) + b"."
+        self._mac = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+    def sign(self, payload: dict) -> str:
+        signing_input = self._signing_prefix + _b64url(
+            json.dumps(payload, separators=(",", ":")).encode()
+        )
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return (signing_input + b"." + _b64url(mac.digest())).decode()
+
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+class TurnCredentialCache:
+    """
+    Credenciales TURN efímeras (API REST de coturn) cacheadas por ventana de tiempo
+
+    username = "<expiry>:<user_id>" y credential = base64(HMAC-SHA1(secret, username)).
+    El expiry se alinea al inicio de la ventana, así que todas las llamadas de
+    una misma ventana reutilizan el mismo cálculo; al cambiar de ventana la
+    cache se vacía entera.
+    """
+
+    def __init__(self, secret: str, ttl: int = TURN_CREDENTIAL_TTL,
+                 window: int = TURN_CREDENTIAL_WINDOW, maxsize: int = TURN_CREDENTIAL_CACHE_SIZE):
+        self._secret = secret.encode()
+        self.ttl = ttl
+        self.window = window
+        self.maxsize = maxsize
+        self._window_start = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, now: float) -> dict:
+        window_start = int(now) // self.window * self.window
+        with self._lock:
+            if window_start != self._window_start:
+                self._window_start = window_start
+                self._entries = {}
+            credentials = self._entries.get(user_id)
+            if credentials is not None:
+                return credentials
+
+        expires_at = window_start + self.ttl
+        username = f"{expires_at}:{user_id}"
+        digest = hmac.new(self._secret, username.encode(), hashlib.sha1).digest()
+        credentials = {
+            "username": username,
+            "credential": base64.b64encode(digest).decode(),
+            "expires_at": expires_at,
+        }
+        with self._lock:
+            if self._window_start == window_start and len(self._entries) < self.maxsize:
+                self._entries[user_id] = credentials
+        return credentials
+
+
+_config: Optional[JitsiConfig] = None
+_jwt_cache: Optional[JWTCache] = None
+_signer: Optional[HS256Signer] = None
+_turn_cache: Optional[TurnCredentialCache] = None
+
+
+def get_config() -> JitsiConfig:
+    """Devuelve la configuración de Jitsi, construyéndola la primera vez"""
+    global _config, _jwt_cache, _signer, _turn_cache
+    if _config is None:
+        config = JitsiConfig.from_settings()
+        # Los tokens cacheados dependen del secreto y de los tiempos configurados
+        _jwt_cache = JWTCache(config.jwt_cache_size, config.jwt_refresh_margin)
+        _signer = HS256Signer(config.jwt_secret) if config.jwt_secret else None
+        _turn_cache = TurnCredentialCache(
+            config.turn_secret, config.turn_credential_ttl, config.turn_credential_window
+        ) if config.turn_secret else None
+        _config = config
+    return _config
+
+
+def reload_config() -> JitsiConfig:
+    """Descarta la configuración cacheada y la reconstruye (útil en tests)"""
+    global _config
+    _config = None
+    return get_config()
+
+
+@receiver(setting_changed)
+def _reload_config_on_setting_changed(sender, setting, **kwargs):
+    """Mantener la configuración sincronizada con override_settings en tests"""
+    global _config
+    if setting.startswith("JITSI_"):
+        _config = None
+
+
+def jitsi_metrics() -> dict:
+    """Contadores de firma de JWT y de la cache de tokens, para exponer o inspeccionar"""
+    data = metrics.snapshot()
+    data["jwt_cache"] = jwt_cache_stats()
+    return data
+
+
+def jwt_cache_stats() -> dict:
+    """Contadores de la cache de JWT (hits, misses, evictions, tamaño)"""
+    get_config()
+    return _jwt_cache.stats()
+
+
+def _copy_servers(servers) -> list:
+    """Copia las entradas ICE precalculadas para que el llamador pueda mutarlas"""
+    return [
+        {key: list(value) if isinstance(value, list) else value for key, value in server.items()}
+        for server in servers
+    ]
+
+
+def shard_for_room(room_name: str) -> JitsiShard:
+    """Shard asignado a una sala por hash consistente sobre su nombre"""
+    config = get_config()
+    return config.shards_by_name[config.shard_ring.get(room_name)]
+
+
+def shard_base_url(room_name: str, shard_name: str = "") -> str:
+    """
+    URL base de Jitsi para una sala
+
+    Usa el shard guardado en la reunión si sigue configurado. Un shard
+    guardado que no está en JITSI_SHARDS ("default", de antes de configurar
+    shards, o uno retirado) va a JITSI_BASE_URL: el anillo movería una sala
+    existente a otro despliegue. Sin shard guardado decide el anillo de hash
+    consistente.
+    """
+    config = get_config()
+    if not shard_name:
+        return shard_for_room(room_name).base_url
+    shard = config.shards_by_name.get(shard_name)
+    return shard.base_url if shard is not None else config.base_url
+
+
+def jitsi_jwt(sub: str = "meet", room: str = "*", user_name: str = "Guest",
+              issued_at: Optional[int] = None, user_context: Optional[dict] = None) -> Optional[str]:
     """
     Genera un JWT para autenticación con Jitsi Meet
     
@@ -15,56 +451,98 @@ def jitsi_jwt(sub: str = "meet", room: str = "*", user_name: str = "Guest") -> O
         sub: Subject del token
         room: Nombre de la sala (usar "*" para acceso general)
         user_name: Nombre del usuario
+        issued_at: Instante base para nbf/exp (por defecto, ahora)
+        user_context: Campos extra de context.user (id, email, moderator...)
     
     Returns:
         Token JWT codificado o None si hay error
     """
+    if jwt is None:
+        logger.error("pyjwt no instalado; links sin JWT. Instalar con: pip install pyjwt")
+        metrics.incr("jwt_unsigned_fallbacks")
+        return None
+
+    config = get_config()
+    if not config.jwt_secret:
+        logger.warning("JITSI_JWT_SECRET no configurado; links sin JWT")
+        metrics.incr("jwt_unsigned_fallbacks")
+        return None
+
     try:
-        import jwt
+        now = int(time.time()) if issued_at is None else issued_at
+        payload = _jwt_payload(config, sub, room, user_name, now, user_context)
         
-        secret = os.getenv("JITSI_JWT_SECRET")
-        appid = os.getenv("JITSI_APP_ID", "django-jitsi")
+        started = time.perf_counter()
+        token = jwt.encode(payload, config.jwt_secret, algorithm="HS256")
+        metrics.observe("jwt_signing_latency", time.perf_counter() - started)
+        return token
         
-        if not secret:
-            print("Warning: JITSI_JWT_SECRET no configurado")
-            return None
-            
-        now = int(time.time())
-        payload = {
-            "aud": appid,
-            "iss": appid,
-            "sub": sub,
-            "room": room,
-            "exp": now + 60 * 30,  # 30 minutos
-            "nbf": now - 5,
-            "context": {"user": {"name": user_name}},
-        }
-        
-        return jwt.encode(payload, secret, algorithm="HS256")
-        
-    except ImportError:
-        print("Error: pyjwt no instalado. Instalar con: pip install pyjwt")
-        return None
-    except Exception as e:
-        print(f"Error generando JWT: {e}")
+    except Exception:
+        logger.exception("Error generando JWT", extra={"room": room})
+        metrics.incr("jwt_signing_failures")
+        metrics.incr("jwt_unsigned_fallbacks")
         return None
 
 
-def generate_meeting_link(room_name: str, user_name: str = "Guest") -> str:
+def _jwt_payload(config: JitsiConfig, sub: str, room: str, user_name: str, issued_at: int,
+                 user_context: Optional[dict] = None) -> dict:
+    user = {"name": user_name}
+    if user_context:
+        user.update(user_context)
+    return {
+        "aud": config.app_id,
+        "iss": config.app_id,
+        "sub": sub,
+        "room": room,
+        "exp": issued_at + config.jwt_lifetime,
+        "nbf": issued_at - 5,
+        "context": {"user": user},
+    }
+
+
+def cached_jitsi_jwt(sub: str = "meet", room: str = "*", user_name: str = "Guest",
+                     user_context: Optional[dict] = None) -> Optional[str]:
+    """
+    Igual que jitsi_jwt pero reutilizando tokens vigentes desde la cache LRU
+
+    nbf/exp se alinean a ventanas de JITSI_JWT_BUCKET segundos, de modo que
+    distintos workers generan exactamente el mismo token para la misma clave.
+    La clave incluye user_context: cada identidad tiene su propio token.
+    """
+    config = get_config()
+    if not config.jwt_secret:
+        return jitsi_jwt(sub=sub, room=room, user_name=user_name, user_context=user_context)
+
+    cache = _jwt_cache
+    key = (sub, room, user_name, tuple(sorted((user_context or {}).items())))
+    now = time.time()
+    token = cache.get(key, now)
+    if token is not None:
+        return token
+
+    issued_at = int(now) // config.jwt_bucket * config.jwt_bucket
+    token = jitsi_jwt(sub=sub, room=room, user_name=user_name, issued_at=issued_at, user_context=user_context)
+    if token:
+        cache.set(key, token, issued_at + config.jwt_lifetime)
+    return token
+
+
+def generate_meeting_link(room_name: str, user_name: str = "Guest", base_url: Optional[str] = None) -> str:
     """
     Genera un link de reunión de Jitsi con JWT
     
     Args:
         room_name: Nombre de la sala
         user_name: Nombre del usuario
+        base_url: URL del shard de la sala (por defecto, la del anillo de shards)
     
     Returns:
         URL completa de la reunión
     """
-    base_url = os.getenv("JITSI_BASE_URL", "http://localhost:8080")
+    base_url = base_url or shard_base_url(room_name)
     
     # Generar JWT si está configurado
-    jwt_token = jitsi_jwt(room=room_name, user_name=user_name)
+    jwt_token = cached_jitsi_jwt(room=room_name, user_name=user_name)
     
     if jwt_token:
         return f"{base_url}/{room_name}?jwt={jwt_token}"
@@ -72,6 +550,93 @@ def generate_meeting_link(room_name: str, user_name: str = "Guest") -> str:
         return f"{base_url}/{room_name}"
 
 
+def identity_jwt(room_name: str, user, moderator: bool = False) -> Optional[str]:
+    """
+    JWT limitado a una sala y con la identidad del usuario de Django
+
+    Prosody acepta el token directamente, sin consultar la tabla authreg
+    (mod_auth_sql), así que se usa para entrar en salas privadas.
+    
+    Args:
+        room_name: Sala a la que da acceso el token
+        user: Usuario de Django que se une
+        moderator: Si el usuario entra como moderador (propietario de la sala)
+    
+    Returns:
+        Token JWT codificado o None si no hay JITSI_JWT_SECRET
+    """
+    return cached_jitsi_jwt(
+        room=room_name,
+        user_name=user.get_full_name() or user.username,
+        user_context={
+            "id": str(user.pk),
+            "email": user.email,
+            "moderator": moderator,
+        },
+    )
+
+
+def generate_meeting_links(meetings, user=None) -> dict:
+    """
+    Genera en bloque los links de Jitsi para un listado de reuniones
+
+    Equivale a llamar ``meeting.jitsi_url()`` por fila, pero resuelve los
+    propietarios desconocidos en una única consulta, reutiliza la cache de JWT
+    y firma los tokens que falten con la misma cabecera/clave preparada.
+
+    Args:
+        meetings: Iterable de Meeting (queryset o lista)
+        user: Usuario que ya conocemos (normalmente request.user); sus
+            reuniones no necesitan consultar el propietario
+
+    Returns:
+        Diccionario room -> URL completa de la reunión
+    """
+    meetings = list(meetings)
+    config = get_config()
+
+    # Resolver nombres de propietario sin una consulta por fila
+    usernames = {}
+    if user is not None and getattr(user, "pk", None) is not None:
+        usernames[user.pk] = user.username
+    missing = set()
+    signer = _signer
+    for meeting in meetings:
+        if meeting.is_private or signer is None or meeting.owner_id in usernames:
+            continue
+        if meeting._meta.get_field("owner").is_cached(meeting):
+            usernames[meeting.owner_id] = meeting.owner.username
+        else:
+            missing.add(meeting.owner_id)
+    if missing:
+        owner_model = meetings[0]._meta.get_field("owner").related_model
+        usernames.update(owner_model.objects.filter(pk__in=missing).values_list("pk", "username"))
+
+    links = {}
+    cache = _jwt_cache
+    now = time.time()
+    issued_at = int(now) // config.jwt_bucket * config.jwt_bucket
+    for meeting in meetings:
+        room = meeting.room
+        base_url = shard_base_url(room, meeting.shard)
+        if meeting.is_private or signer is None:
+            # Sala privada o sin JITSI_JWT_SECRET: link sin token, como Meeting.jitsi_url
+            if not meeting.is_private:
+                metrics.incr("jwt_unsigned_fallbacks")
+            links[room] = f"{base_url}/{room}"
+            continue
+        # Misma clave que cached_jitsi_jwt(room=room, user_name=...): tokens compartidos
+        key = ("meet", room, usernames[meeting.owner_id], ())
+        token = cache.get(key, now)
+        if token is None:
+            started = time.perf_counter()
+            token = signer.sign(_jwt_payload(config, "meet", room, usernames[meeting.owner_id], issued_at))
+            metrics.observe("jwt_signing_latency", time.perf_counter() - started)
+            cache.set(key, token, issued_at + config.jwt_lifetime)
+        links[room] = f"{base_url}/{room}?jwt={token}"
+    return links
+
+
 def create_secure_room(room_name: str, user_name: str) -> dict:
     """
     Crea una sala segura con JWT y configuración P2P
@@ -83,93 +648,264 @@ def create_secure_room(room_name: str, user_name: str) -> dict:
     Returns:
         Diccionario con información de la sala
     """
+    config = get_config()
     meeting_link = generate_meeting_link(room_name, user_name)
     
     return {
         "room_name": room_name,
         "meeting_link": meeting_link,
-        "is_secure": bool(os.getenv("JITSI_JWT_SECRET")),
+        "is_secure": config.is_secure,
         "user_name": user_name,
         "created_at": time.time(),
         "p2p_enabled": True,
-        "stun_servers": os.getenv("JVB_STUN_SERVERS", "stun.l.google.com:19302,stun1.l.google.com:19302"),
-        "turn_servers": get_turn_servers(),
-        "octo_enabled": os.getenv("JVB_OCTO_BIND_ADDRESS", "0.0.0.0") != "",
+        "stun_servers": ",".join(config.stun_servers),
+        "turn_servers": get_turn_servers(user_name),
+        "octo_enabled": config.octo_enabled,
     }
 
 
-def get_turn_servers() -> list:
+def turn_credentials(user_id: str = "jitsi") -> Optional[dict]:
+    """
+    Devuelve las credenciales TURN efímeras vigentes para un usuario
+
+    Args:
+        user_id: Identificador incluido en el username de TURN
+
+    Returns:
+        Diccionario con username, credential y expires_at, o None si no hay
+        JITSI_TURN_SECRET configurado
+    """
+    get_config()
+    if _turn_cache is None:
+        return None
+    return _turn_cache.get(user_id, time.time())
+
+
+def ice_region_for(client_ip: Optional[str]) -> Optional[IceRegion]:
+    """Región ICE más cercana según el prefijo más largo que contiene la IP del cliente"""
+    table = get_config().region_table
+    if table is None:
+        return None
+    return table.lookup(client_ip)
+
+
+def get_turn_servers(user_id: Optional[str] = None, region: Optional[IceRegion] = None,
+                     credentials: Optional[dict] = None) -> list:
     """
     Obtiene la configuración de servidores TURN para P2P
     
+    Args:
+        user_id: Usuario para el que se generan credenciales efímeras
+        region: Región del cliente; sus servidores TURN van primero
+        credentials: Credenciales de turn_credentials ya obtenidas (por defecto, las vigentes)
+    
     Returns:
         Lista de servidores TURN configurados
     """
-    turn_servers = []
-    turn_server = os.getenv("TURN_SERVER")
-    turn_username = os.getenv("TURN_USERNAME")
-    turn_password = os.getenv("TURN_PASSWORD")
+    config = get_config()
+    if credentials is None:
+        credentials = turn_credentials(user_id or "jitsi")
+    if credentials is None:
+        servers = _copy_servers(config.turn_servers)
+        if region is not None and servers:
+            servers[0]["urls"] = list(region.turn_urls)
+        return servers
     
-    if turn_server and turn_username and turn_password:
-        turn_servers.append({
-            "urls": [f"turn:{turn_server}"],
-            "username": turn_username,
-            "credential": turn_password
-        })
+    urls = region.turn_urls if region is not None else config.turn_urls
+    if not urls:
+        return []
+    return [{
+        "urls": list(urls),
+        "username": credentials["username"],
+        "credential": credentials["credential"],
+    }]
+
+
+def choose_media_mode(expected_participants: Optional[int] = None, regions=()) -> str:
+    """
+    Decide el transporte de media de una sala
+
+    - P2P si se esperan como mucho JITSI_P2P_MAX_PARTICIPANTS (llamadas 1:1)
+      o si no se conoce el tamaño (Jitsi pasa a JVB al entrar el tercero)
+    - JVB para salas más grandes
+    - JVB en cascada (Octo) si además los participantes están en varias
+      regiones y Octo está habilitado
+    
+    Args:
+        expected_participants: Número esperado de participantes
+        regions: Regiones (IceRegion o nombres) de los participantes conocidos
     
-    return turn_servers
+    Returns:
+        MEDIA_P2P, MEDIA_JVB o MEDIA_OCTO
+    """
+    config = get_config()
+    if expected_participants is None or expected_participants <= config.p2p_max_participants:
+        return MEDIA_P2P
+    region_names = {getattr(region, "name", region) for region in regions if region}
+    if len(region_names) > 1 and config.octo_enabled:
+        return MEDIA_OCTO
+    return MEDIA_JVB
+
+
+def _region_key(room_name: str, region_name: str) -> str:
+    return f"room_region_{room_name}:{region_name}"
+
+
+def participant_regions(room_name: str, region: Optional[IceRegion] = None) -> tuple:
+    """
+    Regiones de los participantes que han entrado a la sala recientemente
+
+    Cada entrada marca su región en la cache compartida mientras dure su JWT
+    (lo que puede seguir en la sala sin volver a pasar por Django). Hay una
+    clave por región, así que dos workers no se pisan al registrar.
+
+    Args:
+        room_name: Nombre de la sala
+        region: Región del participante que entra (se registra)
+
+    Returns:
+        Nombres de las regiones presentes, incluida la de ``region``
+    """
+    config = get_config()
+    if not config.region_names:
+        return ()
+    if region is not None:
+        default_cache.set(_region_key(room_name, region.name), 1, config.jwt_lifetime)
+    present = default_cache.get_many([_region_key(room_name, name) for name in config.region_names])
+    return tuple(name for name in config.region_names if _region_key(room_name, name) in present)
 
 
-def create_p2p_room(room_name: str, user_name: str, enable_p2p: bool = True) -> dict:
+def media_config_fragment(mode: str, user_region: Optional[str] = None) -> dict:
+    """
+    Fragmento de config.js de Jitsi Meet correspondiente al modo de media
+
+    Args:
+        mode: Resultado de choose_media_mode
+        user_region: Región del usuario, usada por Octo para elegir bridge
+    
+    Returns:
+        Diccionario con las claves de config.js a sobrescribir
+    """
+    fragment = {"p2p": {"enabled": mode == MEDIA_P2P}}
+    if mode == MEDIA_OCTO:
+        fragment["testing"] = {"octo": {"probability": 1}}
+    if user_region:
+        fragment["deploymentInfo"] = {"userRegion": user_region}
+    return fragment
+
+
+def config_url_hash(fragment: dict) -> str:
+    """
+    Serializa un fragmento de config.js como hash de URL (#config.p2p.enabled=false)
+
+    Jitsi Meet aplica estas sobrescrituras al cargar la sala.
+    """
+    params = []
+
+    def flatten(prefix, value):
+        if isinstance(value, dict):
+            for key, nested in value.items():
+                flatten(f"{prefix}.{key}", nested)
+        else:
+            params.append(f"{prefix}={quote(json.dumps(value))}")
+
+    flatten("config", fragment)
+    return "#" + "&".join(params) if params else ""
+
+
+def create_p2p_room(room_name: str, user_name: str, enable_p2p: Optional[bool] = None,
+                    client_ip: Optional[str] = None, expected_participants: Optional[int] = None,
+                    regions=()) -> dict:
     """
     Crea una sala con configuración P2P optimizada
     
     Args:
         room_name: Nombre de la sala
         user_name: Nombre del usuario
-        enable_p2p: Habilitar conexiones P2P directas
+        enable_p2p: Forzar (True) o desactivar (False) P2P; None decide según la política
+        client_ip: IP del cliente, para ordenar los servidores ICE por cercanía
+        expected_participants: Número esperado de participantes
+        regions: Regiones de los participantes, para decidir Octo
     
     Returns:
         Diccionario con configuración de la sala P2P
     """
     base_config = create_secure_room(room_name, user_name)
+    region = ice_region_for(client_ip)
+    
+    if enable_p2p is None:
+        mode = choose_media_mode(expected_participants, regions)
+    elif enable_p2p:
+        mode = MEDIA_P2P
+    else:
+        # P2P desactivado explícitamente: siempre bridge, en cascada si hay varias regiones
+        mode = choose_media_mode(get_config().p2p_max_participants + 1, regions)
     
-    if enable_p2p:
+    base_config.update({
+        "p2p_enabled": mode == MEDIA_P2P,
+        "media_mode": mode,
+        "jitsi_config": media_config_fragment(mode, region.name if region is not None else None),
+        "jvb_config": {
+            "enabled": mode != MEDIA_P2P,
+            "octo_enabled": mode == MEDIA_OCTO,
+        },
+    })
+    
+    if mode == MEDIA_P2P:
+        # Servidores de la región del cliente primero
+        stun_ice_servers = region.stun_ice_servers if region is not None else get_config().stun_ice_servers
+        turn_servers = get_turn_servers(user_name, region)
         base_config.update({
             "p2p_config": {
                 "enabled": True,
-                "stun_servers": base_config["stun_servers"].split(","),
-                "turn_servers": base_config["turn_servers"],
+                "stun_servers": [server["urls"][len("stun:"):] for server in stun_ice_servers],
+                "turn_servers": turn_servers,
                 "ice_transport_policy": "all",
-                "ice_servers": get_ice_servers(),
+                "ice_servers": _copy_servers(stun_ice_servers) + _copy_servers(turn_servers),
             },
-            "jvb_config": {
-                "enabled": not enable_p2p,  # JVB solo si P2P está deshabilitado
-                "octo_enabled": base_config["octo_enabled"],
-            }
         })
     
     return base_config
 
 
-def get_ice_servers() -> list:
+def get_ice_servers(user_id: Optional[str] = None, client_ip: Optional[str] = None,
+                    credentials: Optional[dict] = None) -> list:
     """
     Obtiene la lista completa de servidores ICE (STUN + TURN)
     
+    Args:
+        user_id: Usuario para el que se generan credenciales TURN efímeras
+        client_ip: IP del cliente; los servidores de su región van primero
+        credentials: Credenciales de turn_credentials ya obtenidas, para que
+            quien también use su expires_at vea las mismas
+    
     Returns:
         Lista de servidores ICE configurados
     """
-    ice_servers = []
+    # STUN precalculado en JitsiConfig + TURN (estático o efímero cacheado)
+    region = ice_region_for(client_ip)
+    stun = region.stun_ice_servers if region is not None else get_config().stun_ice_servers
+    return _copy_servers(stun) + get_turn_servers(user_id, region, credentials)
+
+
+def prosody_credential(username: str, password_hash: str) -> str:
+    """
+    Contraseña de authreg derivada del hash de Django del usuario
     
-    # Agregar servidores STUN
-    stun_servers = os.getenv("JVB_STUN_SERVERS", "stun.l.google.com:19302,stun1.l.google.com:19302")
-    for stun in stun_servers.split(","):
-        ice_servers.append({"urls": f"stun:{stun.strip()}"})
+    Es un HMAC con SECRET_KEY: cuesta microsegundos (sin otra vuelta de
+    PBKDF2), no revela el hash y cambia cuando el usuario cambia de contraseña.
+    El usuario la consulta en el detalle de las salas que piden login en Jitsi.
     
-    # Agregar servidores TURN
-    ice_servers.extend(get_turn_servers())
+    Args:
+        username: Nombre de usuario
+        password_hash: Valor de User.password / SignupRequest.password_hash
     
-    return ice_servers
+    Returns:
+        Credencial en hexadecimal
+    """
+    return salted_hmac(
+        "utils.jitsi.prosody_credential", f"{username}:{password_hash}", algorithm="sha256"
+    ).hexdigest()[:24]
 
 
 # Funciones para integración futura con Prosody
@@ -186,7 +922,7 @@ def sync_user_with_prosody(username: str, email: str) -> bool:
     """
     # TODO: Implementar sincronización con Prosody
     # Esto requeriría configuración específica del servidor Prosody
-    print(f"TODO: Sincronizar usuario {username} ({email}) con Prosody")
+    logger.info("Sincronización con Prosody no implementada", extra={"username": username, "email": email})
     return False
 
 
@@ -202,7 +938,7 @@ def create_meeting_info(room_name: str, owner_username: str, is_private: bool =
     Returns:
         Diccionario con información de la sala
     """
-    base_url = os.getenv("JITSI_BASE_URL", "http://localhost:8080")
+    base_url = shard_base_url(room_name)
     
     if is_private:
         # Sala privada: requiere login en Jitsi
@@ -215,7 +951,7 @@ def create_meeting_info(room_name: str, owner_username: str, is_private: bool =
         }
     else:
         # Sala pública: usar JWT si está configurado
-        jwt_token = jitsi_jwt(room=room_name, user_name=owner_username)
+        jwt_token = cached_jitsi_jwt(room=room_name, user_name=owner_username)
         if jwt_token:
             meeting_link = f"{base_url}/{room_name}?jwt={jwt_token}"
         else:
@@ -242,5 +978,5 @@ def create_prosody_room(room_name: str, moderator: str) -> bool:
         True si la sala fue creada exitosamente
     """
     # TODO: Implementar creación de salas en Prosody
-    print(f"TODO: Crear sala {room_name} en Prosody con moderador {moderator}")
+    logger.info("Creación de salas en Prosody no implementada", extra={"room": room_name, "moderator": moderator})
     return False
@@ -0,0 +1,155 @@
+"""
+Logging estructurado y no bloqueante
+
+Los registros se encolan en el hilo de la petición (QueueHandler) y un único
+hilo de fondo (QueueListener) los formatea como JSON y los escribe en stderr,
+de modo que un stdout/stderr lento no bloquea a los workers de gunicorn.
+
+Los hilos no sobreviven a un fork: con ``gunicorn --preload`` los workers
+heredan la cola pero no el hilo que la vacía. Por eso la cola y el listener
+son de cada proceso y se crean al primer registro tras el fork.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+QUEUE_SIZE = 10000
+RATE_LIMIT_INTERVAL = 60  # segundos entre repeticiones del mismo aviso
+
+# Atributos estándar de LogRecord; el resto se considera contexto estructurado (extra=...)
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+_exception_formatter = logging.Formatter()
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON, incluyendo los campos de ``extra``"""
+
+    def format(self, record):
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Deja pasar un mismo aviso como mucho una vez por intervalo
+
+    Dos registros son "el mismo" si coinciden logger, nivel y plantilla del
+    mensaje (sin argumentos). El siguiente registro que pasa indica cuántos se
+    omitieron en el campo ``suppressed``.
+    """
+
+    def __init__(self, interval: float = RATE_LIMIT_INTERVAL, name: str = ""):
+        super().__init__(name)
+        self.interval = interval
+        self._last = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler con cola acotada que nunca bloquea al llamador
+
+    Todas las instancias del proceso comparten una cola y un QueueListener
+    que escribe en stderr con StructuredFormatter. Si la cola está llena el
+    registro se descarta y se cuenta en ``dropped``.
+    """
+
+    _queue = None
+    _listener = None
+    _pid = None  # proceso dueño de _queue/_listener
+    _queue_size = QUEUE_SIZE
+    _stream = None
+    _lock = threading.Lock()
+    dropped = 0
+
+    def __init__(self, queue_size: int = QUEUE_SIZE, stream=None):
+        cls = type(self)
+        with cls._lock:
+            if cls._pid is None:
+                cls._queue_size, cls._stream = queue_size, stream
+                atexit.register(cls.stop_listener)
+        super().__init__(cls._process_queue())
+
+    @classmethod
+    def _process_queue(cls) -> queue.Queue:
+        """Cola del proceso actual; la primera vez (o tras un fork) arranca su listener"""
+        if cls._pid == os.getpid():
+            return cls._queue
+        with cls._lock:
+            if cls._pid != os.getpid():
+                cls._queue = queue.Queue(maxsize=cls._queue_size)
+                target = logging.StreamHandler(cls._stream or sys.stderr)
+                target.setFormatter(StructuredFormatter())
+                cls._listener = QueueListener(cls._queue, target, respect_handler_level=True)
+                cls._listener.start()
+                cls._pid = os.getpid()
+        return cls._queue
+
+    @classmethod
+    def _after_fork(cls):
+        # El lock pudo quedar tomado por un hilo que no existe en el hijo
+        cls._lock = threading.Lock()
+
+    def enqueue(self, record):
+        self.queue = self._process_queue()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            type(self).dropped += 1
+
+    def prepare(self, record):
+        # Resolver mensaje y traza aquí (pueden no ser seguros entre hilos),
+        # conservando los campos de extra para el formateo estructurado
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc = _exception_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        return record
+
+    @classmethod
+    def stop_listener(cls):
+        """Vacía la cola y detiene el hilo de escritura"""
+        with cls._lock:
+            if cls._listener is not None and cls._pid == os.getpid():
+                cls._listener.stop()
+            cls._listener = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=NonBlockingQueueHandler._after_fork)
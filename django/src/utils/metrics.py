@@ -0,0 +1,44 @@
+"""
+Contadores en memoria del proceso, seguros entre hilos
+"""
+import threading
+
+
+class Metrics:
+    """
+    Registro de contadores y tiempos
+
+    ``incr`` acumula contadores enteros y ``observe`` acumula duraciones
+    (número, total y máximo). ``snapshot`` devuelve una copia para que el
+    resto de la aplicación pueda leerlos o exponerlos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timings = {}
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            count, total, maximum = self._timings.get(name, (0, 0.0, 0.0))
+            self._timings[name] = (count + 1, total + seconds, max(maximum, seconds))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+            for name, (count, total, maximum) in self._timings.items():
+                data[name] = {
+                    "count": count,
+                    "avg_ms": total / count * 1000 if count else 0.0,
+                    "max_ms": maximum * 1000,
+                }
+            return data
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
@@ -0,0 +1,133 @@
+"""
+Paginación por cursor (keyset) para listados que crecen sin límite
+
+En lugar de OFFSET/COUNT, cada página filtra a partir de la última fila de la
+anterior sobre un orden estable, p. ej. ``(created_at, id)`` descendente. Con
+un índice compuesto que siga ese orden, la página N cuesta lo mismo que la 1.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PER_PAGE = 20
+
+
+def encode_cursor(values) -> str:
+    """Serializar los valores de la clave como token opaco para la URL"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """Inverso de encode_cursor; devuelve None si el token no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+@dataclass
+class KeysetPage:
+    """Una página de resultados y los cursores para moverse desde ella"""
+    object_list: list
+    has_next: bool = False
+    has_previous: bool = False
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+    per_page: int = DEFAULT_PER_PAGE
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginador por cursor sobre campos únicos en conjunto (el último suele ser ``id``)
+
+    Args:
+        queryset: Queryset ya filtrado
+        keys: Campos de la clave, en orden de prioridad
+        per_page: Filas por página
+        descending: Orden descendente (más recientes primero)
+    """
+
+    def __init__(self, queryset, keys=("created_at", "id"), per_page=DEFAULT_PER_PAGE, descending=True):
+        self.queryset = queryset
+        self.keys = tuple(keys)
+        self.per_page = per_page
+        self.descending = descending
+        self.fields = [queryset.model._meta.get_field(key) for key in self.keys]
+
+    def _parse(self, token):
+        """Valores del cursor convertidos a los tipos de los campos; None si no es válido"""
+        values = decode_cursor(token) if token else None
+        if values is None or len(values) != len(self.fields):
+            return None
+        try:
+            parsed = [f.to_python(value) for f, value in zip(self.fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            # Cursor manipulado: tipos que to_python no espera (listas, objetos, números...)
+            return None
+        return None if any(value is None for value in parsed) else parsed
+
+    def _cursor_for(self, obj) -> str:
+        return encode_cursor(f.value_to_string(obj) for f in self.fields)
+
+    def _seek(self, values, forward: bool) -> Q:
+        """Condición "fila después de values" como OR de prefijos iguales + comparación"""
+        lookup = "lt" if forward == self.descending else "gt"
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            prefix = {k: v for k, v in zip(self.keys[:i], values[:i])}
+            condition |= Q(**prefix, **{f"{key}__{lookup}": values[i]})
+        return condition
+
+    def _ordering(self, forward: bool):
+        desc = forward == self.descending
+        return [f"-{key}" if desc else key for key in self.keys]
+
+    def page(self, after: str = "", before: str = "") -> KeysetPage:
+        """
+        Obtener la página que sigue a ``after`` o la que precede a ``before``
+
+        Sin cursor (o con uno inválido) devuelve la primera página.
+        """
+        after_values = self._parse(after)
+        before_values = None if after_values else self._parse(before)
+        forward = before_values is None
+        values = after_values if forward else before_values
+
+        qs = self.queryset
+        if values is not None:
+            qs = qs.filter(self._seek(values, forward))
+        rows = list(qs.order_by(*self._ordering(forward))[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        page = KeysetPage(object_list=rows, per_page=self.per_page)
+        if forward:
+            page.has_next = more
+            page.has_previous = values is not None
+        else:
+            page.has_previous = more
+            page.has_next = True
+        if rows:
+            page.next_cursor = self._cursor_for(rows[-1]) if page.has_next else None
+            page.previous_cursor = self._cursor_for(rows[0]) if page.has_previous else None
+        return page
+
@@ -0,0 +1,13 @@
+"""
+PBKDF2 sin dependencias de Django
+
+Lo importan los procesos del pool de utils.hashing, que no inicializan Django.
+"""
+import base64
+import hashlib
+
+
+def pbkdf2_b64(password: str, salt: str, iterations: int, digest: str) -> str:
+    """Hash PBKDF2 en base64, igual que la última parte de un hash de Django"""
+    derived = hashlib.pbkdf2_hmac(digest, password.encode(), salt.encode(), iterations)
+    return base64.b64encode(derived).decode("ascii").strip()
@@ -0,0 +1,73 @@
+"""
+Tabla de prefijos IP con búsqueda por prefijo más largo (longest-prefix match)
+"""
+import ipaddress
+import socket
+from typing import Any, Iterable, Optional, Tuple
+
+_V4_MAPPED_PREFIX = b"\0" * 10 + b"\xff\xff"
+
+
+class PrefixTable:
+    """
+    Asocia redes CIDR (IPv4 e IPv6) a valores arbitrarios
+
+    Los prefijos se agrupan por longitud en diccionarios indexados por la parte
+    de red de la dirección como entero, así que una búsqueda son unas pocas
+    consultas a diccionario (una por longitud distinta configurada), empezando
+    por la más específica.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Any]] = ()):
+        self._tables = {4: {}, 6: {}}
+        self._v4 = ()
+        self._v6 = ()
+        for cidr, value in entries:
+            self.add(cidr, value)
+
+    def add(self, cidr: str, value: Any) -> None:
+        """Añade una red; lanza ValueError si el CIDR no es válido"""
+        network = ipaddress.ip_network(cidr, strict=False)
+        bits = network.max_prefixlen
+        by_length = self._tables[network.version].setdefault(network.prefixlen, {})
+        by_length[int(network.network_address) >> (bits - network.prefixlen)] = value
+        self._rebuild(network.version)
+
+    def _rebuild(self, version: int) -> None:
+        bits = 32 if version == 4 else 128
+        ordered = tuple(
+            (bits - length, table)
+            for length, table in sorted(self._tables[version].items(), reverse=True)
+        )
+        if version == 4:
+            self._v4 = ordered
+        else:
+            self._v6 = ordered
+
+    def lookup(self, ip: Optional[str]) -> Optional[Any]:
+        """Devuelve el valor del prefijo más largo que contiene ``ip``, o None"""
+        if not ip:
+            return None
+        try:
+            if ":" not in ip:
+                address = int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+                levels = self._v4
+            else:
+                packed = socket.inet_pton(socket.AF_INET6, ip)
+                if packed[:12] == _V4_MAPPED_PREFIX:
+                    # IPv4 mapeada en IPv6 (::ffff:a.b.c.d)
+                    address = int.from_bytes(packed[12:], "big")
+                    levels = self._v4
+                else:
+                    address = int.from_bytes(packed, "big")
+                    levels = self._v6
+        except OSError:
+            return None
+        for shift, table in levels:
+            value = table.get(address >> shift)
+            if value is not None:
+                return value
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(table) for tables in self._tables.values() for table in tables.values())
@@ -0,0 +1,254 @@
+"""
+Limitación de peticiones compartida entre los workers de gunicorn
+
+Cada límite es una ventana deslizante aproximada (contador de la ventana
+actual + la anterior ponderada por el tiempo que queda de ella) por IP o por
+usuario. Los contadores viven en un fichero SQLite en modo WAL, así que todos
+los procesos del host ven los mismos sin servicios externos; cada comprobación
+es una sola sentencia ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING``,
+atómica entre procesos.
+
+Los límites se configuran por grupo en ``RATELIMITS``::
+
+    RATELIMITS = {"login": {"ip": "30/m", "user": "10/m"}}
+
+Las peticiones rechazadas también cuentan: un cliente que insiste sigue
+bloqueado hasta que baja el ritmo. Si el almacén falla se deja pasar la
+petición (fail-open) y se registra un aviso.
+"""
+import hashlib
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from utils.sqlite import LocalConnection
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY = 1000  # comprobaciones entre limpiezas de contadores caducados
+BUSY_TIMEOUT = 1.0  # segundos esperando el lock del fichero antes de dejar pasar
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([smhd])\s*$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ratelimit (
+    key TEXT PRIMARY KEY,
+    window INTEGER NOT NULL,
+    current INTEGER NOT NULL,
+    previous INTEGER NOT NULL,
+    expires_at INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+# Las expresiones del SET ven los valores antiguos de la fila
+_HIT = """
+INSERT INTO ratelimit (key, window, current, previous, expires_at) VALUES (?, ?, 1, 0, ?)
+ON CONFLICT (key) DO UPDATE SET
+    previous = CASE
+        WHEN window = excluded.window THEN previous
+        WHEN window = excluded.window - 1 THEN current
+        ELSE 0 END,
+    current = CASE WHEN window = excluded.window THEN current + 1 ELSE 1 END,
+    window = excluded.window,
+    expires_at = excluded.expires_at
+RETURNING current, previous
+"""
+
+
+class RateLimited(Exception):
+    """Se superó un límite; ``retry_after`` son los segundos hasta poder reintentar"""
+
+    def __init__(self, group: str, scope: str, retry_after: float):
+        super().__init__(f"Límite '{group}' superado por {scope}")
+        self.group = group
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Rate:
+    """``limit`` peticiones cada ``period`` segundos"""
+    limit: int
+    period: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        """Interpretar "10/m", "5/15m", "100/h"..."""
+        match = _RATE_RE.match(value)
+        if not match:
+            raise ValueError(f"Límite inválido: {value!r}")
+        limit, multiplier, unit = match.groups()
+        return cls(int(limit), int(multiplier or 1) * _UNITS[unit])
+
+
+class SQLiteStore:
+    """Contadores de ventana deslizante en un fichero SQLite compartido"""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._db = LocalConnection(path, timeout=BUSY_TIMEOUT, schema=[_SCHEMA])
+        self._hits = 0
+
+    def _connection(self):
+        return self._db.get()
+
+    def hit(self, key: str, rate: Rate, now: Optional[float] = None) -> float:
+        """
+        Contar una petición para ``key``
+
+        Returns:
+            0 si está dentro del límite; si no, segundos hasta poder reintentar
+        """
+        now = time.time() if now is None else now
+        window, offset = divmod(now, rate.period)
+        window = int(window)
+        conn = self._connection()
+        # fetchall: la sentencia (y su lock de escritura) no termina hasta consumir el cursor
+        [(current, previous)] = conn.execute(_HIT, (key, window, (window + 2) * rate.period)).fetchall()
+        self._hits += 1
+        if self._hits % PRUNE_EVERY == 0:
+            self.prune(now)
+        return _retry_after(rate, current, previous, offset)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Borrar contadores que ya no influyen en ninguna ventana"""
+        now = time.time() if now is None else now
+        return self._connection().execute("DELETE FROM ratelimit WHERE expires_at < ?", (int(now),)).rowcount
+
+    def clear(self):
+        self._connection().execute("DELETE FROM ratelimit")
+
+    def close(self):
+        self._db.close()
+
+
+def _retry_after(rate: Rate, current: int, previous: int, offset: float) -> float:
+    """Segundos hasta que un reintento quepa en la ventana deslizante"""
+    period, limit = rate.period, rate.limit
+    if previous * (1 - offset / period) + current <= limit:
+        return 0.0
+    room = limit - current - 1  # huecos para el reintento en la ventana actual
+    if room >= 0:
+        # Basta con que la ventana anterior pierda peso: previous * w + current + 1 <= limit
+        wait = period * (1 - room / previous) - offset
+    else:
+        # En la siguiente ventana la actual pasa a ser la anterior
+        wait = period - offset + period * (1 - (limit - 1) / current)
+    return max(wait, 1.0)
+
+
+class RateLimiter:
+    """
+    Límites por grupo y ámbito (``ip`` o ``user``)
+
+    Args:
+        store: Almacén de contadores
+        limits: ``{grupo: {ámbito: "N/periodo"}}``
+        enabled: Desactivar sin quitar las comprobaciones de las vistas
+    """
+
+    def __init__(self, store, limits: dict, enabled: bool = True):
+        self.store = store
+        self.enabled = enabled
+        self.limits = {
+            group: {scope: Rate.parse(rate) for scope, rate in scopes.items()}
+            for group, scopes in limits.items()
+        }
+
+    def check(self, group: str, ip: Optional[str] = None, user: Optional[str] = None, now: Optional[float] = None):
+        """
+        Contar la petición en cada límite del grupo y lanzar RateLimited si supera alguno
+
+        Los ámbitos sin identificador (p. ej. ``user`` anónimo) no se comprueban.
+        """
+        if not self.enabled:
+            return
+        identities = {"ip": ip, "user": user}
+        for scope, rate in self.limits.get(group, {}).items():
+            identity = identities.get(scope)
+            if not identity:
+                continue
+            digest = hashlib.blake2b(str(identity).encode(), digest_size=12).hexdigest()
+            try:
+                retry_after = self.store.hit(f"{group}:{scope}:{digest}:{rate.period}", rate, now)
+            except sqlite3.Error:
+                logger.warning("Almacén de rate limit no disponible", exc_info=True, extra={"group": group})
+                return
+            if retry_after:
+                raise RateLimited(group, scope, retry_after)
+
+
+def client_ip(request) -> str:
+    return request.META.get("REMOTE_ADDR", "")
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """Limitador del proceso, configurado con RATELIMIT_*"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(
+                    SQLiteStore(settings.RATELIMIT_DB_PATH),
+                    settings.RATELIMITS,
+                    enabled=settings.RATELIMIT_ENABLED,
+                )
+    return _limiter
+
+
+@receiver(setting_changed)
+def _reset_limiter(*, setting, **kwargs):
+    global _limiter
+    if setting.startswith("RATELIMIT"):
+        with _limiter_lock:
+            if _limiter is not None:
+                _limiter.store.close()
+            _limiter = None
+
+
+def check(group: str, request, user: Optional[str] = None):
+    """
+    Comprobar los límites de ``group`` para la petición
+
+    Args:
+        user: Identificador de usuario; por defecto el usuario autenticado
+    """
+    if user is None and request.user.is_authenticated:
+        user = request.user.pk
+    get_limiter().check(group, ip=client_ip(request), user=user)
+
+
+class RateLimitMiddleware:
+    """429 con Retry-After para los límites que saltan fuera de las vistas (p. ej. el backend de login)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, RateLimited):
+            return None
+        response = HttpResponse(
+            "Demasiados intentos. Espera un poco antes de volver a intentarlo.",
+            status=429,
+            content_type="text/plain; charset=utf-8",
+        )
+        response["Retry-After"] = str(math.ceil(exception.retry_after))
+        return response
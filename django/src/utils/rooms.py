@@ -0,0 +1,89 @@
+"""
+Generación de nombres de sala únicos y ordenados por tiempo
+"""
+import os
+import threading
+import time
+from collections import deque
+
+# Base32 de Crockford en minúsculas: orden ASCII == orden numérico
+ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+TIME_CHARS = 10  # 48 bits de milisegundos
+RANDOM_BITS = 80
+RANDOM_CHARS = 16
+STEP_BITS = 64  # salto aleatorio entre nombres del mismo milisegundo
+
+
+def _random_bits(bits: int) -> int:
+    return int.from_bytes(os.urandom(bits // 8), "big")
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+class RoomAllocator:
+    """
+    Genera nombres de sala al estilo ULID: ``<prefijo><ms><aleatorio>``
+
+    Los 10 primeros caracteres codifican el instante en milisegundos, así que
+    los nombres se ordenan por creación y las inserciones en el índice único
+    de ``Meeting.room`` van al final del B-tree. Los 80 bits aleatorios evitan
+    colisiones entre procesos; dentro de un proceso, si el reloj no avanza
+    (o retrocede) la parte aleatoria avanza un salto aleatorio de hasta 64
+    bits para mantener el orden. El nombre es el único secreto de una sala
+    pública: conocer uno no permite adivinar los vecinos.
+
+    Con ``pool_size`` > 0 los nombres se generan por lotes y se sirven desde
+    una reserva, amortizando el lock y la lectura del reloj.
+    """
+
+    def __init__(self, prefix: str = "room-", pool_size: int = 0):
+        self.prefix = prefix
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._last_random = 0
+        self._pool = deque()
+
+    def _next_locked(self) -> str:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > self._last_ms:
+            self._last_ms = now_ms
+            self._last_random = _random_bits(RANDOM_BITS)
+        else:
+            # Mismo milisegundo o reloj hacia atrás: avanzar un salto aleatorio (no +1)
+            self._last_random += 1 + _random_bits(STEP_BITS)
+            if self._last_random >> RANDOM_BITS:
+                # Desbordamiento: milisegundo siguiente con aleatoriedad nueva
+                self._last_ms += 1
+                self._last_random = _random_bits(RANDOM_BITS)
+        return self.prefix + _encode(self._last_ms, TIME_CHARS) + _encode(self._last_random, RANDOM_CHARS)
+
+    def allocate(self) -> str:
+        """Devuelve un nombre de sala nuevo"""
+        with self._lock:
+            if self.pool_size <= 0:
+                return self._next_locked()
+            if not self._pool:
+                self._pool.extend(self._next_locked() for _ in range(self.pool_size))
+            return self._pool.popleft()
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator() -> RoomAllocator:
+    """Allocator del proceso, configurado con settings.JITSI_ROOM_POOL_SIZE"""
+    global _allocator
+    if _allocator is None:
+        from django.conf import settings
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = RoomAllocator(pool_size=getattr(settings, "JITSI_ROOM_POOL_SIZE", 0))
+    return _allocator
@@ -0,0 +1,143 @@
+"""
+Valores caros en cache con single-flight y stale-while-revalidate
+
+Cuando una entrada caduca no se recalcula en todas las peticiones a la vez:
+
+- Fallo (no hay entrada): dentro del worker, los hilos que piden la misma
+  clave esperan al primero; entre workers, solo el que consigue la clave de
+  lock (``cache.add``) calcula y el resto consulta la cache hasta que aparece
+  el valor (o hasta ``lock_timeout``, y entonces calcula por su cuenta).
+- Entrada caducada (``ttl``) pero dentro de ``stale_ttl``: un único llamante
+  la recalcula y los demás reciben el valor anterior sin esperar.
+
+La entrada se guarda como ``(valor, fresco_hasta)`` con un timeout de
+``ttl + stale_ttl`` en el backend.
+"""
+import logging
+import threading
+import time
+
+from django.core.cache import cache as default_cache
+
+from utils.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 10.0  # segundos que se espera (y se reserva el lock) para un cálculo
+POLL_INTERVAL = 0.02  # primera espera entre consultas mientras otro worker calcula
+
+metrics = Metrics()
+
+
+class _Flight:
+    """Cálculo en curso dentro del worker"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _lock_key(key: str) -> str:
+    return f"{key}:lock"
+
+
+def _store(cache, key, value, ttl, stale_ttl):
+    cache.set(key, (value, time.time() + ttl), ttl + stale_ttl)
+    return value
+
+
+def get_or_compute(key: str, compute, ttl: float, stale_ttl: float = None, lock_timeout: float = LOCK_TIMEOUT,
+                   cache=None):
+    """
+    Valor de ``key`` o resultado de ``compute()`` calculado una sola vez
+
+    Args:
+        key: Clave de cache
+        compute: Función sin argumentos que calcula el valor
+        ttl: Segundos que el valor se considera fresco
+        stale_ttl: Segundos adicionales en los que se sirve caducado mientras
+            alguien lo recalcula (por defecto igual a ``ttl``)
+        lock_timeout: Espera máxima por el cálculo de otro llamante
+        cache: Backend (por defecto ``django.core.cache.cache``)
+    """
+    cache = default_cache if cache is None else cache
+    stale_ttl = ttl if stale_ttl is None else stale_ttl
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() < fresh_until:
+            metrics.incr("fresh_hits")
+            return value
+        return _revalidate(cache, key, value, compute, ttl, stale_ttl, lock_timeout)
+    return _coalesce(cache, key, compute, ttl, stale_ttl, lock_timeout)
+
+
+def _revalidate(cache, key, stale, compute, ttl, stale_ttl, lock_timeout):
+    """Entrada caducada: recalcula quien consiga el lock; el resto recibe el valor anterior"""
+    lock = _lock_key(key)
+    if not cache.add(lock, 1, lock_timeout):
+        metrics.incr("stale_hits")
+        return stale
+    metrics.incr("refreshes")
+    try:
+        return _store(cache, key, compute(), ttl, stale_ttl)
+    except Exception:
+        logger.warning("Error recalculando un valor en cache; se sirve el anterior", exc_info=True,
+                       extra={"key": key})
+        return stale
+    finally:
+        cache.delete(lock)
+
+
+def _coalesce(cache, key, compute, ttl, stale_ttl, lock_timeout):
+    """Sin entrada: un cálculo por worker y, con el lock de la cache, uno entre workers"""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        metrics.incr("coalesced")
+        if flight.done.wait(lock_timeout):
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        metrics.incr("wait_timeouts")
+        return compute()
+    try:
+        flight.value = _compute_once(cache, key, compute, ttl, stale_ttl, lock_timeout)
+        return flight.value
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def _compute_once(cache, key, compute, ttl, stale_ttl, lock_timeout):
+    lock = _lock_key(key)
+    if cache.add(lock, 1, lock_timeout):
+        metrics.incr("misses")
+        try:
+            return _store(cache, key, compute(), ttl, stale_ttl)
+        finally:
+            cache.delete(lock)
+    # Otro worker lo está calculando: esperar a que aparezca
+    metrics.incr("coalesced")
+    deadline = time.monotonic() + lock_timeout
+    interval = POLL_INTERVAL
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        interval = min(interval * 2, 0.2)
+    metrics.incr("wait_timeouts")
+    return _store(cache, key, compute(), ttl, stale_ttl)
@@ -0,0 +1,101 @@
+"""
+Ficheros SQLite compartidos por los procesos del host
+
+Base de los almacenes locales sin servicio externo (rate limiting, cache):
+cada hilo abre su propia conexión en modo WAL y la vuelve a abrir tras un
+fork, de modo que los workers de gunicorn nunca comparten un descriptor.
+
+Estos ficheros guardan valores serializados con pickle y datos de usuario: se
+crean con permisos 0600 (y su directorio con 0700) y no se abren si pertenecen
+a otro usuario, que podría haber plantado un pickle malicioso.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Ficheros auxiliares que SQLite crea junto a la base de datos en modo WAL
+_COMPANIONS = ("-wal", "-shm")
+
+
+def ensure_private(path) -> None:
+    """
+    Crear ``path`` (y su directorio) solo accesible para el usuario del proceso
+
+    Raises:
+        PermissionError: Si el fichero, o uno de sus auxiliares, pertenece a otro usuario
+    """
+    path = str(path)
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    try:
+        _check_owner(path, fd)
+    finally:
+        os.close(fd)
+    for suffix in _COMPANIONS:
+        try:
+            fd = os.open(path + suffix, os.O_RDWR | getattr(os, "O_NOFOLLOW", 0))
+        except FileNotFoundError:
+            continue
+        try:
+            _check_owner(path + suffix, fd)
+        finally:
+            os.close(fd)
+
+
+def _check_owner(path: str, fd: int) -> None:
+    stat = os.fstat(fd)
+    if hasattr(os, "getuid") and stat.st_uid != os.getuid():
+        raise PermissionError(f"{path} pertenece a otro usuario (uid {stat.st_uid}); no se abre")
+    if stat.st_mode & 0o077:
+        os.fchmod(fd, 0o600)
+
+
+class LocalConnection:
+    """
+    Una conexión en autocommit por hilo y proceso
+
+    Args:
+        path: Fichero de la base de datos
+        timeout: Segundos esperando un lock antes de fallar
+        schema: Sentencias que se ejecutan al abrir (CREATE ... IF NOT EXISTS)
+    """
+
+    def __init__(self, path, timeout: float = 5.0, schema=()):
+        self.path = str(path)
+        self.timeout = timeout
+        self.schema = tuple(schema)
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            ensure_private(self.path)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Son datos reconstruibles: perder las últimas escrituras en un corte de luz no importa
+            conn.execute("PRAGMA synchronous=OFF")
+            for statement in self.schema:
+                conn.execute(statement)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+@contextmanager
+def immediate(conn: sqlite3.Connection):
+    """Transacción que toma el lock de escritura al empezar (sin deadlocks al promocionar)"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
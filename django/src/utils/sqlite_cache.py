@@ -0,0 +1,247 @@
+"""
+Backend de cache compartido por los workers del host sobre SQLite (WAL)
+
+``LocMemCache`` guarda una copia por proceso: borrar una clave en un worker
+no la borra en los demás y cada uno tiene su propio límite de entradas. Este
+backend guarda las entradas en un fichero SQLite que leen todos los procesos
+sin servicio externo. El fichero va en un directorio privado del servicio
+(``LOCAL_STATE_DIR``, no ``/tmp``): guarda hashes de contraseñas::
+
+    CACHES = {"default": {
+        "BACKEND": "utils.sqlite_cache.SQLiteCache",
+        "LOCATION": str(LOCAL_STATE_DIR / "cache.sqlite3"),
+        "OPTIONS": {"MAX_ENTRIES": 10000, "MAX_SIZE": 64 * 1024 * 1024},
+    }}
+
+- Expiración por TTL y desalojo LRU al superar ``MAX_ENTRIES`` o ``MAX_SIZE``
+  (bytes de los valores); se desaloja 1/``CULL_FREQUENCY`` de las entradas.
+- Los enteros se guardan como INTEGER de SQLite, así ``incr``/``decr`` son un
+  único ``UPDATE`` atómico entre procesos; ``add`` es un upsert condicional.
+- Para no convertir cada lectura en una escritura, la marca de último acceso
+  solo se actualiza si tiene más de ``LRU_RESOLUTION`` segundos.
+"""
+import pickle
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from utils.sqlite import LocalConnection, immediate
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)",
+    # Número de entradas y bytes mantenidos por triggers en la misma transacción
+    """
+    CREATE TABLE IF NOT EXISTS cache_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        entries INTEGER NOT NULL,
+        bytes INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO cache_stats (id, entries, bytes) VALUES (0, 0, 0)",
+    # Entradas desalojadas por _cull (caducadas o LRU), acumulado de todos los procesos
+    """
+    CREATE TABLE IF NOT EXISTS cache_evictions (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        evictions INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO cache_evictions (id, evictions) VALUES (0, 0)",
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+        UPDATE cache_stats SET entries = entries + 1, bytes = bytes + length(NEW.value);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+        UPDATE cache_stats SET entries = entries - 1, bytes = bytes - length(OLD.value);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF value ON cache BEGIN
+        UPDATE cache_stats SET bytes = bytes + length(NEW.value) - length(OLD.value);
+    END
+    """,
+]
+
+_LIVE = "(expires IS NULL OR expires > ?)"
+
+_SET = """
+INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value, expires = excluded.expires, accessed = excluded.accessed
+"""
+
+# Solo sustituye entradas caducadas; rowcount 0 si la clave sigue viva
+_ADD = _SET + " WHERE cache.expires IS NOT NULL AND cache.expires <= excluded.accessed"
+
+_INT_MIN, _INT_MAX = -(2 ** 63), 2 ** 63 - 1
+
+
+class SQLiteCache(BaseCache):
+    """Cache en un fichero SQLite compartido (``LOCATION``) con TTL y LRU"""
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._max_size = int(options.get("MAX_SIZE", 0)) or None
+        self._lru_resolution = float(options.get("LRU_RESOLUTION", 1.0))
+        self._db = LocalConnection(location, timeout=float(options.get("BUSY_TIMEOUT", 5.0)), schema=_SCHEMA)
+
+    # Los enteros van sin serializar para que SQLite pueda sumarlos
+    def _encode(self, value):
+        if type(value) is int and _INT_MIN <= value <= _INT_MAX:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _decode(value):
+        return pickle.loads(value) if isinstance(value, bytes) else value
+
+    def _touch(self, conn, keys, accessed, now):
+        stale = [key for key, last in zip(keys, accessed) if now - last >= self._lru_resolution]
+        if stale:
+            conn.execute(
+                f"UPDATE cache SET accessed = ? WHERE key IN ({', '.join('?' * len(stale))})", [now, *stale]
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        conn = self._db.get()
+        row = conn.execute("SELECT value, expires, accessed FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires <= ?", (key, now))
+            return default
+        self._touch(conn, [key], [accessed], now)
+        return self._decode(value)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        by_key = {self.make_and_validate_key(key, version=version): key for key in keys}
+        now = time.time()
+        conn = self._db.get()
+        rows = conn.execute(
+            f"SELECT key, value, accessed FROM cache WHERE key IN ({', '.join('?' * len(by_key))}) AND {_LIVE}",
+            [*by_key, now],
+        ).fetchall()
+        self._touch(conn, [row[0] for row in rows], [row[2] for row in rows], now)
+        return {by_key[key]: self._decode(value) for key, value, _ in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = [
+            (self.make_and_validate_key(key, version=version), self._encode(value), expires, now)
+            for key, value in data.items()
+        ]
+        with immediate(self._db.get()) as conn:
+            conn.executemany(_SET, rows)
+            self._cull(conn, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with immediate(self._db.get()) as conn:
+            added = conn.execute(_ADD, (key, self._encode(value), self.get_backend_timeout(timeout), now)).rowcount
+            if added:
+                self._cull(conn, now)
+        return bool(added)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with immediate(self._db.get()) as conn:
+            # fetchall: el UPDATE ... RETURNING no termina hasta consumir el cursor
+            rows = conn.execute(
+                f"UPDATE cache SET value = value + ?, accessed = ? "
+                f"WHERE key = ? AND {_LIVE} AND typeof(value) = 'integer' RETURNING value",
+                (delta, now, key, now),
+            ).fetchall()
+            if rows:
+                return rows[0][0]
+            # Valores no enteros (p. ej. bool): mismo resultado que el resto de backends
+            row = conn.execute(f"SELECT value FROM cache WHERE key = ? AND {_LIVE}", (key, now)).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._decode(row[0]) + delta
+            conn.execute("UPDATE cache SET value = ?, accessed = ? WHERE key = ?", (self._encode(value), now, key))
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        return bool(self._db.get().execute(
+            f"UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND {_LIVE}",
+            (self.get_backend_timeout(timeout), now, key, now),
+        ).rowcount)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._db.get().execute(
+            f"SELECT 1 FROM cache WHERE key = ? AND {_LIVE}", (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._db.get().execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self._db.get().execute(f"DELETE FROM cache WHERE key IN ({', '.join('?' * len(keys))})", keys)
+
+    def clear(self):
+        self._db.get().execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # Las conexiones por hilo se reutilizan entre peticiones
+        pass
+
+    def stats(self) -> dict:
+        """Entradas y bytes almacenados y entradas desalojadas al superar los límites"""
+        entries, size, evictions = self._db.get().execute(
+            "SELECT entries, bytes, evictions FROM cache_stats, cache_evictions"
+        ).fetchone()
+        return {"entries": entries, "bytes": size, "evictions": evictions}
+
+    def _over_limit(self, conn):
+        entries, size = conn.execute("SELECT entries, bytes FROM cache_stats").fetchone()
+        over = entries > self._max_entries or (self._max_size is not None and size > self._max_size)
+        return over, entries
+
+    def _cull(self, conn, now):
+        """Dentro de la transacción de escritura: caducadas primero y luego las menos usadas"""
+        over, entries = self._over_limit(conn)
+        if not over:
+            return
+        evicted = conn.execute("DELETE FROM cache WHERE expires <= ?", (now,)).rowcount
+        over, entries = self._over_limit(conn)
+        while over and entries:
+            if self._cull_frequency == 0:
+                evicted += conn.execute("DELETE FROM cache").rowcount
+                break
+            evicted += conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                (max(1, entries // self._cull_frequency),),
+            ).rowcount
+            over, entries = self._over_limit(conn)
+        if evicted:
+            conn.execute("UPDATE cache_evictions SET evictions = evictions + ?", (evicted,))
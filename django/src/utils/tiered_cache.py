@@ -0,0 +1,196 @@
+"""
+Cache en dos niveles: LRU en el proceso (L1) delante de la cache de Django (L2)
+
+Los valores más leídos (usuario de la sesión, versiones de usuario,
+estadísticas de admin) son pequeños y se leen en cada petición; incluso la
+cache compartida cuesta una llamada al sistema y un lock por lectura. La L1
+los guarda unos segundos en memoria del worker:
+
+- Las escrituras, borrados e ``incr`` van a la L2 y descartan la copia local.
+- Los demás workers ven el cambio cuando caduca su copia (``ttl``, corto).
+  Las invalidaciones viajan por las claves de versión de la L2
+  (``user_version_{id}``): se guardan en L1 con ese TTL corto, mientras que
+  las entradas versionadas, que nunca cambian, pueden usar uno largo
+  (``with_ttl``).
+- Los valores mutables se guardan serializados, como en LocMemCache, para que
+  dos peticiones no compartan el mismo objeto.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+_MISSING = object()
+_IMMUTABLE = (int, float, str, bytes, bool, type(None))
+
+
+class LocalLRU:
+    """LRU acotada con expiración por entrada y contadores (la L1)"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, now: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires, pickled, value = entry
+            if expires <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return pickle.loads(value) if pickled else value
+
+    def set(self, key, value, expires: float) -> None:
+        if self.maxsize <= 0:
+            return
+        pickled = not isinstance(value, _IMMUTABLE)
+        entry = (expires, pickled, pickle.dumps(value, pickle.HIGHEST_PROTOCOL) if pickled else value)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class _L2Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+class TwoTierCache:
+    """
+    Subconjunto de la API de cache de Django con una L1 en el proceso
+
+    Args:
+        l2: Cache compartida (por defecto ``django.core.cache.cache``)
+        maxsize: Entradas de la L1
+        ttl: Segundos que una entrada vive en la L1 (máximo retraso entre workers)
+    """
+
+    def __init__(self, l2=None, maxsize: int = 1024, ttl: float = 1.0):
+        self.l2 = default_cache if l2 is None else l2
+        self.ttl = ttl
+        self.l1 = LocalLRU(maxsize)
+        self._l2_stats = _L2Stats()
+
+    def with_ttl(self, ttl: float) -> "TwoTierCache":
+        """Misma L1 y contadores con otro TTL local (p. ej. para claves versionadas)"""
+        view = object.__new__(TwoTierCache)
+        view.__dict__.update(self.__dict__, ttl=ttl)
+        return view
+
+    def get(self, key, default=None):
+        value = self.l1.get(key, time.time())
+        if value is not _MISSING:
+            return value
+        value = self.l2.get(key, _MISSING)
+        self._l2_stats.record(value is not _MISSING)
+        if value is _MISSING:
+            return default
+        self.l1.set(key, value, time.time() + self.ttl)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self.l2.set(key, value, timeout)
+        self.l1.set(key, value, time.time() + self.ttl)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT) -> bool:
+        # Siempre contra la L2: es la que decide entre workers (locks, contadores)
+        self.l1.discard(key)
+        return self.l2.add(key, value, timeout)
+
+    def incr(self, key, delta=1):
+        self.l1.discard(key)
+        return self.l2.incr(key, delta)
+
+    def delete(self, key) -> bool:
+        self.l1.discard(key)
+        return self.l2.delete(key)
+
+    def clear(self) -> None:
+        """Vaciar la L1 de este worker y la L2"""
+        self.l1.clear()
+        self.l2.clear()
+
+    def stats(self) -> dict:
+        """Contadores por nivel de este worker, para dimensionar la L1"""
+        l1, l2 = self.l1.stats(), self._l2_stats.stats()
+        # Desalojos de la L2 compartida (todos los workers); None si el backend no los cuenta
+        backend_stats = getattr(self.l2, "stats", None)
+        l2["evictions"] = backend_stats().get("evictions") if callable(backend_stats) else None
+        for tier in (l1, l2):
+            lookups = tier["hits"] + tier["misses"]
+            tier["hit_ratio"] = round(tier["hits"] / lookups, 4) if lookups else None
+        return {"l1": l1, "l2": l2}
+
+
+_tiered = None
+_tiered_lock = threading.Lock()
+
+
+def get_tiered_cache() -> TwoTierCache:
+    """Cache en dos niveles del proceso, configurada con TIERED_CACHE_*"""
+    global _tiered
+    if _tiered is None:
+        with _tiered_lock:
+            if _tiered is None:
+                _tiered = TwoTierCache(maxsize=settings.TIERED_CACHE_L1_SIZE, ttl=settings.TIERED_CACHE_L1_TTL)
+    return _tiered
+
+
+@receiver(setting_changed)
+def _reset_tiered(*, setting, **kwargs):
+    global _tiered
+    if setting.startswith("TIERED_CACHE_") or setting == "CACHES":
+        _tiered = None
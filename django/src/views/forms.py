@@ -1,5 +1,5 @@
 from django import forms
-from django.contrib.auth.hashers import make_password
+from utils.hashing import make_password
 from models.models import SignupRequest
 
 
@@ -1,19 +1,37 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import get_user_model
-from django.http import Http404
+import math
+import time
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.core.exceptions import PermissionDenied
-from django.views.decorators.cache import cache_page
-from django.core.cache import cache
+from django.views.decorators.cache import cache_page, never_cache
 from models.models import SignupRequest, Meeting, UserProfile
 from .forms import SignupRequestForm
 from models.permissions import require_admin, require_registered
+from models.principal import get_principal
+from models import approval, moderation
+from models.counters import cached_counters, role_key, signup_key, USERS, USERS_ACTIVE, MEETINGS, SIGNUP_REQUESTS
+from utils import ratelimit, singleflight
+from utils.hashing import RETRY_AFTER as HASHING_RETRY_AFTER, HashingUnavailable
+from utils.pagination import KeysetPaginator
+from utils.tiered_cache import get_tiered_cache
+from utils.jitsi import (
+    MEDIA_P2P, cached_jitsi_jwt, config_url_hash, generate_meeting_links, get_config, get_ice_servers,
+    ice_region_for, jitsi_metrics, media_config_fragment, participant_regions, turn_credentials,
+)
 
 User = get_user_model()
 
+# Meetings por respuesta de export_meetings; el resto, con ?after=<next>
+EXPORT_PER_PAGE = 500
+
 
 def home(request):
     """Homepage pública: formulario de solicitud + login"""
@@ -21,35 +39,48 @@ def home(request):
     if request.user.is_authenticated:
         return redirect("dashboard")
     
-    if request.method == "POST" and "signup_request" in request.POST:
-        form = SignupRequestForm(request.POST)
-        if form.is_valid():
-            form.save()
-            messages.success(request, "Solicitud enviada. Te avisaremos cuando sea aprobada.")
-            return redirect("home")
-    else:
-        form = SignupRequestForm()
-    
-    login_form = AuthenticationForm(request, data=request.POST or None)
-    if request.method == "POST" and "login" in request.POST and login_form.is_valid():
-        user = login_form.get_user()
-        login(request, user)
-        # Limpiar cache del usuario al hacer login
-        cache_key = f"user_info_{user.id}"
-        cache.delete(cache_key)
-        return redirect("dashboard")
+    # El hash de contraseñas va al pool de utils.hashing; si está saturado se responde 503.
+    # Los límites se comprueban antes de hashear o escribir nada; si se superan, 429.
+    try:
+        if request.method == "POST" and "signup_request" in request.POST:
+            ratelimit.check("signup", request)
+            form = SignupRequestForm(request.POST)
+            if form.is_valid():
+                form.save()
+                messages.success(request, "Solicitud enviada. Te avisaremos cuando sea aprobada.")
+                return redirect("home")
+        else:
+            form = SignupRequestForm()
+        
+        # El límite de "login" lo aplica el backend (utils.hashing.PooledModelBackend)
+        login_form = AuthenticationForm(request, data=request.POST or None)
+        if request.method == "POST" and "login" in request.POST and login_form.is_valid():
+            user = login_form.get_user()
+            login(request, user)
+            return redirect("dashboard")
+    except HashingUnavailable:
+        messages.error(request, "El servidor está ocupado. Inténtalo de nuevo en unos segundos.")
+        return _home_unavailable(request, status=503, retry_after=HASHING_RETRY_AFTER)
+    except ratelimit.RateLimited as exc:
+        messages.error(request, "Demasiados intentos. Espera un poco antes de volver a intentarlo.")
+        return _home_unavailable(request, status=429, retry_after=exc.retry_after)
     
     return render(request, "home.html", {"form": form, "login_form": login_form})
 
 
+def _home_unavailable(request, status, retry_after):
+    """Volver a mostrar la home sin procesar el POST, con Retry-After"""
+    form = SignupRequestForm(request.POST if "signup_request" in request.POST else None)
+    login_form = AuthenticationForm(request)
+    response = render(request, "home.html", {"form": form, "login_form": login_form}, status=status)
+    response["Retry-After"] = str(math.ceil(retry_after))
+    return response
+
+
 @login_required
 def dashboard(request):
     """Dashboard principal que muestra contenido según el rol del usuario"""
-    user_info = get_user_info(request)
-    if user_info:
-        role = user_info['role']
-    else:
-        role = "GUEST"
+    role = request.principal.role
     
     # Mostrar contenido según el rol
     if role == "ENV_ADMIN":
@@ -65,16 +96,14 @@ def dashboard(request):
 @login_required
 def env_admin_dashboard(request):
     """Dashboard para ENV_ADMIN - Control total del sistema"""
-    require_admin(request.user)
+    require_admin(request.principal)
     
-    # Estadísticas del sistema
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
-    
-    total_users = User.objects.count()
-    pending_requests = SignupRequest.objects.filter(status=SignupRequest.PENDING).count()
-    approved_requests = SignupRequest.objects.filter(status=SignupRequest.APPROVED).count()
-    total_meetings = Meeting.objects.count()
+    # Estadísticas del sistema (tabla de contadores: una sola consulta)
+    counters = cached_counters()
+    total_users = counters[USERS]
+    pending_requests = counters[signup_key(SignupRequest.PENDING)]
+    approved_requests = counters[signup_key(SignupRequest.APPROVED)]
+    total_meetings = counters[MEETINGS]
     
     # Últimas solicitudes
     recent_requests = SignupRequest.objects.all().order_by("-created_at")[:5]
@@ -92,7 +121,7 @@ def env_admin_dashboard(request):
 @login_required
 def web_admin_dashboard(request):
     """Dashboard para WEB_ADMIN - Gestión de usuarios y solicitudes"""
-    require_admin(request.user)
+    require_admin(request.principal)
     
     # Solo solicitudes pendientes para web admin
     pending_requests = SignupRequest.objects.filter(status=SignupRequest.PENDING).order_by("-created_at")
@@ -108,17 +137,51 @@ def web_admin_dashboard(request):
 @login_required
 def user_dashboard(request):
     """Dashboard para USER - Sus meetings y funcionalidades básicas"""
-    require_registered(request.user)
+    require_registered(request.principal)
     
-    # Meetings del usuario
-    meetings = Meeting.objects.filter(owner=request.user).order_by("-created_at")
+    # Meetings del usuario; los links apuntan a join_meeting, que firma el JWT al hacer clic
+    # Paginación por cursor sobre (created_at, id): sin OFFSET ni COUNT
+    page = KeysetPaginator(Meeting.objects.filter(owner=request.user)).page(
+        after=request.GET.get("after", ""), before=request.GET.get("before", "")
+    )
+    for m in page:
+        m.owner = request.user  # el owner ya es conocido: evita una consulta por fila
     
     return render(request, "dashboards/user_dashboard.html", {
-        "meetings": meetings,
+        "meetings": page,
+        "page": page,
         "user_info": get_user_info(request)
     })
 
 
+@never_cache
+@login_required
+def export_meetings(request):
+    """Exportar en JSON los meetings del usuario con su link directo a Jitsi"""
+    require_registered(request.principal)
+    
+    # Links en bloque: propietario conocido (sin consultas extra) y una firma por sala sin token en cache
+    page = KeysetPaginator(Meeting.objects.filter(owner=request.user), per_page=EXPORT_PER_PAGE).page(
+        after=request.GET.get("after", "")
+    )
+    links = generate_meeting_links(page, request.user)
+    response = JsonResponse({
+        "meetings": [
+            {
+                "room": m.room,
+                "is_private": m.is_private,
+                "created_at": m.created_at.isoformat(),
+                "join_url": request.build_absolute_uri(reverse("join_meeting", args=[m.pk])),
+                "jitsi_url": links[m.room],
+            }
+            for m in page
+        ],
+        "next": page.next_cursor,
+    })
+    response["Content-Disposition"] = 'attachment; filename="meetings.json"'
+    return response
+
+
 @login_required
 def guest_dashboard(request):
     """Dashboard para GUEST - Información limitada"""
@@ -130,15 +193,25 @@ def guest_dashboard(request):
 @login_required
 def create_meeting(request):
     """Crear un nuevo meeting (solo usuarios registrados)"""
-    require_registered(request.user)  # USER / WEB_ADMIN / ENV_ADMIN
+    require_registered(request.principal)  # USER / WEB_ADMIN / ENV_ADMIN
     
     if request.method == "POST":
+        try:
+            ratelimit.check("create_meeting", request)
+        except ratelimit.RateLimited as exc:
+            messages.error(request, "Has creado demasiadas reuniones seguidas. Espera un poco.")
+            response = render(request, "create_meeting.html", status=429)
+            response["Retry-After"] = str(math.ceil(exc.retry_after))
+            return response
         is_private = request.POST.get('is_private') == '1'
-        room = Meeting.generate_room()
-        m = Meeting.objects.create(
-            room=room, 
+        jwt_auth = request.POST.get('prosody_login') != '1'
+        expected = request.POST.get('expected_participants', '')
+        expected_participants = int(expected) if expected.isdigit() and int(expected) > 0 else None
+        m = Meeting.create_with_room(
             owner=request.user,
-            is_private=is_private
+            is_private=is_private,
+            jwt_auth=jwt_auth,
+            expected_participants=expected_participants
         )
         messages.success(request, f"Reunión {'privada' if is_private else 'pública'} creada.")
         return redirect("meeting_detail", pk=m.pk)
@@ -146,47 +219,107 @@ def create_meeting(request):
     return render(request, "create_meeting.html")
 
 
+@never_cache
 @login_required
 def meeting_detail(request, pk):
     """Detalle de un meeting con link de Jitsi"""
-    m = get_object_or_404(Meeting, pk=pk)
+    m = get_object_or_404(Meeting.objects.select_related("owner"), pk=pk)
     # Unirse: todos los roles autenticados; GUEST no puede crear, pero sí unirse si tiene link
-    return render(request, "meeting_detail.html", {"meeting": m})
+    join_url = request.build_absolute_uri(reverse("join_meeting", args=[m.pk]))
+    # Sala con login en Jitsi: mostrar la contraseña de authreg del usuario (sin caché: es un secreto)
+    jitsi_login = m.asks_jitsi_login(request.user)
+    return render(request, "meeting_detail.html", {
+        "meeting": m,
+        "join_url": join_url,
+        "jitsi_login": jitsi_login,
+        "jitsi_password": approval.prosody_password(request.user) if jitsi_login else None,
+    })
+
+
+@never_cache
+@login_required
+def join_meeting(request, pk):
+    """Redirigir a Jitsi firmando el JWT solo en el momento de unirse"""
+    m = get_object_or_404(Meeting, pk=pk)
+    base_url = m.jitsi_base_url()
+    
+    # Salas grandes: desactivar P2P en el cliente e indicar su región para elegir bridge;
+    # con participantes de varias regiones, JVB en cascada (Octo)
+    region = ice_region_for(request.META.get("REMOTE_ADDR"))
+    mode = m.media_mode(participant_regions(m.room, region))
+    config_hash = ""
+    if mode != MEDIA_P2P:
+        config_hash = config_url_hash(media_config_fragment(mode, region.name if region else None))
+    
+    if m.is_private:
+        # Sala privada: JWT con la identidad del usuario (sin login en Prosody) si está autorizado
+        return redirect(f"{m.private_jitsi_url(request.user)}{config_hash}")
+    
+    token = cached_jitsi_jwt(room=m.room, user_name=request.user.username)
+    if token:
+        return redirect(f"{base_url}/{m.room}?jwt={token}{config_hash}")
+    return redirect(f"{base_url}/{m.room}{config_hash}")
+
+
+@login_required
+def ice_servers(request):
+    """Lista de servidores ICE (STUN + TURN efímero) para el cliente"""
+    # Una sola lectura: iceServers y ttl salen de las mismas credenciales aunque
+    # la ventana cambie entre medias
+    credentials = turn_credentials(request.user.username)
+    servers = get_ice_servers(request.user.username, request.META.get("REMOTE_ADDR"), credentials)
+    
+    # El cliente puede reutilizar la respuesta mientras las credenciales sigan vigentes
+    if credentials:
+        max_age = max(0, credentials["expires_at"] - int(time.time()))
+    else:
+        max_age = get_config().turn_credential_ttl
+    
+    response = JsonResponse({"iceServers": servers, "ttl": max_age})
+    patch_cache_control(response, private=True, max_age=max_age)
+    return response
 
 
 @login_required
 def admin_requests(request):
     """Lista de solicitudes para admins"""
-    require_admin(request.user)
+    require_admin(request.principal)
     
     # Filtros
     status_filter = request.GET.get('status', '')
-    qs = SignupRequest.objects.all()
+    qs = SignupRequest.objects.select_related('claimed_by')
     
-    if status_filter:
+    if status_filter == 'mine':
+        # Cola de moderación: solicitudes reclamadas por este admin
+        qs = moderation.claimed_by(request.user)
+    elif status_filter:
         qs = qs.filter(status=status_filter)
     
-    qs = qs.order_by("-created_at")
+    page = KeysetPaginator(qs).page(after=request.GET.get("after", ""), before=request.GET.get("before", ""))
     
-    # Estadísticas
+    # Estadísticas (tabla de contadores: una sola consulta)
+    counters = cached_counters()
     stats = {
-        'total': SignupRequest.objects.count(),
-        'pending': SignupRequest.objects.filter(status=SignupRequest.PENDING).count(),
-        'approved': SignupRequest.objects.filter(status=SignupRequest.APPROVED).count(),
-        'rejected': SignupRequest.objects.filter(status=SignupRequest.REJECTED).count(),
+        'total': counters[SIGNUP_REQUESTS],
+        'pending': counters[signup_key(SignupRequest.PENDING)],
+        'approved': counters[signup_key(SignupRequest.APPROVED)],
+        'rejected': counters[signup_key(SignupRequest.REJECTED)],
     }
     
     return render(request, "request_list.html", {
-        "requests": qs,
+        "requests": page,
+        "page": page,
         "stats": stats,
-        "current_filter": status_filter
+        "current_filter": status_filter,
+        "now": timezone.now(),
+        "has_claims": moderation.claimed_by(request.user).exists(),
     })
 
 
 @login_required
 def request_detail(request, pk):
     """Detalle de una solicitud específica para admins"""
-    require_admin(request.user)
+    require_admin(request.principal)
     request_obj = get_object_or_404(SignupRequest, pk=pk)
     return render(request, "request_detail.html", {"request_obj": request_obj})
 
@@ -194,25 +327,20 @@ def request_detail(request, pk):
 @login_required
 def approve_request(request, pk):
     """Aprobar una solicitud"""
-    require_admin(request.user)
+    require_admin(request.principal)
     request_obj = get_object_or_404(SignupRequest, pk=pk)
     
     if request.method == 'POST':
-        decision_note = request.POST.get('decision_note', '')
+        if request_obj.status != SignupRequest.PENDING:
+            messages.error(request, "Solo se pueden aprobar solicitudes pendientes.")
+            return redirect('request_detail', pk=pk)
         
-        # Generar contraseña temporal
-        temp_password = 'temp' + get_random_string(8)
-        
-        # Guardar en _plain_password para signal
-        username = request_obj.email.split("@")[0]
-        User = get_user_model()
-        user = User(username=username, email=request_obj.email)
-        user._plain_password = temp_password
-        user.set_password(temp_password)
-        user.save()
-        
-        request_obj.approve(decided_by=request.user, decision_note=decision_note)
-        messages.success(request, f"Usuario {username} creado con contraseña: {temp_password}")
+        # El usuario se crea con el hash guardado al registrarse: entra con la contraseña que eligió
+        decision_note = request.POST.get('decision_note', '')
+        if not request_obj.approve(decided_by=request.user, decision_note=decision_note):
+            messages.error(request, "Otro administrador ya está procesando esta solicitud.")
+            return redirect('request_detail', pk=pk)
+        messages.success(request, f"Solicitud de {request_obj.email} aprobada.")
         return redirect('admin_requests')
     
     return redirect('request_detail', pk=pk)
@@ -221,22 +349,79 @@ def approve_request(request, pk):
 @login_required
 def reject_request(request, pk):
     """Rechazar una solicitud"""
-    require_admin(request.user)
+    require_admin(request.principal)
     request_obj = get_object_or_404(SignupRequest, pk=pk)
     
     if request.method == 'POST':
         decision_note = request.POST.get('decision_note', '')
-        request_obj.reject(decided_by=request.user, decision_note=decision_note)
+        if not request_obj.reject(decided_by=request.user, decision_note=decision_note):
+            messages.error(request, "La solicitud ya no está pendiente o la está procesando otro administrador.")
+            return redirect('request_detail', pk=pk)
         messages.success(request, f"Solicitud de {request_obj.email} rechazada.")
         return redirect('admin_requests')
     
     return redirect('request_detail', pk=pk)
 
 
+@login_required
+def bulk_requests(request):
+    """Aprobar o rechazar varias solicitudes seleccionadas en request_list"""
+    require_admin(request.principal)
+    status_filter = request.POST.get('status', '')
+    back = f"{reverse('admin_requests')}?status={status_filter}" if status_filter else reverse('admin_requests')
+    
+    if request.method != 'POST':
+        return redirect(back)
+    
+    ids = [pk for pk in request.POST.getlist('request_ids') if pk.isdigit()]
+    if not ids:
+        messages.warning(request, "No se seleccionó ninguna solicitud.")
+        return redirect(back)
+    
+    selected = SignupRequest.objects.filter(pk__in=ids)
+    decision_note = request.POST.get('decision_note', '')
+    action = request.POST.get('action')
+    if action == 'approve':
+        result = approval.approve_requests(selected, decided_by=request.user, decision_note=decision_note)
+        messages.success(
+            request,
+            f"{result.approved} solicitudes aprobadas, {len(result.created_users)} usuarios creados.",
+        )
+    elif action == 'reject':
+        rejected = approval.reject_requests(selected, decided_by=request.user, decision_note=decision_note)
+        messages.success(request, f"{rejected} solicitudes rechazadas.")
+    else:
+        messages.error(request, "Acción no válida.")
+    return redirect(back)
+
+
+@login_required
+def claim_requests(request):
+    """Reclamar un lote de solicitudes pendientes para moderarlas"""
+    require_admin(request.principal)
+    if request.method == 'POST':
+        claimed = moderation.claim_batch(request.user)
+        if claimed:
+            messages.success(request, f"{len(claimed)} solicitudes reclamadas durante {moderation.lease_seconds() // 60} minutos.")
+        else:
+            messages.info(request, "No quedan solicitudes pendientes sin reclamar.")
+    return redirect(f"{reverse('admin_requests')}?status=mine")
+
+
+@login_required
+def release_requests(request):
+    """Devolver a la cola las solicitudes reclamadas"""
+    require_admin(request.principal)
+    if request.method == 'POST':
+        released = moderation.release_claims(request.user)
+        messages.success(request, f"{released} solicitudes devueltas a la cola.")
+    return redirect('admin_requests')
+
+
 @login_required
 def reset_request(request, pk):
     """Resetear una solicitud a pendiente"""
-    require_admin(request.user)
+    require_admin(request.principal)
     request_obj = get_object_or_404(SignupRequest, pk=pk)
     
     if request.method == 'POST':
@@ -254,46 +439,46 @@ def reset_request(request, pk):
 @login_required
 def admin_users(request):
     """Lista de usuarios para administradores con paginación"""
-    require_admin(request.user)
+    require_admin(request.principal)
     
-    from django.core.paginator import Paginator
     from django.contrib.auth import get_user_model
     
     User = get_user_model()
     
-    # Obtener todos los usuarios con sus perfiles
-    users = User.objects.select_related('profile').all().order_by('-date_joined')
-    
-    # Paginación
-    paginator = Paginator(users, 10)  # 10 usuarios por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginación por cursor sobre (date_joined, id): las páginas profundas cuestan lo mismo que la primera
+    users = User.objects.select_related('profile')
+    page = KeysetPaginator(users, keys=("date_joined", "id"), per_page=10).page(
+        after=request.GET.get("after", ""), before=request.GET.get("before", "")
+    )
     
-    # Estadísticas
-    total_users = User.objects.count()
-    active_users = User.objects.filter(is_active=True).count()
-    inactive_users = User.objects.filter(is_active=False).count()
-    
-    # Estadísticas por rol
-    from models.models import UserProfile
-    role_stats = {}
-    for role, _ in UserProfile.ROLE_CHOICES:
-        role_stats[role] = UserProfile.objects.filter(role=role).count()
+    # Estadísticas (tabla de contadores: una sola consulta)
+    counters = cached_counters()
     
     return render(request, "admin_users.html", {
-        "page_obj": page_obj,
-        "total_users": total_users,
-        "active_users": active_users,
-        "inactive_users": inactive_users,
-        "role_stats": role_stats,
+        "page": page,
+        "total_users": counters[USERS],
+        "active_users": counters[USERS_ACTIVE],
+        "inactive_users": counters[USERS] - counters[USERS_ACTIVE],
+        "role_stats": {role: counters[role_key(role)] for role, _ in UserProfile.ROLE_CHOICES},
         "user_info": get_user_info(request)
     })
 
 
+@login_required
+def cache_stats(request):
+    """Contadores de cache de este worker (L1/L2, single-flight, JWT) para dimensionarlas"""
+    require_admin(request.principal)
+    return JsonResponse({
+        "tiered": get_tiered_cache().stats(),
+        "singleflight": singleflight.metrics.snapshot(),
+        "jitsi": jitsi_metrics(),
+    })
+
+
 @login_required
 def toggle_user_status(request, pk):
     """Activar/desactivar usuario"""
-    require_admin(request.user)
+    require_admin(request.principal)
     
     from django.contrib.auth import get_user_model
     User = get_user_model()
@@ -315,14 +500,14 @@ def toggle_user_status(request, pk):
 @login_required
 def delete_user(request, pk):
     """Eliminar usuario"""
-    require_admin(request.user)
+    require_admin(request.principal)
     
     from django.contrib.auth import get_user_model
     from models.models import UserProfile
     
     User = get_user_model()
     user = get_object_or_404(User, pk=pk)
-    current_user_profile = request.user.profile
+    current_user_profile = request.principal.profile
     
     # Verificar permisos de eliminación
     if hasattr(user, 'profile'):
@@ -353,14 +538,14 @@ def delete_user(request, pk):
 @login_required
 def change_user_role(request, pk):
     """Cambiar rol de usuario"""
-    require_admin(request.user)
+    require_admin(request.principal)
     
     from django.contrib.auth import get_user_model
     from models.models import UserProfile
     
     User = get_user_model()
     user = get_object_or_404(User, pk=pk)
-    current_user_profile = request.user.profile
+    current_user_profile = request.principal.profile
     
     if request.method == 'POST':
         new_role = request.POST.get('role')
@@ -407,9 +592,6 @@ def change_user_role(request, pk):
 def logout_view(request):
     """Página de logout con confirmación"""
     if request.user.is_authenticated:
-        # Limpiar cache del usuario antes del logout
-        cache_key = f"user_info_{request.user.id}"
-        cache.delete(cache_key)
         logout(request)
         messages.success(request, "Has cerrado sesión exitosamente.")
     return render(request, "logout.html")
@@ -426,27 +608,5 @@ def custom_permission_denied(request, exception=None):
 
 
 def get_user_info(request):
-    """Función helper para obtener información del usuario con cache"""
-    if not request.user.is_authenticated:
-        return None
-    
-    cache_key = f"user_info_{request.user.id}"
-    user_info = cache.get(cache_key)
-    
-    if user_info is None:
-        # Obtener el rol del usuario
-        try:
-            role = request.user.profile.role
-        except:
-            role = 'GUEST'
-        
-        user_info = {
-            'is_authenticated': True,
-            'username': request.user.username,
-            'email': request.user.email,
-            'role': role
-        }
-        # Cache por 5 minutos
-        cache.set(cache_key, user_info, 300)
-    
-    return user_info
+    """Información del usuario para las plantillas (de ``request.principal``, sin consultas)"""
+    return get_principal(request).info
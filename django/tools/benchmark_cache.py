@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark de backends de cache: LocMemCache frente a utils.sqlite_cache
+
+Lanza N procesos (como N workers de gunicorn) que hacen get/set sobre un
+conjunto de claves tipo ``user_info_{id}`` y mide la latencia por operación.
+Con LocMemCache cada proceso tiene su propia copia; con SQLiteCache todos
+comparten el mismo fichero (y las invalidaciones).
+
+Uso:
+    python tools/benchmark_cache.py
+    python tools/benchmark_cache.py --procs 1 4 16 32 --ops 20000 --read-ratio 0.95
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Agregar el directorio src al path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from django.core.cache.backends.locmem import LocMemCache
+from utils.sqlite_cache import SQLiteCache
+
+
+def make_cache(backend, path):
+    if backend == "locmem":
+        return LocMemCache("benchmark", {"OPTIONS": {"MAX_ENTRIES": 100000}})
+    return SQLiteCache(path, {"OPTIONS": {"MAX_ENTRIES": 100000}})
+
+
+def worker(backend, path, ops, keys, read_ratio, start, results):
+    cache = make_cache(backend, path)
+    rng = random.Random(os.getpid())
+    value = {"is_authenticated": True, "username": "usuario", "email": "usuario@example.com", "role": "USER"}
+    gets, sets = [], []
+    start.wait()
+    for _ in range(ops):
+        key = f"user_info_{rng.randrange(keys)}"
+        if rng.random() < read_ratio:
+            t0 = time.perf_counter()
+            if cache.get(key) is None:
+                cache.set(key, value, 300)
+            gets.append(time.perf_counter() - t0)
+        else:
+            t0 = time.perf_counter()
+            cache.set(key, value, 300)
+            sets.append(time.perf_counter() - t0)
+    results.put((gets, sets))
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def run(backend, procs, ops, keys, read_ratio, path):
+    ctx = multiprocessing.get_context("fork")
+    start = ctx.Event()
+    results = ctx.Queue()
+    workers = [ctx.Process(target=worker, args=(backend, path, ops, keys, read_ratio, start, results)) for _ in range(procs)]
+    for process in workers:
+        process.start()
+    t0 = time.perf_counter()
+    start.set()
+    gets, sets = [], []
+    for _ in workers:
+        g, s = results.get()
+        gets.extend(g)
+        sets.extend(s)
+    elapsed = time.perf_counter() - t0
+    for process in workers:
+        process.join()
+    print(
+        f"  {backend:<7} {procs:>3} proc  "
+        f"get p50 {statistics.median(gets) * 1e6:8.1f} µs  p99 {percentile(gets, 0.99) * 1e6:8.1f} µs  "
+        f"set p50 {statistics.median(sets) * 1e6 if sets else 0:8.1f} µs  p99 {percentile(sets, 0.99) * 1e6:8.1f} µs  "
+        f"{(len(gets) + len(sets)) / elapsed:>10,.0f} ops/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--ops", type=int, default=10000, help="operaciones por proceso")
+    parser.add_argument("--keys", type=int, default=5000, help="usuarios distintos")
+    parser.add_argument("--read-ratio", type=float, default=0.9)
+    args = parser.parse_args()
+
+    print(f"=== Cache: {args.ops} ops/proceso, {args.keys} claves, {args.read_ratio:.0%} lecturas ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        for procs in args.procs:
+            for backend in ("locmem", "sqlite"):
+                path = os.path.join(tmp, f"cache-{procs}.sqlite3")
+                run(backend, procs, args.ops, args.keys, args.read_ratio, path)
+    print()
+    print("  LocMemCache no comparte entradas: cada proceso calcula y guarda su propia copia")
+    print("  y un delete solo afecta al proceso que lo hace.")
+
+
+if __name__ == "__main__":
+    main()
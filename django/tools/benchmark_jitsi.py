@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks de generación de links de Jitsi
+
+Uso:
+    python tools/benchmark_jitsi.py
+"""
+import os
+import sys
+import time
+import timeit
+from pathlib import Path
+
+# Agregar el directorio src al path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('JITSI_JWT_SECRET', 'benchmark-secret-benchmark-secret-0123')
+import django
+django.setup()
+
+from utils import jitsi
+
+
+def legacy_generate_meeting_link(room_name, user_name="Guest"):
+    """Implementación anterior: os.getenv + import jwt en cada llamada"""
+    base_url = os.getenv("JITSI_BASE_URL", "http://localhost:8080")
+    try:
+        import jwt
+        secret = os.getenv("JITSI_JWT_SECRET")
+        appid = os.getenv("JITSI_APP_ID", "django-jitsi")
+        if not secret:
+            return f"{base_url}/{room_name}"
+        now = int(time.time())
+        payload = {
+            "aud": appid, "iss": appid, "sub": "meet", "room": room_name,
+            "exp": now + 60 * 30, "nbf": now - 5,
+            "context": {"user": {"name": user_name}},
+        }
+        return f"{base_url}/{room_name}?jwt={jwt.encode(payload, secret, algorithm='HS256')}"
+    except ImportError:
+        return f"{base_url}/{room_name}"
+
+
+def legacy_get_ice_servers():
+    """Implementación anterior: parseo de JVB_STUN_SERVERS/TURN_* en cada llamada"""
+    ice_servers = []
+    stun_servers = os.getenv("JVB_STUN_SERVERS", "stun.l.google.com:19302,stun1.l.google.com:19302")
+    for stun in stun_servers.split(","):
+        ice_servers.append({"urls": f"stun:{stun.strip()}"})
+    turn_server = os.getenv("TURN_SERVER")
+    turn_username = os.getenv("TURN_USERNAME")
+    turn_password = os.getenv("TURN_PASSWORD")
+    if turn_server and turn_username and turn_password:
+        ice_servers.append({"urls": [f"turn:{turn_server}"], "username": turn_username, "credential": turn_password})
+    return ice_servers
+
+
+def report(name, func, number):
+    """Imprime el coste medio por llamada en microsegundos"""
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"  {name:<45} {best / number * 1e6:10.2f} µs/llamada")
+    return best / number
+
+
+def bench_config():
+    """
+    os.getenv en cada llamada vs JitsiConfig cacheada
+
+    La ganancia está en get_ice_servers (parseo de STUN/TURN en cada llamada).
+    Por link no hay mejora apreciable: la firma del JWT domina el coste y la
+    lectura del entorno queda dentro del ruido; se mide para dejarlo constatado.
+    """
+    print("=== Configuración de Jitsi: get_ice_servers ===")
+    jitsi.reload_config()
+    before = report("antes: get_ice_servers (os.getenv)", legacy_get_ice_servers, 50000)
+    after = report("después: get_ice_servers (JitsiConfig)", jitsi.get_ice_servers, 50000)
+    print(f"  mejora: {before / after:.2f}x")
+    print()
+
+    print("=== Configuración de Jitsi: por link (resultado nulo esperado) ===")
+    before = report("antes: generate_meeting_link (os.getenv)",
+                    lambda: legacy_generate_meeting_link("room-bench", "alice"), 5000)
+    # Sin la cache de JWT, para aislar el efecto de JitsiConfig
+    after = report("después: JitsiConfig + jitsi_jwt",
+                   lambda: f"{jitsi.get_config().base_url}/room-bench?jwt="
+                           f"{jitsi.jitsi_jwt(room='room-bench', user_name='alice')}", 5000)
+    print(f"  relación: {before / after:.2f}x ({(before - after) * 1e6:+.2f} µs/link); "
+          f"la firma HS256 domina y la relación oscila entre ejecuciones (~0.8-1.4x): no es una mejora fiable")
+    print()
+
+
+def bench_jwt_cache(meetings=50, renders=20):
+    """Render de un dashboard: firma por fila vs cache de JWT"""
+    print(f"=== Cache de JWT ({meetings} meetings x {renders} renders) ===")
+    rooms = [f"room-{i:04d}" for i in range(meetings)]
+
+    def render(sign):
+        for _ in range(renders):
+            for room in rooms:
+                sign(room=room, user_name="alice")
+
+    jitsi.reload_config()
+    before = report("antes: jitsi_jwt por fila", lambda: render(jitsi.jitsi_jwt), 1)
+    after = report("después: cached_jitsi_jwt por fila", lambda: render(jitsi.cached_jitsi_jwt), 1)
+    print(f"  mejora: {before / after:.2f}x  stats: {jitsi.jwt_cache_stats()}")
+    print()
+
+
+def bench_prefix_lookup(prefixes=5000):
+    """Búsqueda de región ICE por IP del cliente (longest-prefix match)"""
+    import random
+    from utils.prefixes import PrefixTable
+
+    print(f"=== Tabla de prefijos ({prefixes} redes IPv4 /16-/24 + IPv6 /32-/48) ===")
+    rng = random.Random(42)
+    entries = []
+    for i in range(prefixes):
+        length = rng.choice((16, 20, 24))
+        address = rng.getrandbits(32) >> (32 - length) << (32 - length)
+        entries.append((f"{address >> 24}.{address >> 16 & 255}.{address >> 8 & 255}.{address & 255}/{length}",
+                        f"region-{i % 8}"))
+    entries += [(f"2001:db8:{i:x}::/48", "region-v6") for i in range(prefixes // 10)]
+    table = PrefixTable(entries)
+    ips = [f"{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}"
+           for _ in range(1000)]
+    v6 = [f"2001:db8:{rng.randrange(prefixes // 10):x}::{rng.randrange(65536):x}" for _ in range(1000)]
+
+    def run(addresses):
+        lookup = table.lookup
+        for ip in addresses:
+            lookup(ip)
+
+    elapsed = min(timeit.repeat(lambda: run(ips), number=100, repeat=5))
+    print(f"  {'lookup IPv4':<45} {elapsed / 100 / len(ips) * 1e6:10.3f} µs/llamada")
+    elapsed = min(timeit.repeat(lambda: run(v6), number=100, repeat=5))
+    print(f"  {'lookup IPv6':<45} {elapsed / 100 / len(v6) * 1e6:10.3f} µs/llamada")
+    print()
+
+
+def setup_test_db():
+    """Crea una base de datos de test en memoria para no tocar la real"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def bench_batch_links(sizes=(10, 100, 1000)):
+    """export_meetings: meeting.jitsi_url por fila vs generate_meeting_links"""
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from models.models import Meeting
+
+    print("=== Links en bloque (cache de JWT fría) ===")
+    User = get_user_model()
+    for size in sizes:
+        user = User.objects.create(username=f"bench{size}", email=f"bench{size}@example.com")
+        Meeting.objects.bulk_create(
+            Meeting(room=f"bench-{size}-{i:05d}", owner=user) for i in range(size)
+        )
+        qs = Meeting.objects.filter(owner=user).order_by("-created_at")
+
+        def per_row():
+            jitsi.reload_config()
+            return [m.jitsi_url() for m in qs.all()]
+
+        def batch():
+            jitsi.reload_config()
+            return jitsi.generate_meeting_links(qs.all(), user)
+
+        for name, func in (("por fila", per_row), ("en bloque", batch)):
+            with CaptureQueriesContext(connection) as queries:
+                func()
+            elapsed = report(f"{size:>5} meetings {name}", func, 1)
+            print(f"  {'':<45} {len(queries):10d} consultas  {elapsed / size * 1e6:8.2f} µs/meeting")
+    print()
+
+
+if __name__ == "__main__":
+    bench_config()
+    bench_jwt_cache()
+    bench_prefix_lookup()
+    setup_test_db()
+    bench_batch_links()
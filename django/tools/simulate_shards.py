@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Simulación del reparto de salas entre shards de Jitsi (hash consistente)
+
+Muestra la carga de cada shard frente a la esperada por peso y qué fracción
+de salas cambia de shard al añadir uno nuevo.
+
+Uso:
+    python tools/simulate_shards.py --shards 4 --rooms 100000
+    python tools/simulate_shards.py --weights 1,1,2 --rooms 50000
+"""
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+# Agregar el directorio src al path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.hashring import DEFAULT_REPLICAS, HashRing
+
+
+def simulate(weights, rooms, replicas):
+    nodes = [(f"shard-{i}", weight) for i, weight in enumerate(weights)]
+    ring = HashRing(nodes, replicas=replicas)
+    keys = [f"room-{i:08d}" for i in range(rooms)]
+    assignment = {key: ring.get(key) for key in keys}
+
+    total_weight = sum(weights)
+    counts = {name: 0 for name, _ in nodes}
+    for shard in assignment.values():
+        counts[shard] += 1
+
+    print(f"=== {len(nodes)} shards, {rooms} salas, {replicas} réplicas por unidad de peso ===")
+    print(f"  {'shard':<10} {'peso':>6} {'salas':>10} {'esperado':>10} {'desviación':>11}")
+    deviations = []
+    for name, weight in nodes:
+        expected = rooms * weight / total_weight
+        deviation = (counts[name] - expected) / expected
+        deviations.append(deviation)
+        print(f"  {name:<10} {weight:>6} {counts[name]:>10} {expected:>10.0f} {deviation:>+10.2%}")
+    print(f"  desviación máxima: {max(abs(d) for d in deviations):.2%}  "
+          f"desviación típica: {statistics.pstdev(deviations):.2%}")
+
+    new_weight = statistics.median(weights)
+    ring.add(f"shard-{len(nodes)}", new_weight)
+    moved = sum(1 for key in keys if ring.get(key) != assignment[key])
+    ideal = new_weight / (total_weight + new_weight)
+    print(f"  al añadir shard-{len(nodes)} (peso {new_weight}): {moved / rooms:.2%} de salas movidas "
+          f"(ideal {ideal:.2%})")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[2, 4, 8, 16],
+                        help="Número de shards de igual peso a simular")
+    parser.add_argument("--weights", help="Pesos separados por comas (ignora --shards)")
+    parser.add_argument("--rooms", type=int, default=100000)
+    parser.add_argument("--replicas", type=int, default=DEFAULT_REPLICAS)
+    args = parser.parse_args()
+
+    if args.weights:
+        simulate([float(w) for w in args.weights.split(",")], args.rooms, args.replicas)
+    else:
+        for count in args.shards:
+            simulate([1] * count, args.rooms, args.replicas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Prueba de estrés de la cola de moderación (models.moderation)
+
+Varios admins, cada uno en su hilo y con su conexión, reclaman lotes de
+solicitudes y los aprueban hasta vaciar la cola, contra una base de datos
+SQLite temporal en modo WAL. Comprueba que ninguna solicitud se procesa dos
+veces, que no hay errores y que los contadores cuadran.
+
+Uso:
+    python tools/stress_moderation.py --requests 2000 --admins 8 --batch 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Agregar el directorio src al path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+from stress_rooms import setup_db
+
+
+def worker(admin, batch_size, processed, errors):
+    from django.db import connection
+    from models import approval, moderation
+    from models.models import SignupRequest
+
+    try:
+        while True:
+            batch = moderation.claim_batch(admin, size=batch_size)
+            if not batch:
+                return
+            ids = [req.pk for req in batch]
+            result = approval.approve_requests(SignupRequest.objects.filter(pk__in=ids), decided_by=admin)
+            processed.append((admin.username, ids, result.approved))
+    except Exception as exc:  # se informa al final
+        errors.append(repr(exc))
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--admins", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_db(os.path.join(tmp, "stress.sqlite3"))
+
+        from django.contrib.auth import get_user_model
+        from models import counters
+        from models.models import SignupRequest
+
+        User = get_user_model()
+        admins = [User.objects.create_user(f"admin{i}") for i in range(args.admins)]
+        for i in range(args.requests):
+            SignupRequest.objects.create(email=f"user{i}@example.com", full_name=f"User {i}", password_hash="x")
+
+        processed, errors = [], []
+        threads = [threading.Thread(target=worker, args=(admin, args.batch, processed, errors)) for admin in admins]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        ids = [pk for _, chunk, _ in processed for pk in chunk]
+        per_admin = {}
+        for username, chunk, _ in processed:
+            per_admin[username] = per_admin.get(username, 0) + len(chunk)
+        print(f"=== {args.requests} solicitudes, {args.admins} admins, lotes de {args.batch} ===")
+        print(f"  tiempo: {elapsed:.1f}s  ({len(ids) / elapsed:,.0f} solicitudes/s)")
+        print(f"  errores: {len(errors)}")
+        for error in errors[:5]:
+            print(f"    {error}")
+        print(f"  procesadas: {len(ids)}  duplicadas: {len(ids) - len(set(ids))}")
+        print(f"  aprobadas en la transición: {sum(n for _, _, n in processed)}")
+        print(f"  pendientes restantes: {SignupRequest.objects.filter(status=SignupRequest.PENDING).count()}")
+        print(f"  reparto por admin: {dict(sorted(per_admin.items()))}")
+        print(f"  contadores correctos: {counters.read_counters() == counters.compute_counts()}")
+        if errors or len(ids) != len(set(ids)) or len(ids) != args.requests:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()